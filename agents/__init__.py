@@ -1,12 +1,14 @@
 # agents/__init__.py
 """AI Agents for EduCanvas platform"""
 
+from .base_agent import BaseAgent
 from .quiz_generator import QuizGeneratorAgent
 from .learner_agent import LearnerAgent
 from .tester_agent import TesterAgent
 from .reviewer_agent import ReviewerAgent
 
 __all__ = [
+    'BaseAgent',
     'QuizGeneratorAgent',
     'LearnerAgent',
     'TesterAgent',
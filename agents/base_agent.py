@@ -0,0 +1,443 @@
+from config import (
+    get_openai_client,
+    AGENT_CACHE_TTLS,
+    OPERATION_PRIORITIES,
+    LLM_DEFAULT_COMPLETION_TOKENS,
+    LLM_RATE_LIMIT_PAUSE_SECONDS,
+    SCHEMA_REREQUEST_ATTEMPTS
+)
+from agents.response_cache import get_response_cache, make_cache_key
+from agents.single_flight import get_single_flight
+from agents.scheduler import get_scheduler, PRIORITY_INTERACTIVE, PRIORITY_BY_NAME, QueueTimeoutError
+from agents.resilience import get_resilient_caller
+from agents.model_router import get_model_router
+from agents.metrics import get_metrics
+from agents.json_stream import JsonArrayStreamParser
+from agents.validation import get_output_validator, repair_json, check_item
+from utils.tokens import count_tokens
+from typing import List, Dict, Any, Iterator, Callable, Tuple
+from openai import RateLimitError
+import copy
+import threading
+import time
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_shared_client():
+    """Get the process-wide OpenAI client, so all agents share one connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = get_openai_client()
+        return _client
+
+
+class BaseAgent:
+    """
+    Shared call path for all agents: uses the shared OpenAI client, serves repeated
+    requests from the response cache for operations that opt in, coalesces
+    identical requests that are already in flight, admits every model call
+    through the process-wide request scheduler, routes it to the model tier
+    configured for its operation, and applies deadlines, retries and hedging
+    through the shared resilience layer. Every request is recorded in the
+    metrics registry, and JSON responses are checked by the output validator.
+    """
+
+    def __init__(self, user_id: str = "anonymous", priority: str = None):
+        """
+        Args:
+            user_id: Identity used for fair sharing of the LLM endpoint
+            priority: Scheduler class ("grading", "interactive" or "background")
+                overriding the per-operation defaults in OPERATION_PRIORITIES
+        """
+        self.client = get_shared_client()
+        self.cache = get_response_cache()
+        self.single_flight = get_single_flight()
+        self.scheduler = get_scheduler()
+        self.resilience = get_resilient_caller()
+        self.router = get_model_router()
+        self.metrics = get_metrics()
+        self.validator = get_output_validator()
+        self.user_id = user_id
+        self.priority = priority
+        # Per-instance copy so callers can opt operations in or out, or change TTLs
+        self.cache_ttls = dict(AGENT_CACHE_TTLS)
+
+    def for_user(self, user_id: str, priority: str = None) -> "BaseAgent":
+        """
+        Lightweight view of a shared agent acting for one user: same client,
+        caches and settings, with the user's identity (and optionally a
+        priority) for scheduling. Agents keep no per-user state, so views are
+        cheap and need not be stored in the session.
+        """
+        view = copy.copy(self)
+        view.user_id = user_id
+        if priority is not None:
+            view.priority = priority
+        return view
+
+    def _chat(self,
+              operation: str,
+              messages: List[Dict[str, str]],
+              model: str = None,
+              bypass_cache: bool = False,
+              validate: Callable[[str], bool] = None,
+              **params) -> str:
+        """
+        Send a chat completion request and return the response text
+
+        Args:
+            operation: Name of the agent operation, e.g. "LearnerAgent.teach_concept"
+            messages: Chat messages
+            model: Model to send the request to (defaults to the operation's routed tier)
+            bypass_cache: Always issue a new call (used when variety is wanted);
+                the fresh response still refreshes the cache
+            validate: Whether a response is usable; responses it rejects (or
+                raises on) are returned but not cached, so identical requests
+                ask the model again
+            **params: Extra request parameters (temperature, max_tokens, response_format, ...)
+
+        Returns:
+            Content of the first choice
+        """
+
+        model = model or self.router.route(operation)
+        ttl = self.cache_ttls.get(operation)
+        key = make_cache_key(model, messages, params)
+
+        if ttl and not bypass_cache:
+            cached = self.cache.get(key)
+            if cached:
+                self.metrics.record_cache_hit(operation, model)
+                return cached["content"]
+
+        def call_model() -> str:
+            started = time.perf_counter()
+            trace = {"attempts": 0, "queue_seconds": 0.0}
+            try:
+                response = self._send(operation, model, messages, params, trace=trace)
+            except Exception as e:
+                self._record_failure(operation, model, started, trace, str(e))
+                raise
+            latency = time.perf_counter() - started
+
+            content = response.choices[0].message.content
+
+            usage = getattr(response, "usage", None)
+            tokens = getattr(usage, "total_tokens", 0) or 0
+            self.metrics.record_call(
+                operation,
+                model,
+                latency,
+                queue_seconds=trace["queue_seconds"],
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                retries=max(0, trace["attempts"] - 1)
+            )
+
+            if ttl and self._cacheable(content, validate):
+                self.cache.set(key, content, ttl, latency=latency, tokens=tokens)
+
+            return content
+
+        if bypass_cache:
+            return call_model()
+
+        content, shared = self.single_flight.do(key, call_model)
+        if shared:
+            self.metrics.record_coalesced(operation)
+        return content
+
+    def _chat_stream(self,
+                     operation: str,
+                     messages: List[Dict[str, str]],
+                     model: str = None,
+                     bypass_cache: bool = False,
+                     validate: Callable[[str], bool] = None,
+                     **params) -> Iterator[str]:
+        """
+        Stream a chat completion, yielding text as it arrives
+
+        Cache hits are yielded as a single piece. Streams are not coalesced
+        with identical in-flight requests.
+
+        Args:
+            operation: Name of the agent operation
+            messages: Chat messages
+            model: Model to send the request to (defaults to the operation's routed tier)
+            bypass_cache: Always issue a new call; the result still refreshes the cache
+            validate: Whether the complete response is usable (only then is it cached)
+            **params: Extra request parameters
+
+        Yields:
+            Pieces of the response text
+        """
+
+        model = model or self.router.route(operation)
+        ttl = self.cache_ttls.get(operation)
+        key = make_cache_key(model, messages, params)
+
+        if ttl and not bypass_cache:
+            cached = self.cache.get(key)
+            if cached:
+                self.metrics.record_cache_hit(operation, model)
+                yield cached["content"]
+                return
+
+        started = time.perf_counter()
+        trace = {"attempts": 0, "queue_seconds": 0.0}
+        ttft = None
+        pieces = []
+
+        try:
+            stream = self._send(operation, model, messages, params, stream=True, trace=trace)
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if ttft is None:
+                        ttft = time.perf_counter() - started
+                    pieces.append(delta)
+                    yield delta
+        except Exception as e:
+            self._record_failure(operation, model, started, trace, str(e), stream=True)
+            raise
+
+        latency = time.perf_counter() - started
+        content = "".join(pieces)
+        # Streamed responses carry no usage block; estimate the tokens instead
+        prompt_tokens = sum(count_tokens(m["content"]) for m in messages)
+        completion_tokens = count_tokens(content)
+        self.metrics.record_call(
+            operation,
+            model,
+            latency,
+            ttft=ttft,
+            queue_seconds=trace["queue_seconds"],
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            retries=max(0, trace["attempts"] - 1),
+            stream=True
+        )
+
+        if ttl and self._cacheable(content, validate):
+            self.cache.set(key, content, ttl, latency=latency, tokens=prompt_tokens + completion_tokens)
+
+    @staticmethod
+    def _cacheable(content: str, validate: Callable[[str], bool] = None) -> bool:
+        """Whether a response may be cached: not empty, and accepted by the caller's check"""
+        if not content:
+            return False
+        if validate is None:
+            return True
+        try:
+            return bool(validate(content))
+        except Exception:
+            return False
+
+    @staticmethod
+    def _has_items(schema: Dict[str, Any], wanted: int = 1, array_key: str = "questions") -> Callable[[str], bool]:
+        """
+        Cache check for item responses: the response parses (after repair)
+        and holds at least wanted items that are valid for the schema
+        """
+        def check(content: str) -> bool:
+            data = repair_json(content)
+            items = data.get(array_key, []) if isinstance(data, dict) else data
+            if not isinstance(items, list):
+                return False
+            return sum(1 for item in items if not check_item(item, schema)[1]) >= wanted
+
+        return check
+
+    def _send(self,
+              operation: str,
+              model: str,
+              messages: List[Dict[str, str]],
+              params: Dict[str, Any],
+              stream: bool = False,
+              trace: Dict[str, Any] = None):
+        """
+        Send one model request under the resilience policy: each attempt is
+        admitted by the scheduler and bounded by the operation's deadline;
+        transient failures are retried (streams only until the stream opens)
+
+        Args:
+            trace: Optional dict whose "attempts" and "queue_seconds" are
+                accumulated across attempts, for instrumentation
+
+        Returns:
+            The completion response, or the chunk stream when stream is True
+        """
+        if trace is None:
+            trace = {"attempts": 0, "queue_seconds": 0.0}
+
+        def attempt(timeout: float):
+            deadline = time.monotonic() + timeout
+            estimated_tokens, queue_seconds = self._admit(operation, messages, params, timeout)
+            trace["attempts"] += 1
+            trace["queue_seconds"] += queue_seconds
+
+            # Only what is left of the deadline after queueing bounds the request
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise QueueTimeoutError(f"{operation} spent its deadline waiting for admission")
+            response = self._create(model=model, messages=messages, stream=stream, timeout=remaining, **params)
+
+            if not stream:
+                usage = getattr(response, "usage", None)
+                self.scheduler.settle(estimated_tokens, getattr(usage, "total_tokens", 0) or 0)
+
+            return response
+
+        # Hedging duplicates whole requests, which a stream cannot share
+        return self.resilience.call(operation, attempt, hedge=False if stream else None)
+
+    def _admit(self,
+               operation: str,
+               messages: List[Dict[str, str]],
+               params: Dict[str, Any],
+               timeout: float = None) -> Tuple[int, float]:
+        """
+        Wait for the scheduler to admit a request
+
+        Args:
+            timeout: Longest time to wait (the rest of the call's deadline)
+
+        Raises:
+            QueueTimeoutError: If the request is not admitted in time
+
+        Returns:
+            Estimated tokens charged against the token budget, and seconds spent queueing
+        """
+        priority_name = self.priority or OPERATION_PRIORITIES.get(operation)
+        priority = PRIORITY_BY_NAME.get(priority_name, PRIORITY_INTERACTIVE)
+
+        estimated_tokens = (
+            sum(count_tokens(m["content"]) for m in messages) +
+            params.get("max_tokens", LLM_DEFAULT_COMPLETION_TOKENS)
+        )
+
+        queue_seconds = self.scheduler.acquire(self.user_id, priority, estimated_tokens, timeout=timeout)
+        return estimated_tokens, queue_seconds
+
+    def _record_failure(self,
+                        operation: str,
+                        model: str,
+                        started: float,
+                        trace: Dict[str, Any],
+                        error: str,
+                        stream: bool = False):
+        """Record a model call that raised"""
+        self.metrics.record_call(
+            operation,
+            model,
+            time.perf_counter() - started,
+            queue_seconds=trace["queue_seconds"],
+            retries=max(0, trace["attempts"] - 1),
+            error=error,
+            stream=stream
+        )
+
+    def _create(self, **request):
+        """Issue the request, pausing the scheduler for everyone if the endpoint rate-limits us"""
+        try:
+            return self.client.chat.completions.create(**request)
+        except RateLimitError:
+            self.scheduler.pause(LLM_RATE_LIMIT_PAUSE_SECONDS)
+            raise
+
+    def _stream_json_items(self,
+                           operation: str,
+                           messages: List[Dict[str, str]],
+                           model: str = None,
+                           array_key: str = "questions",
+                           schema: Dict[str, Any] = None,
+                           bypass_cache: bool = False,
+                           wanted: int = 1,
+                           **params) -> Iterator[Dict[str, Any]]:
+        """
+        Stream a JSON object response, yielding each element of one of its
+        arrays as soon as the element is complete
+
+        Args:
+            operation: Name of the agent operation
+            messages: Chat messages
+            model: Model to send the request to (defaults to the operation's routed tier)
+            array_key: Top-level key of the array to emit
+            schema: Optional item schema; invalid elements are dropped
+            bypass_cache: Always issue a new call
+            wanted: Valid elements the response needs to be cached
+            **params: Extra request parameters
+
+        Yields:
+            Completed (and, with a schema, valid) array elements
+        """
+
+        parser = JsonArrayStreamParser(array_key)
+        parsed = 0
+
+        validate = self._has_items(schema, wanted, array_key) if schema else None
+        for piece in self._chat_stream(operation, messages, model=model, bypass_cache=bypass_cache,
+                                       validate=validate, **params):
+            items = parser.feed(piece)
+            parsed += len(items)
+            yield from self._valid_items(items, schema)
+
+        # The model may have used an unexpected layout; fall back to a full (repairing) parse
+        if not parsed:
+            data = self.validator.parse(parser.get_text())
+            yield from self._valid_items(data.get(array_key, []) if isinstance(data, dict) else data, schema)
+
+    def _valid_items(self, items: Any, schema: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Keep the items that match the schema (all list items when there is none)"""
+        if schema is None:
+            return list(items) if isinstance(items, list) else []
+        return self.validator.filter_items(items, schema)[0]
+
+    def _top_up_items(self,
+                      operation: str,
+                      items: List[Dict[str, Any]],
+                      wanted: int,
+                      build_messages: Callable[[int], List[Dict[str, str]]],
+                      schema: Dict[str, Any],
+                      array_key: str = "questions",
+                      **params) -> List[Dict[str, Any]]:
+        """
+        Re-request only the items a response is short of after invalid ones
+        were dropped, instead of regenerating the whole response
+
+        Args:
+            operation: Name of the agent operation
+            items: Valid items received so far
+            wanted: Number of items the caller asked for
+            build_messages: Builds the chat messages asking for a given number of items
+            schema: Item schema
+            array_key: Top-level key of the item array
+            **params: Extra request parameters
+
+        Returns:
+            The items, topped up with valid re-requested ones where possible
+        """
+        items = list(items)
+
+        for _ in range(SCHEMA_REREQUEST_ATTEMPTS):
+            missing = wanted - len(items)
+            if missing <= 0:
+                break
+
+            self.validator.record_rerequest()
+            try:
+                content = self._chat(
+                    operation, build_messages(missing), validate=self._has_items(schema, missing, array_key), **params
+                )
+                data = self.validator.parse(content)
+            except Exception:
+                break
+
+            items.extend(self._valid_items(data.get(array_key, []) if isinstance(data, dict) else data, schema)[:missing])
+
+        return items
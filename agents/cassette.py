@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+from types import SimpleNamespace
+from typing import Dict, Any, Iterator, List
+from agents.response_cache import make_cache_key
+from utils.file_lock import FileLock, unique_tmp_path
+
+CASSETTE_MODES = ("record", "replay")
+
+# Request parameters that do not change what the model returns
+_IGNORED_PARAMS = ("stream", "timeout")
+
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when a request was never recorded"""
+
+
+class CassetteClient:
+    """
+    Stand-in for the OpenAI client that records chat completions to a JSON
+    cassette, or replays them deterministically without any network access.
+
+    Only the surface the agents use is provided: chat.completions.create,
+    with or without stream=True. Requests are matched by the same key as the
+    response cache; repeated identical requests replay their recordings in
+    order, cycling when the cassette has fewer than were asked for.
+
+    Use get_cassette_client() for one client per cassette in the process.
+    Recordings are merged into the file under a lock file, so processes
+    recording to the same cassette keep each other's entries.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", client=None):
+        """
+        Args:
+            path: Cassette file
+            mode: "record" (forward to client and save) or "replay"
+            client: Real OpenAI client, required when recording
+        """
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and client is None:
+            raise ValueError("Recording needs a real client")
+
+        self.path = path
+        self.mode = mode
+        self.client = client
+        self.chat = SimpleNamespace(completions=self)
+        self._interactions = self._load()
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def create(self, **request):
+        """Record or replay one chat completion request"""
+        key = self._key(request)
+        stream = request.get("stream", False)
+
+        if self.mode == "replay":
+            entry = self._next_recording(key)
+            return _replay_stream(entry) if stream else _replay_response(entry)
+
+        response = self.client.chat.completions.create(**request)
+        if stream:
+            return self._record_stream(key, request, response)
+
+        usage = getattr(response, "usage", None)
+        self._save(key, {
+            "model": request.get("model"),
+            "content": response.choices[0].message.content,
+            "usage": {
+                "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+                "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                "total_tokens": getattr(usage, "total_tokens", 0) or 0
+            }
+        })
+        return response
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(recordings) for recordings in self._interactions.values())
+
+    def _record_stream(self, key: str, request: Dict[str, Any], stream) -> Iterator[Any]:
+        """Pass chunks through and save the whole text once the stream completes"""
+        pieces = []
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                pieces.append(chunk.choices[0].delta.content)
+            yield chunk
+
+        self._save(key, {"model": request.get("model"), "content": "".join(pieces), "usage": None})
+
+    def _next_recording(self, key: str) -> Dict[str, Any]:
+        with self._lock:
+            recordings = self._interactions.get(key)
+            if not recordings:
+                raise CassetteMissError(f"No recording for this request in {self.path}")
+
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+            return recordings[position % len(recordings)]
+
+    def _save(self, key: str, entry: Dict[str, Any]):
+        """Append a recording to the cassette as it is on disk and rewrite it atomically"""
+        with self._lock, FileLock(f"{self.path}.lock"):
+            interactions = self._load()
+            interactions.setdefault(key, []).append(entry)
+            data = {"version": 1, "interactions": interactions}
+
+            tmp_path = unique_tmp_path(self.path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(tmp_path, self.path)
+            self._interactions = interactions
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if not os.path.exists(self.path):
+            if self.mode == "replay":
+                raise FileNotFoundError(f"Cassette not found: {self.path}")
+            return {}
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f).get("interactions", {})
+
+    @staticmethod
+    def _key(request: Dict[str, Any]) -> str:
+        params = {k: v for k, v in request.items() if k not in ("model", "messages") + _IGNORED_PARAMS}
+        return make_cache_key(request.get("model"), request.get("messages", []), params)
+
+
+_cassette_clients = {}
+_cassette_lock = threading.Lock()
+
+
+def get_cassette_client(path: str, mode: str = "replay", client=None) -> CassetteClient:
+    """
+    Get the process-wide client for a cassette, creating it on first use
+
+    Args:
+        path: Cassette file
+        mode: "record" or "replay"
+        client: Real OpenAI client, required when recording
+
+    Returns:
+        The client shared by every agent using the cassette
+    """
+    key = (os.path.abspath(path), mode)
+    with _cassette_lock:
+        if key not in _cassette_clients:
+            _cassette_clients[key] = CassetteClient(path, mode=mode, client=client)
+        return _cassette_clients[key]
+
+
+def _replay_response(entry: Dict[str, Any]):
+    """Build an object shaped like a chat completion from a recording"""
+    usage = entry.get("usage") or {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    return SimpleNamespace(
+        model=entry.get("model"),
+        choices=[SimpleNamespace(
+            index=0,
+            message=SimpleNamespace(role="assistant", content=entry["content"]),
+            finish_reason="stop"
+        )],
+        usage=SimpleNamespace(**usage)
+    )
+
+
+def _replay_stream(entry: Dict[str, Any], piece_size: int = 16) -> Iterator[Any]:
+    """Yield a recording as stream chunks of a fixed size"""
+    content = entry["content"]
+    for start in range(0, len(content), piece_size):
+        yield SimpleNamespace(choices=[SimpleNamespace(
+            index=0,
+            delta=SimpleNamespace(content=content[start:start + piece_size]),
+            finish_reason=None
+        )])
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from config import GRADE_CACHE_MAX_ENTRIES
+
+
+def question_key_version(question: Dict[str, Any]) -> str:
+    """Short hash of what grading one question depends on: its text, answer key and rubric"""
+    payload = json.dumps(
+        {
+            "question": question.get("question"),
+            "options": question.get("options"),
+            "correct_answer": question.get("correct_answer"),
+            "sample_answer": question.get("sample_answer"),
+            "key_points": question.get("key_points"),
+            "rubric": question.get("rubric")
+        },
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def answer_key_version(quiz: Dict[str, Any]) -> str:
+    """
+    Short hash of the whole quiz's answer key. Changes whenever the
+    instructor edits any question, answer key or rubric.
+    """
+    versions = [question_key_version(q) for q in quiz.get("questions", [])]
+    payload = json.dumps({"type": quiz.get("type"), "questions": versions})
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def answer_fingerprint(answer: str) -> str:
+    """
+    Normalize an answer so trivially different submissions share a grade:
+    Unicode normalization and collapsed whitespace only. Case, signs, units
+    and symbols can change what an answer means ("-5" vs "5", "CO" vs
+    "Co"), so they are kept.
+    """
+    text = unicodedata.normalize("NFKC", str(answer or ""))
+    text = " ".join(text.split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class GradeCache:
+    """
+    Memo of per-question grades keyed by question ID, the question's answer
+    key version and the answer fingerprint, so identical answers from
+    different students (and unchanged answers on a regrade) reuse one grade
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def make_key(question_id: str, question: Dict[str, Any], answer: str) -> str:
+        return f"{question_id}:{question_key_version(question)}:{answer_fingerprint(answer)}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            grade = self._entries.get(key)
+            if grade is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return grade
+
+    def set(self, key: str, grade: Dict[str, Any]):
+        with self._lock:
+            self._entries[key] = grade
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def export_state(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Memoized grades, least recently used first (for snapshots)"""
+        with self._lock:
+            return list(self._entries.items())
+
+    def load_state(self, state: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Restore grades from export_state(), keeping grades already present
+
+        Returns:
+            Number of grades restored
+        """
+        restored = 0
+        with self._lock:
+            for key, grade in state:
+                if key not in self._entries:
+                    self._entries[key] = grade
+                    restored += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return restored
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the number of memoized grades"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+_grade_cache = GradeCache(max_entries=GRADE_CACHE_MAX_ENTRIES)
+
+
+def get_grade_cache() -> GradeCache:
+    """Get the process-wide grade memo"""
+    return _grade_cache
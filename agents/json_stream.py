@@ -0,0 +1,90 @@
+import json
+from typing import List, Dict, Any
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser for a streamed JSON object that emits each element of
+    one top-level array (e.g. "questions") as soon as the element is closed,
+    without waiting for the rest of the document.
+    """
+
+    def __init__(self, array_key: str = "questions"):
+        self.array_key = array_key
+        self._data = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+        self._pending_key = None
+        self._array_depth = None
+        self._element_start = None
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next piece of streamed text
+
+        Args:
+            text: Newly received characters
+
+        Returns:
+            Array elements completed by this piece, in order
+        """
+        self._data += text
+        data = self._data
+        completed = []
+
+        while self._pos < len(data):
+            ch = data[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = data[self._string_start + 1:self._pos]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+                self._last_string = None
+            elif ch == ":":
+                if self._depth == 1:
+                    self._pending_key = self._last_string
+            elif ch in "{[":
+                if self._array_depth is not None and self._depth == self._array_depth and self._element_start is None:
+                    self._element_start = self._pos
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._pending_key == self.array_key:
+                    self._array_depth = self._depth
+            elif ch in "}]":
+                self._depth -= 1
+                if self._array_depth is not None:
+                    if self._depth == self._array_depth and self._element_start is not None:
+                        element = self._decode(data[self._element_start:self._pos + 1])
+                        if element is not None:
+                            completed.append(element)
+                        self._element_start = None
+                    elif self._depth < self._array_depth:
+                        self._array_depth = None
+            elif ch == "," and self._depth == 1:
+                self._pending_key = None
+
+            self._pos += 1
+
+        return completed
+
+    def get_text(self) -> str:
+        """Get all text received so far"""
+        return self._data
+
+    @staticmethod
+    def _decode(raw: str):
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
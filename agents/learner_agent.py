@@ -1,90 +1,133 @@
-from config import get_openai_client, AGENT_MODEL
+from config import RETRIEVAL_TOP_K, TUTOR_HISTORY_TOKEN_BUDGET, TUTOR_SUMMARY_MAX_TOKENS, WEAK_AREA_TOP_K
+from agents.base_agent import BaseAgent
+from agents.prompts import compact, fill
+from utils.retrieval import BM25Index
+from utils.tokens import count_tokens, truncate_to_tokens
 from typing import List, Dict, Any
+import threading
 
-class LearnerAgent:
+class LearnerAgent(BaseAgent):
     """
     Agent responsible for teaching concepts from slides with examples and numerical problems
     Adapts teaching based on student's weak areas identified by ReviewerAgent
-    """
     
-    def __init__(self):
-        self.client = get_openai_client()
-        self.conversation_history = []
+    The agent holds no conversation state, so one instance is shared by all
+    students (see get_learner_agent). The conversation is passed in with each
+    call: the slide content is pinned once in the system prompt rather than
+    repeated in every turn; the history only holds the dialogue, trimmed to a
+    token budget with older turns folded into a running summary.
+    """
     
     def teach_concept(self, 
                      slide_content: str, 
                      weak_areas: List[str] = None,
-                     user_question: str = None) -> str:
+                     user_question: str = None,
+                     bypass_cache: bool = False,
+                     context_index: BM25Index = None,
+                     context_slide_id: str = None,
+                     conversation: Dict[str, Any] = None) -> str:
         """
         Teach concepts from slides with focus on weak areas
         
         Args:
             slide_content: Content from the slides
-            weak_areas: List of concepts student struggles with
+            weak_areas: List of concepts student struggles with, most pressing
+                first (only the first WEAK_AREA_TOP_K are used)
             user_question: Optional specific question from student
+            bypass_cache: Skip cached explanations and ask the model again
+            context_index: Optional retrieval index; when given, questions are
+                answered from the most relevant page chunks instead of slide_content
+            context_slide_id: Restrict retrieval to this slide
+            conversation: Conversation record with "history" and "summary"
+                (see utils.conversations), updated in place with this turn;
+                a one-off exchange when None
         
         Returns:
             Teaching response with examples and explanations
         """
         
-        system_prompt = self._get_system_prompt(weak_areas)
+        weak_areas = (weak_areas or [])[:WEAK_AREA_TOP_K]
+        if conversation is None:
+            conversation = {"history": [], "summary": ""}
+        
+        # Retrieved passages only accompany the current turn; otherwise the
+        # whole document is pinned in the system prompt
+        passages = ""
+        if context_index is not None and user_question:
+            passages = context_index.build_context(
+                user_question,
+                top_k=RETRIEVAL_TOP_K,
+                slide_ids=[context_slide_id] if context_slide_id else None
+            )
+        
+        pinned_context = "" if passages else slide_content
+        system_prompt = self._get_system_prompt(pinned_context, conversation.get("summary", ""))
         
         # Build user message
         if user_question:
-            user_message = f"""
-            SLIDE CONTENT:
-            {slide_content}
-            
+            user_message = fill("""
             STUDENT QUESTION:
             {user_question}
             
             Please provide a clear explanation with examples.
-            """
+            """, user_question=user_question.strip())
         else:
-            user_message = f"""
-            SLIDE CONTENT:
-            {slide_content}
-            
+            user_message = compact("""
             Please explain these concepts with:
             1. Clear, concise explanations
             2. Practical numerical examples
             3. Visual descriptions (when applicable)
             4. Real-world applications
-            
-            {"Focus especially on: " + ", ".join(weak_areas) if weak_areas else ""}
-            """
+            """)
         
-        # Add to conversation history
-        self.conversation_history.append({"role": "user", "content": user_message})
+        # Passages and the student's weak areas only accompany the current
+        # turn, so the system prompt (and an "Explain" click by a student with
+        # no weak areas, which background warm-up pre-generates) is the same
+        # for every student studying the slide
+        turn_message = user_message
+        if passages:
+            turn_message = f"RELEVANT SLIDE PASSAGES:\n{passages}\n\n{turn_message}"
+        if weak_areas:
+            turn_message += "\n\n" + fill("""
+            IMPORTANT: The student has shown difficulty with these areas: {weak_areas}
+            Pay special attention to these concepts:
+            - Provide extra examples and practice problems
+            - Break down these topics more thoroughly
+            - Check for understanding more frequently
+            - Offer different explanations or analogies
+            """, weak_areas=", ".join(weak_areas))
         
         try:
-            response = self.client.chat.completions.create(
-                model=AGENT_MODEL,
+            assistant_message = self._chat(
+                "LearnerAgent.teach_concept",
                 messages=[
                     {"role": "system", "content": system_prompt}
-                ] + self.conversation_history,
+                ] + conversation.setdefault("history", []) + [
+                    {"role": "user", "content": turn_message}
+                ],
+                bypass_cache=bypass_cache,
                 temperature=0.7,
                 max_tokens=2000
             )
             
-            assistant_message = response.choices[0].message.content
-            self.conversation_history.append({"role": "assistant", "content": assistant_message})
+            # History keeps only the dialogue, never the slide content
+            conversation["history"].append({"role": "user", "content": user_message})
+            conversation["history"].append({"role": "assistant", "content": assistant_message})
             
-            # Keep conversation history manageable
-            if len(self.conversation_history) > 10:
-                self.conversation_history = self.conversation_history[-10:]
+            self._trim_history(conversation)
             
             return assistant_message
             
         except Exception as e:
             return f"Error in teaching: {str(e)}"
     
-    def _get_system_prompt(self, weak_areas: List[str] = None) -> str:
+    def _get_system_prompt(self, pinned_context: str = "", summary: str = "") -> str:
         """Get system prompt for learner agent"""
         
-        base_prompt = """You are an expert AI tutor who excels at explaining complex concepts clearly 
+        # Static instructions, then the session's pinned slide, then the parts
+        # that change between turns, so each turn shares the longest prefix
+        base_prompt = compact("""You are an expert AI tutor who excels at explaining complex concepts clearly
         and concisely. Your teaching style includes:
-        
         1. Breaking down complex topics into digestible parts
         2. Using numerical examples and step-by-step solutions
         3. Providing real-world analogies and applications
@@ -97,26 +140,72 @@ class LearnerAgent:
         - Explain WHY concepts work, not just HOW
         - Anticipate common misconceptions and address them
         - When describing visual concepts, be detailed and clear
-        """
+        """)
         
-        if weak_areas:
-            base_prompt += f"""
-            
-            IMPORTANT: The student has shown difficulty with these areas: {', '.join(weak_areas)}
-            
-            Pay special attention to these concepts:
-            - Provide extra examples and practice problems
-            - Break down these topics more thoroughly
-            - Check for understanding more frequently
-            - Offer different explanations or analogies
-            """
+        if pinned_context:
+            base_prompt += f"\n\nSLIDE CONTENT (reference material for this whole session):\n{pinned_context.strip()}"
+        
+        if summary:
+            base_prompt += f"\n\nSUMMARY OF EARLIER CONVERSATION:\n{summary.strip()}"
         
         return base_prompt
     
-    def reset_conversation(self):
-        """Reset conversation history"""
-        self.conversation_history = []
+    def _trim_history(self, conversation: Dict[str, Any]):
+        """Fold the oldest turns into the summary until the history fits its token budget"""
+        
+        history = conversation["history"]
+        dropped = []
+        while (len(history) > 2 and
+               sum(count_tokens(m["content"]) for m in history) > TUTOR_HISTORY_TOKEN_BUDGET):
+            # Drop a whole user/assistant exchange at a time
+            dropped.extend(history[:2])
+            history = history[2:]
+        
+        if dropped:
+            conversation["history"] = history
+            conversation["summary"] = self._summarize_turns(dropped, conversation.get("summary", ""))
     
-    def get_conversation_history(self) -> List[Dict[str, str]]:
-        """Get current conversation history"""
-        return self.conversation_history
+    def _summarize_turns(self, turns: List[Dict[str, str]], summary: str = "") -> str:
+        """Merge dropped turns into the running conversation summary"""
+        
+        transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in turns)
+        prompt = fill("""Update the summary of a tutoring session with the turns below.
+        Keep what the student asked, what was explained, and any misunderstandings.
+        Reply with the summary only, in at most {max_words} words.
+        
+        CURRENT SUMMARY:
+        {summary}
+        
+        NEW TURNS:
+        {transcript}""",
+            max_words=TUTOR_SUMMARY_MAX_TOKENS // 2,
+            summary=summary or "(none)",
+            transcript=transcript
+        )
+        
+        try:
+            return self._chat(
+                "LearnerAgent.summarize_history",
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=TUTOR_SUMMARY_MAX_TOKENS
+            )
+        except Exception:
+            # Keep the gist locally rather than losing the turns entirely: the
+            # end of the new turns, then the end of the summary in what is left
+            recent = truncate_to_tokens(transcript, TUTOR_SUMMARY_MAX_TOKENS // 2, keep_end=True)
+            earlier = truncate_to_tokens(summary, TUTOR_SUMMARY_MAX_TOKENS - count_tokens(recent) - 1, keep_end=True)
+            return f"{earlier}\n{recent}".strip()
+
+
+_learner_agent = None
+_learner_lock = threading.Lock()
+
+
+def get_learner_agent() -> LearnerAgent:
+    """Get the process-wide tutor agent (use for_user() to act for a student)"""
+    global _learner_agent
+    with _learner_lock:
+        if _learner_agent is None:
+            _learner_agent = LearnerAgent(user_id="tutor")
+        return _learner_agent
@@ -0,0 +1,284 @@
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional
+from config import METRICS_LATENCY_BUCKETS, METRICS_WINDOW, METRICS_JSONL_PATH, METRICS_PORT
+
+
+class Histogram:
+    """
+    Cumulative bucket counts (for Prometheus export) plus a window of recent
+    samples (for exact percentiles over recent traffic)
+    """
+
+    def __init__(self, buckets: List[float], window: int = 1000):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self._recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self._recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Percentile of the recent window, or None with no samples"""
+        if not self._recent:
+            return None
+        samples = sorted(self._recent)
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class OperationMetrics:
+    """Counters and histograms for one agent operation"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.tokens = {}  # (model, "prompt" or "completion") -> tokens
+        self.models = {}  # model -> calls
+        self.latency = Histogram(METRICS_LATENCY_BUCKETS, METRICS_WINDOW)
+        self.ttft = Histogram(METRICS_LATENCY_BUCKETS, METRICS_WINDOW)
+        self.queue = Histogram(METRICS_LATENCY_BUCKETS, METRICS_WINDOW)
+
+
+class MetricsRegistry:
+    """
+    Process-wide instrumentation for agent calls: per-operation call counts,
+    token usage, queue time, time to first token, total latency, retries and
+    cache hits. Exportable as JSONL events and Prometheus text.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None, event_window: int = 5000):
+        """
+        Args:
+            jsonl_path: File to append one JSON event per call to (disabled when None)
+            event_window: Number of recent events kept in memory for export
+        """
+        self.jsonl_path = jsonl_path
+        self._operations = {}
+        self._events = deque(maxlen=event_window)
+        self._lock = threading.Lock()
+
+    def record_call(self,
+                    operation: str,
+                    model: str,
+                    latency: float,
+                    ttft: Optional[float] = None,
+                    queue_seconds: float = 0.0,
+                    prompt_tokens: int = 0,
+                    completion_tokens: int = 0,
+                    retries: int = 0,
+                    error: Optional[str] = None,
+                    stream: bool = False):
+        """
+        Record one model call (cache hits are recorded separately)
+
+        Args:
+            operation: Name of the agent operation
+            model: Model the request was sent to
+            latency: Seconds from the call starting to the full response
+            ttft: Seconds to the first streamed piece (defaults to latency)
+            queue_seconds: Seconds spent waiting for scheduler admission
+            prompt_tokens: Prompt tokens reported (or estimated for streams)
+            completion_tokens: Completion tokens reported (or estimated)
+            retries: Attempts beyond the first
+            error: Error message when the call failed
+            stream: Whether the response was streamed
+        """
+        event = {
+            "ts": time.time(),
+            "event": "call",
+            "operation": operation,
+            "model": model,
+            "latency": round(latency, 4),
+            "ttft": round(latency if ttft is None else ttft, 4),
+            "queue_seconds": round(queue_seconds, 4),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "retries": retries,
+            "stream": stream,
+            "error": error
+        }
+
+        with self._lock:
+            metrics = self._operation(operation)
+            metrics.calls += 1
+            metrics.retries += retries
+            metrics.models[model] = metrics.models.get(model, 0) + 1
+            if error:
+                metrics.errors += 1
+            else:
+                metrics.latency.observe(latency)
+                metrics.ttft.observe(event["ttft"])
+                for kind, tokens in (("prompt", prompt_tokens), ("completion", completion_tokens)):
+                    metrics.tokens[(model, kind)] = metrics.tokens.get((model, kind), 0) + tokens
+            metrics.queue.observe(queue_seconds)
+            self._append(event)
+
+    def record_cache_hit(self, operation: str, model: str):
+        """Record a request served from the response cache"""
+        with self._lock:
+            self._operation(operation).cache_hits += 1
+            self._append({"ts": time.time(), "event": "cache_hit", "operation": operation, "model": model})
+
+    def record_coalesced(self, operation: str):
+        """Record a request that shared an identical in-flight call"""
+        with self._lock:
+            self._operation(operation).coalesced += 1
+            self._append({"ts": time.time(), "event": "coalesced", "operation": operation})
+
+    def get_summary(self) -> List[Dict[str, Any]]:
+        """
+        Get one row per operation with counts, tokens and latency percentiles
+
+        Returns:
+            Rows sorted by total latency spent, largest first
+        """
+        rows = []
+        with self._lock:
+            for operation, metrics in self._operations.items():
+                requests = metrics.calls + metrics.cache_hits + metrics.coalesced
+                row = {
+                    "operation": operation,
+                    "calls": metrics.calls,
+                    "cache_hit_rate": round(metrics.cache_hits / requests, 3) if requests else 0.0,
+                    "coalesced": metrics.coalesced,
+                    "errors": metrics.errors,
+                    "retries": metrics.retries,
+                    "prompt_tokens": sum(t for (_, kind), t in metrics.tokens.items() if kind == "prompt"),
+                    "completion_tokens": sum(t for (_, kind), t in metrics.tokens.items() if kind == "completion"),
+                    "total_latency": round(metrics.latency.total, 2)
+                }
+                for name, histogram in (("latency", metrics.latency), ("ttft", metrics.ttft), ("queue", metrics.queue)):
+                    for pct in (50, 95, 99):
+                        value = histogram.percentile(pct)
+                        row[f"{name}_p{pct}"] = round(value, 3) if value is not None else None
+                rows.append(row)
+
+        return sorted(rows, key=lambda r: -r["total_latency"])
+
+    def export_jsonl(self) -> str:
+        """Recent call events, one JSON object per line"""
+        with self._lock:
+            return "".join(json.dumps(event) + "\n" for event in self._events)
+
+    def export_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+
+        with self._lock:
+            operations = sorted(self._operations.items())
+
+            for name, help_text, attribute in (
+                ("calls", "Model calls", "calls"),
+                ("errors", "Failed model calls", "errors"),
+                ("retries", "Retried attempts", "retries"),
+                ("cache_hits", "Requests served from the response cache", "cache_hits"),
+                ("coalesced", "Requests that shared an in-flight call", "coalesced")
+            ):
+                lines.append(f"# HELP educanvas_llm_{name}_total {help_text}")
+                lines.append(f"# TYPE educanvas_llm_{name}_total counter")
+                for operation, metrics in operations:
+                    lines.append(f'educanvas_llm_{name}_total{{operation="{operation}"}} {getattr(metrics, attribute)}')
+
+            lines.append("# HELP educanvas_llm_tokens_total Tokens used by model calls")
+            lines.append("# TYPE educanvas_llm_tokens_total counter")
+            for operation, metrics in operations:
+                for (model, kind), tokens in sorted(metrics.tokens.items()):
+                    lines.append(
+                        f'educanvas_llm_tokens_total{{operation="{operation}",model="{model}",kind="{kind}"}} {tokens}'
+                    )
+
+            for name, help_text, attribute in (
+                ("latency", "Total model call latency", "latency"),
+                ("ttft", "Time to first token", "ttft"),
+                ("queue", "Time waiting for scheduler admission", "queue")
+            ):
+                metric = f"educanvas_llm_{name}_seconds"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} histogram")
+                for operation, metrics in operations:
+                    histogram = getattr(metrics, attribute)
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(f'{metric}_bucket{{operation="{operation}",le="{bound}"}} {count}')
+                    lines.append(f'{metric}_bucket{{operation="{operation}",le="+Inf"}} {histogram.count}')
+                    lines.append(f'{metric}_sum{{operation="{operation}"}} {histogram.total:.6f}')
+                    lines.append(f'{metric}_count{{operation="{operation}"}} {histogram.count}')
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self._operations.clear()
+            self._events.clear()
+
+    def _operation(self, operation: str) -> OperationMetrics:
+        """Metrics for an operation, created on first use (caller holds the lock)"""
+        if operation not in self._operations:
+            self._operations[operation] = OperationMetrics()
+        return self._operations[operation]
+
+    def _append(self, event: Dict[str, Any]):
+        """Keep an event for export and append it to the JSONL file (caller holds the lock)"""
+        self._events.append(event)
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(event) + "\n")
+            except OSError as e:
+                print(f"Error writing metrics: {str(e)}")
+
+
+def start_metrics_server(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve GET /metrics in the Prometheus text format from a background thread
+
+    Returns:
+        The running server, or None when the port is taken (e.g. by another app process)
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.export_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    try:
+        server = ThreadingHTTPServer((host, port), Handler)
+    except OSError as e:
+        print(f"Metrics endpoint not started: {str(e)}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-endpoint", daemon=True).start()
+    return server
+
+
+_metrics = MetricsRegistry(jsonl_path=METRICS_JSONL_PATH)
+_metrics_server = start_metrics_server(_metrics, METRICS_PORT) if METRICS_PORT else None
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get the process-wide metrics registry shared by all agents"""
+    return _metrics
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Dict, Any
+from agents.scheduler import get_scheduler
+from agents.resilience import get_resilient_caller
+from config import (
+    MODEL_TIERS,
+    DEFAULT_MODEL_TIER,
+    OPERATION_MODEL_TIERS,
+    MODEL_TIER_FALLBACKS,
+    SLO_FALLBACK_OPERATIONS,
+    ROUTING_SLO_QUEUE_DEPTH,
+    ROUTING_SLO_P95_SECONDS,
+    ROUTING_FALLBACK_HOLD_SECONDS
+)
+
+
+class ModelRouter:
+    """
+    Maps each agent operation to a model tier from configuration. Operations
+    that opt in fall back to a faster tier while the scheduler queue or the
+    operation's p95 latency is over its SLO; the fallback is held for a while
+    so routing does not flap on every request.
+    """
+
+    def __init__(self):
+        self.scheduler = get_scheduler()
+        self.latency = get_resilient_caller().latency
+        self._fallback_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"routed": {}, "fallbacks": 0}
+
+    def route(self, operation: str) -> str:
+        """
+        Choose the model for an operation
+
+        Args:
+            operation: Name of the agent operation, e.g. "LearnerAgent.teach_concept"
+
+        Returns:
+            Model name to send the request to
+        """
+        tier = OPERATION_MODEL_TIERS.get(operation, DEFAULT_MODEL_TIER)
+
+        if operation in SLO_FALLBACK_OPERATIONS and tier in MODEL_TIER_FALLBACKS and self._over_slo(operation):
+            tier = MODEL_TIER_FALLBACKS[tier]
+            with self._lock:
+                self._stats["fallbacks"] += 1
+
+        with self._lock:
+            self._stats["routed"][tier] = self._stats["routed"].get(tier, 0) + 1
+
+        return MODEL_TIERS[tier]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counts per tier and the number of SLO fallbacks"""
+        with self._lock:
+            stats = {"routed": dict(self._stats["routed"]), "fallbacks": self._stats["fallbacks"]}
+            stats["degraded"] = time.monotonic() < self._fallback_until
+        return stats
+
+    def _over_slo(self, operation: str) -> bool:
+        """Whether the endpoint is currently too slow for the operation's usual tier"""
+        now = time.monotonic()
+
+        with self._lock:
+            if now < self._fallback_until:
+                return True
+
+        p95 = self.latency.percentile(operation, 95)
+        over = (
+            self.scheduler.queue_depth() > ROUTING_SLO_QUEUE_DEPTH or
+            (p95 is not None and p95 > ROUTING_SLO_P95_SECONDS)
+        )
+
+        if over:
+            with self._lock:
+                self._fallback_until = now + ROUTING_FALLBACK_HOLD_SECONDS
+        return over
+
+
+_model_router = ModelRouter()
+
+
+def get_model_router() -> ModelRouter:
+    """Get the process-wide model router shared by all agents"""
+    return _model_router
@@ -0,0 +1,53 @@
+import json
+import re
+from functools import lru_cache
+from typing import Any
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+@lru_cache(maxsize=256)
+def compact(template: str) -> str:
+    """
+    Normalize the whitespace of a prompt template written as an indented
+    triple-quoted string: strip every line and collapse runs of blank lines
+
+    Args:
+        template: Prompt text authored in source code
+
+    Returns:
+        The same text without indentation or trailing blank space
+    """
+    lines = []
+    for line in template.strip().splitlines():
+        line = line.strip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def fill(template: str, **values: Any) -> str:
+    """
+    Compact a template, then substitute its {name} placeholders
+
+    Values are inserted verbatim (slide text, student answers and similar
+    content keep their own formatting). Braces that do not form a known
+    placeholder, such as JSON examples, are left alone, so templates need no
+    brace escaping.
+
+    Args:
+        template: Prompt template with {name} placeholders
+        **values: Placeholder values
+
+    Returns:
+        Prompt text ready to send
+    """
+    return _PLACEHOLDER.sub(
+        lambda m: str(values[m.group(1)]) if m.group(1) in values else m.group(0),
+        compact(template)
+    )
+
+
+def compact_json(value: Any) -> str:
+    """Serialize a value for a prompt without indentation"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
@@ -1,46 +1,76 @@
-from config import get_openai_client, DEFAULT_MODEL
-from typing import List, Dict, Any
-import json
+from config import QUIZ_CONTEXT_TOKEN_BUDGET, QUIZ_CHUNK_TOKENS, QUIZ_MAP_CONCURRENCY, QUIZ_CANDIDATE_OVERSAMPLE
+from agents.base_agent import BaseAgent
+from agents.prompts import compact, fill
+from agents.validation import QUESTION_SCHEMAS, CONVERSATIONAL_QUESTION_SCHEMA
+from utils.tokens import count_tokens, chunk_text
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Iterator
+import math
+import re
 
-class QuizGeneratorAgent:
+class QuizGeneratorAgent(BaseAgent):
     """Agent responsible for generating quizzes based on learning objectives"""
     
-    def __init__(self):
-        self.client = get_openai_client()
-    
     def generate_quiz(self, 
                      slide_content: str, 
                      learning_objectives: str, 
                      quiz_type: str,
-                     num_questions: int = 5) -> Dict[str, Any]:
+                     num_questions: int = 5,
+                     bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Generate a quiz based on slide content and learning objectives
         
+        Content larger than QUIZ_CONTEXT_TOKEN_BUDGET is generated map-reduce
+        style (see _generate_quiz_chunked) instead of in a single request.
+        Questions that fail the quiz type's schema are dropped and only the
+        missing number is requested again.
+        
         Args:
             slide_content: Content from selected slides
             learning_objectives: Instructor's learning objectives
             quiz_type: Type of quiz (MCQ, Conversational, Long Answer)
             num_questions: Number of questions to generate
+            bypass_cache: Skip cached quizzes and ask the model again (e.g. on regenerate)
         
         Returns:
             Dictionary containing quiz questions with objectives
         """
         
         system_prompt = self._get_system_prompt(quiz_type)
+        
+        schema = QUESTION_SCHEMAS.get(quiz_type, CONVERSATIONAL_QUESTION_SCHEMA)
+        
+        if count_tokens(slide_content) > QUIZ_CONTEXT_TOKEN_BUDGET:
+            return self._generate_quiz_chunked(
+                system_prompt, slide_content, learning_objectives, num_questions, bypass_cache, schema
+            )
+        
         user_prompt = self._build_user_prompt(slide_content, learning_objectives, num_questions)
         
         try:
-            response = self.client.chat.completions.create(
-                model=DEFAULT_MODEL,
+            content = self._chat(
+                "QuizGeneratorAgent.generate_quiz",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
+                bypass_cache=bypass_cache,
+                validate=self._has_items(schema, num_questions),
                 temperature=0.7,
                 response_format={"type": "json_object"}
             )
             
-            quiz_data = json.loads(response.choices[0].message.content)
+            quiz_data = self.validator.parse(content)
+            if not isinstance(quiz_data, dict):
+                quiz_data = {"questions": quiz_data}
+            
+            questions = self._valid_items(quiz_data.get("questions", []), schema)
+            quiz_data["questions"] = self._top_up_questions(
+                system_prompt, slide_content, learning_objectives, questions, num_questions, schema
+            )
+            
+            if not quiz_data["questions"]:
+                quiz_data["error"] = "Failed to generate quiz: no valid questions returned"
             return quiz_data
             
         except Exception as e:
@@ -49,10 +79,195 @@ class QuizGeneratorAgent:
                 "questions": []
             }
     
+    def stream_quiz(self,
+                    slide_content: str,
+                    learning_objectives: str,
+                    quiz_type: str,
+                    num_questions: int = 5,
+                    bypass_cache: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Generate a quiz, yielding each question as soon as it is complete
+        
+        Args:
+            slide_content: Content from selected slides
+            learning_objectives: Instructor's learning objectives
+            quiz_type: Type of quiz (MCQ, Conversational, Long Answer)
+            num_questions: Number of questions to generate
+            bypass_cache: Skip cached quizzes and ask the model again
+        
+        Yields:
+            Question dictionaries; on failure a final {"error": ...} item
+        """
+        
+        # Oversized content is generated map-reduce style; its questions arrive together
+        if count_tokens(slide_content) > QUIZ_CONTEXT_TOKEN_BUDGET:
+            quiz_data = self.generate_quiz(
+                slide_content, learning_objectives, quiz_type, num_questions, bypass_cache
+            )
+            yield from quiz_data.get('questions', [])
+            if 'error' in quiz_data:
+                yield {"error": quiz_data['error']}
+            return
+        
+        system_prompt = self._get_system_prompt(quiz_type)
+        user_prompt = self._build_user_prompt(slide_content, learning_objectives, num_questions)
+        schema = QUESTION_SCHEMAS.get(quiz_type, CONVERSATIONAL_QUESTION_SCHEMA)
+        
+        try:
+            questions = []
+            for question in self._stream_json_items(
+                "QuizGeneratorAgent.generate_quiz",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                schema=schema,
+                bypass_cache=bypass_cache,
+                wanted=num_questions,
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            ):
+                questions.append(question)
+                yield question
+            
+            # Invalid questions were dropped; ask only for the ones still missing
+            yield from self._top_up_questions(
+                system_prompt, slide_content, learning_objectives, questions, num_questions, schema
+            )[len(questions):]
+        except Exception as e:
+            yield {"error": f"Failed to generate quiz: {str(e)}"}
+    
+    def _generate_quiz_chunked(self,
+                               system_prompt: str,
+                               slide_content: str,
+                               learning_objectives: str,
+                               num_questions: int,
+                               bypass_cache: bool = False,
+                               schema: Dict[str, Any] = None) -> Dict[str, Any]:
+        """
+        Generate a quiz over content that exceeds the context budget
+        
+        The content is split into chunks, candidate questions are generated for
+        every chunk concurrently (map), and the candidates are merged locally down
+        to num_questions while covering each learning objective (reduce).
+        
+        Args:
+            system_prompt: System prompt for the quiz type
+            slide_content: Content from selected slides
+            learning_objectives: Instructor's learning objectives
+            num_questions: Number of questions to return
+            bypass_cache: Skip cached chunk results and ask the model again
+            schema: Question schema; invalid candidates are dropped
+        
+        Returns:
+            Dictionary containing quiz questions and the number of chunks used
+        """
+        
+        chunks = chunk_text(slide_content, QUIZ_CHUNK_TOKENS)
+        chunk_tokens = [count_tokens(chunk) for chunk in chunks]
+        total_tokens = sum(chunk_tokens) or 1
+        target = math.ceil(num_questions * QUIZ_CANDIDATE_OVERSAMPLE)
+        
+        def generate_candidates(chunk: str, tokens: int) -> List[Dict[str, Any]]:
+            # Each chunk contributes candidates in proportion to its size
+            share = max(1, math.ceil(target * tokens / total_tokens))
+            content = self._chat(
+                "QuizGeneratorAgent.generate_quiz_chunk",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": self._build_user_prompt(chunk, learning_objectives, share)}
+                ],
+                bypass_cache=bypass_cache,
+                validate=self._has_items(schema) if schema else None,
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
+            data = self.validator.parse(content)
+            return self._valid_items(data.get("questions", []) if isinstance(data, dict) else data, schema)
+        
+        candidates = []
+        errors = []
+        
+        with ThreadPoolExecutor(max_workers=QUIZ_MAP_CONCURRENCY) as pool:
+            futures = [pool.submit(generate_candidates, c, t) for c, t in zip(chunks, chunk_tokens)]
+            for future in futures:
+                try:
+                    candidates.append(future.result())
+                except Exception as e:
+                    errors.append(str(e))
+        
+        if not any(candidates):
+            return {
+                "error": f"Failed to generate quiz: {errors[0] if errors else 'no questions returned'}",
+                "questions": []
+            }
+        
+        return {
+            "questions": self._select_questions(candidates, learning_objectives, num_questions),
+            "chunks": len(chunks)
+        }
+    
+    def _select_questions(self,
+                          candidates: List[List[Dict[str, Any]]],
+                          learning_objectives: str,
+                          num_questions: int) -> List[Dict[str, Any]]:
+        """
+        Merge per-chunk candidates into a quiz covering every learning objective
+        
+        Args:
+            candidates: Candidate questions per chunk, in content order
+            learning_objectives: Instructor's learning objectives (one per line)
+            num_questions: Number of questions to select
+        
+        Returns:
+            Selected questions
+        """
+        
+        objectives = [
+            line.strip().lstrip("-*•0123456789.) \t")
+            for line in learning_objectives.splitlines()
+            if line.strip()
+        ] or [learning_objectives]
+        objective_words = [self._words(objective) for objective in objectives]
+        
+        # Interleave chunks so every part of the content gets a chance at each objective
+        buckets = [[] for _ in objectives]
+        seen = set()
+        longest = max(len(chunk_questions) for chunk_questions in candidates)
+        
+        for i in range(longest):
+            for chunk_questions in candidates:
+                if i >= len(chunk_questions):
+                    continue
+                
+                question = chunk_questions[i]
+                fingerprint = " ".join(sorted(self._words(question.get('question', ''))))
+                if not fingerprint or fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                
+                words = self._words(f"{question.get('learning_objective', '')} {question.get('question', '')}")
+                best = max(range(len(objectives)), key=lambda j: len(words & objective_words[j]))
+                buckets[best].append(question)
+        
+        # Round-robin across objectives until the quiz is full
+        selected = []
+        while len(selected) < num_questions and any(buckets):
+            for bucket in buckets:
+                if bucket and len(selected) < num_questions:
+                    selected.append(bucket.pop(0))
+        
+        return selected
+    
+    @staticmethod
+    def _words(text: str) -> set:
+        """Lowercase word set used for overlap matching"""
+        return set(re.findall(r"[a-z0-9]+", text.lower()))
+    
     def _get_system_prompt(self, quiz_type: str) -> str:
         """Get system prompt based on quiz type"""
         
-        base_prompt = """You are an expert educational assessment designer. Your task is to create 
+        base_prompt = """You are an expert educational assessment designer. Your task is to create
         high-quality, pedagogically sound quiz questions that align with specific learning objectives.
         
         For each question, you must provide:
@@ -62,7 +277,7 @@ class QuizGeneratorAgent:
         """
         
         if quiz_type == "Multiple Choice (MCQ)":
-            return base_prompt + """
+            return compact(base_prompt + """
             
             Create multiple-choice questions with:
             - 4 answer options (A, B, C, D)
@@ -70,79 +285,90 @@ class QuizGeneratorAgent:
             - Plausible distractors that test common misconceptions
             - Clear, unambiguous wording
             
-            Return JSON format:
-            {
-                "questions": [
-                    {
-                        "question": "Question text",
-                        "options": ["A. Option 1", "B. Option 2", "C. Option 3", "D. Option 4"],
-                        "correct_answer": "A",
-                        "learning_objective": "Specific objective this tests",
-                        "cognitive_level": "Apply",
-                        "explanation": "Why this is the correct answer"
-                    }
-                ]
-            }
-            """
+            Return JSON:
+            {"questions": [{"question": "Question text",
+            "options": ["A. Option 1", "B. Option 2", "C. Option 3", "D. Option 4"],
+            "correct_answer": "A",
+            "learning_objective": "Specific objective this tests",
+            "cognitive_level": "Apply",
+            "explanation": "Why this is the correct answer"}]}
+            """)
         
         elif quiz_type == "Conversational":
-            return base_prompt + """
+            return compact(base_prompt + """
             
             Create open-ended conversational questions that:
             - Encourage critical thinking and discussion
             - Allow for multiple valid approaches
             - Test deep understanding rather than memorization
             
-            Return JSON format:
-            {
-                "questions": [
-                    {
-                        "question": "Question text",
-                        "learning_objective": "Specific objective this tests",
-                        "cognitive_level": "Analyze",
-                        "sample_answer": "Example of a good response",
-                        "key_points": ["Point 1", "Point 2"]
-                    }
-                ]
-            }
-            """
+            Return JSON:
+            {"questions": [{"question": "Question text",
+            "learning_objective": "Specific objective this tests",
+            "cognitive_level": "Analyze",
+            "sample_answer": "Example of a good response",
+            "key_points": ["Point 1", "Point 2"]}]}
+            """)
         
         else:  # Long Answer
-            return base_prompt + """
+            return compact(base_prompt + """
             
             Create long-answer questions that:
             - Require detailed, structured responses
             - Test comprehensive understanding
             - Include specific rubric criteria
             
-            Return JSON format:
-            {
-                "questions": [
-                    {
-                        "question": "Question text",
-                        "learning_objective": "Specific objective this tests",
-                        "cognitive_level": "Evaluate",
-                        "rubric": {
-                            "excellent": "Criteria for excellent answer",
-                            "good": "Criteria for good answer",
-                            "needs_improvement": "Criteria for needs improvement"
-                        },
-                        "expected_length": "2-3 paragraphs"
-                    }
-                ]
-            }
-            """
+            Return JSON:
+            {"questions": [{"question": "Question text",
+            "learning_objective": "Specific objective this tests",
+            "cognitive_level": "Evaluate",
+            "rubric": {"excellent": "Criteria for excellent answer", "good": "Criteria for good answer",
+            "needs_improvement": "Criteria for needs improvement"},
+            "expected_length": "2-3 paragraphs"}]}
+            """)
+    
+    def _top_up_questions(self,
+                          system_prompt: str,
+                          slide_content: str,
+                          learning_objectives: str,
+                          questions: List[Dict[str, Any]],
+                          num_questions: int,
+                          schema: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Request only the questions still missing after invalid ones were dropped"""
+        
+        def build_messages(missing: int) -> List[Dict[str, str]]:
+            user_prompt = self._build_user_prompt(slide_content, learning_objectives, missing)
+            if questions:
+                asked = "\n".join(f"- {q['question']}" for q in questions)
+                user_prompt += f"\n\nDo not repeat these existing questions:\n{asked}"
+            return [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+        
+        return self._top_up_items(
+            "QuizGeneratorAgent.generate_quiz",
+            questions,
+            num_questions,
+            build_messages,
+            schema,
+            temperature=0.7,
+            response_format={"type": "json_object"}
+        )
     
     def _build_user_prompt(self, slide_content: str, learning_objectives: str, num_questions: int) -> str:
         """Build user prompt with content and objectives"""
-        return f"""
+        return fill("""
         Based on the following slide content and learning objectives, generate {num_questions} quiz questions.
-        
-        SLIDE CONTENT:
-        {slide_content}
+        Ensure each question directly maps to a learning objective and tests the appropriate cognitive level.
         
         LEARNING OBJECTIVES:
         {learning_objectives}
         
-        Ensure each question directly maps to a learning objective and tests the appropriate cognitive level.
-        """
+        SLIDE CONTENT:
+        {slide_content}
+        """,
+            num_questions=num_questions,
+            learning_objectives=learning_objectives.strip(),
+            slide_content=slide_content.strip()
+        )
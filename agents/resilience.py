@@ -0,0 +1,241 @@
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+from agents.scheduler import QueueTimeoutError
+from config import (
+    LLM_CALL_DEADLINES,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    CIRCUIT_BREAKER_FAILURES,
+    CIRCUIT_BREAKER_RESET_SECONDS,
+    HEDGED_OPERATIONS,
+    HEDGE_MIN_DELAY
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the LLM endpoint is failing and calls are short-circuited"""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient upstream failures worth retrying: timeouts, connection errors, 429s and 5xx"""
+    if isinstance(error, (APITimeoutError, APIConnectionError, RateLimitError, TimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Opens after consecutive transient failures so callers fail fast instead of
+    queueing behind a dead endpoint; lets a single probe through after the
+    reset timeout and closes again when it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._probing:
+                self._probing = True  # Half-open: let one call test the endpoint
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self):
+        """Let another call probe when this one never reached the endpoint (e.g. it timed out in the queue)"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self._probing else "open"
+
+
+class LatencyTracker:
+    """Rolling window of recent successful call latencies per operation"""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(operation, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, operation: str, pct: float) -> Optional[float]:
+        """Latency percentile for an operation, or None with too few samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(operation, ()))
+
+        if len(samples) < 20:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+
+class ResilientCaller:
+    """
+    Shared resilience layer for agent calls: per-call deadlines, bounded
+    retries with exponential backoff and full jitter, a circuit breaker, and
+    optional hedging (a duplicate request once the first one is slower than
+    the operation's p95; the first response wins).
+    """
+
+    def __init__(self):
+        self.breaker = CircuitBreaker(CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS)
+        self.latency = LatencyTracker()
+        self._stats = {"calls": 0, "retries": 0, "failures": 0, "short_circuited": 0, "hedges": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def call(self, operation: str, attempt: Callable[[float], Any], hedge: bool = None) -> Any:
+        """
+        Run attempt with the resilience policy for an operation
+
+        Args:
+            operation: Name of the agent operation
+            attempt: Function taking the seconds left before the deadline and
+                issuing one request
+            hedge: Hedge the request (defaults to membership in HEDGED_OPERATIONS)
+
+        Returns:
+            The first successful attempt's result
+        """
+        if hedge is None:
+            hedge = operation in HEDGED_OPERATIONS
+
+        deadline = time.monotonic() + LLM_CALL_DEADLINES.get(operation, LLM_CALL_DEADLINES["default"])
+        self._count("calls")
+        last_error = None
+
+        for attempt_number in range(LLM_MAX_RETRIES + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if not self.breaker.allow():
+                self._count("short_circuited")
+                raise CircuitOpenError("AI service is temporarily unavailable, please try again shortly")
+
+            started = time.monotonic()
+            try:
+                result = self._hedged(operation, attempt, remaining) if hedge else attempt(remaining)
+            except QueueTimeoutError:
+                # The deadline ran out locally; nothing reached the endpoint
+                self.breaker.release_probe()
+                self._count("failures")
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()  # The endpoint answered; the request itself was bad
+                    raise
+
+                self.breaker.record_failure()
+                last_error = e
+
+                if attempt_number == LLM_MAX_RETRIES:
+                    break
+
+                self._count("retries")
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt_number))
+                time.sleep(min(backoff, max(0.0, deadline - time.monotonic())))
+                continue
+
+            self.breaker.record_success()
+            self.latency.record(operation, time.monotonic() - started)
+            return result
+
+        self._count("failures")
+        if last_error is not None:
+            raise last_error
+        raise TimeoutError(f"{operation} exceeded its deadline")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get retry, failure and hedging counters plus the breaker state"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["circuit"] = self.breaker.state
+        return stats
+
+    def _hedged(self, operation: str, attempt: Callable[[float], Any], timeout: float) -> Any:
+        """Send a duplicate request if the first is slower than p95; first success wins"""
+        results = queue.Queue()
+        started = time.monotonic()
+
+        def run(is_hedge: bool):
+            try:
+                results.put((True, attempt(max(0.1, timeout - (time.monotonic() - started))), is_hedge))
+            except Exception as e:
+                results.put((False, e, is_hedge))
+
+        threading.Thread(target=run, args=(False,), daemon=True).start()
+        delay = min(self.latency.percentile(operation, 95) or HEDGE_MIN_DELAY, timeout)
+
+        try:
+            ok, value, _ = results.get(timeout=delay)
+            if ok:
+                return value
+            raise value
+        except queue.Empty:
+            pass
+
+        self._count("hedges")
+        threading.Thread(target=run, args=(True,), daemon=True).start()
+
+        error = None
+        for _ in range(2):
+            try:
+                ok, value, is_hedge = results.get(timeout=max(0.0, timeout - (time.monotonic() - started)))
+            except queue.Empty:
+                break
+            if ok:
+                if is_hedge:
+                    self._count("hedge_wins")
+                return value
+            error = value
+
+        raise error or TimeoutError(f"{operation} exceeded its deadline")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+_resilient_caller = ResilientCaller()
+
+
+def get_resilient_caller() -> ResilientCaller:
+    """Get the process-wide resilience layer shared by all agents"""
+    return _resilient_caller
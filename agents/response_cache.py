@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_DIR
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Normalize chat messages so cosmetic whitespace differences share a cache key
+
+    Args:
+        messages: Chat messages sent to the model
+
+    Returns:
+        Messages with collapsed whitespace in their content
+    """
+    return [
+        {"role": m.get("role", ""), "content": " ".join(str(m.get("content", "")).split())}
+        for m in messages
+    ]
+
+
+def make_cache_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """
+    Build a stable key from the model, request parameters and normalized messages
+
+    Args:
+        model: Model name the request is sent to
+        messages: Chat messages sent to the model
+        params: Remaining request parameters (temperature, max_tokens, ...)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    payload = json.dumps(
+        {"model": model, "params": params, "messages": normalize_messages(messages)},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for agent responses: an in-memory LRU in front of an optional
+    on-disk directory of JSON entries. Entries expire after their TTL.
+    """
+
+    def __init__(self, max_entries: int = 512, disk_dir: Optional[str] = None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "saved_latency_seconds": 0.0,
+            "saved_tokens": 0
+        }
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached entry, promoting disk hits into memory
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Entry dict with 'content', 'latency' and 'tokens', or None on miss
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry["expires_at"] <= now:
+                del self._entries[key]
+                entry = None
+
+            if entry:
+                self._entries.move_to_end(key)
+                self._record_hit(entry, "memory_hits")
+                return entry
+
+        entry = self._read_disk(key)
+        if entry and entry["expires_at"] > now:
+            with self._lock:
+                self._insert(key, entry)
+                self._record_hit(entry, "disk_hits")
+            return entry
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, content: str, ttl: float, latency: float = 0.0, tokens: int = 0):
+        """
+        Store a response
+
+        Args:
+            key: Cache key from make_cache_key
+            content: Response text returned by the model
+            ttl: Seconds until the entry expires
+            latency: Seconds the original call took (reported as saved on hits)
+            tokens: Tokens the original call used (reported as saved on hits)
+        """
+        entry = {
+            "content": content,
+            "created_at": time.time(),
+            "expires_at": time.time() + ttl,
+            "latency": latency,
+            "tokens": tokens
+        }
+
+        with self._lock:
+            self._insert(key, entry)
+            self._stats["stores"] += 1
+
+        self._write_disk(key, entry)
+
+    def invalidate(self, key: str):
+        """Remove a single entry from both tiers"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+        if self.disk_dir:
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        """Remove all entries from both tiers"""
+        with self._lock:
+            self._entries.clear()
+
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith(".json"):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters plus saved latency and tokens"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def export_state(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Unexpired in-memory entries, least recently used first (for snapshots)"""
+        now = time.time()
+        with self._lock:
+            return [(key, dict(entry)) for key, entry in self._entries.items() if entry["expires_at"] > now]
+
+    def load_state(self, state: List[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Restore entries from export_state(), keeping entries already present
+
+        Returns:
+            Number of entries restored
+        """
+        now = time.time()
+        restored = 0
+        with self._lock:
+            for key, entry in state:
+                if entry["expires_at"] > now and key not in self._entries:
+                    self._insert(key, entry)
+                    restored += 1
+        return restored
+
+    def _insert(self, key: str, entry: Dict[str, Any]):
+        """Insert into the LRU, evicting the oldest entries (caller holds the lock)"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _record_hit(self, entry: Dict[str, Any], tier: str):
+        """Update hit counters (caller holds the lock)"""
+        self._stats["hits"] += 1
+        self._stats[tier] += 1
+        self._stats["saved_latency_seconds"] += entry.get("latency", 0.0)
+        self._stats["saved_tokens"] += entry.get("tokens", 0)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+
+        try:
+            with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        if not self.disk_dir:
+            return
+
+        # Write to a temp file first so readers never see a partial entry
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error writing response cache entry: {str(e)}")
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide response cache shared by all agents"""
+    global _response_cache
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                    disk_dir=RESPONSE_CACHE_DIR
+                )
+
+    return _response_cache
@@ -1,16 +1,18 @@
-from config import get_openai_client, AGENT_MODEL, PASSING_THRESHOLD
+from config import PASSING_THRESHOLD, GRADING_MODE, GRADING_QUESTION_CONCURRENCY, QUESTION_MAX_POINTS, SCHEMA_REREQUEST_ATTEMPTS
+from agents.base_agent import BaseAgent
+from agents.prompts import compact, fill, compact_json
+from agents.grade_cache import get_grade_cache
+from agents.validation import GRADE_SCHEMA, QUESTION_SCORE_SCHEMA, ANALYSIS_SCHEMA, _coerce
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
-import json
+import re
 
-class ReviewerAgent:
+class ReviewerAgent(BaseAgent):
     """
     Agent responsible for analyzing student quiz performance and providing feedback
     Identifies weak areas and communicates with LearnerAgent for adaptive teaching
     """
     
-    def __init__(self):
-        self.client = get_openai_client()
-    
     def analyze_quiz_performance(self,
                                 quiz_questions: List[Dict[str, Any]],
                                 student_answers: List[Dict[str, Any]],
@@ -24,15 +26,17 @@ class ReviewerAgent:
             quiz_type: Type of quiz (MCQ, Conversational, Long Answer)
         
         Returns:
-            Analysis with score, feedback, weak areas, and recommendations
+            Analysis with score, feedback, weak areas, and recommendations;
+            question scores missing from the model's analysis are graded
+            individually instead of repeating the whole analysis
         """
         
         system_prompt = self._get_system_prompt(quiz_type)
         user_prompt = self._build_analysis_prompt(quiz_questions, student_answers)
         
         try:
-            response = self.client.chat.completions.create(
-                model=AGENT_MODEL,
+            content = self._chat(
+                "ReviewerAgent.analyze_quiz_performance",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -41,10 +45,21 @@ class ReviewerAgent:
                 response_format={"type": "json_object"}
             )
             
-            analysis = json.loads(response.choices[0].message.content)
+            analysis, _ = self.validator.validate(self.validator.parse(content), ANALYSIS_SCHEMA)
+            if analysis is None:
+                raise ValueError("analysis is not a JSON object")
+            
+            analysis['question_scores'] = self._complete_question_scores(
+                analysis.get('question_scores', []), quiz_questions, student_answers
+            )
+            
+            if 'overall_score' not in analysis:
+                earned = sum(score['points_earned'] for score in analysis['question_scores'])
+                possible = sum(score['max_points'] for score in analysis['question_scores']) or 1.0
+                analysis['overall_score'] = round(earned / possible * 100, 1)
             
             # Determine if feedback should be sent to learner agent
-            overall_score = analysis.get('overall_score', 0)
+            overall_score = analysis['overall_score']
             analysis['needs_remediation'] = overall_score < PASSING_THRESHOLD
             
             return analysis
@@ -72,44 +87,55 @@ class ReviewerAgent:
             Grading details with points, feedback, and improvements
         """
         
-        prompt = f"""Grade this answer and provide detailed feedback:
-        
-        QUESTION:
-        {question.get('question', '')}
-        
-        CORRECT ANSWER/RUBRIC:
-        {json.dumps(question.get('correct_answer') or question.get('rubric'), indent=2)}
-        
+        # Static instructions first so the prefix is identical across requests
+        prompt = fill("""Grade the student answer below and provide detailed feedback.
+        Return JSON:
+        {"points_earned": <number>, "max_points": <number>, "percentage": <percentage>,
+        "feedback": {"strengths": ["What the student did well"], "weaknesses": ["What was missing or incorrect"],
+        "points_awarded_for": ["Specific aspects that earned points"], "points_deducted_for": ["Specific aspects that lost points"]},
+        "suggested_answer": "An improved version of the answer",
+        "concepts_to_review": ["Specific concepts to study"]}
+        
+        MAX POINTS: {max_points}
+        QUESTION: {question}
+        CORRECT ANSWER/RUBRIC: {key}
         STUDENT ANSWER:
-        {student_answer}
-        
-        Maximum Points: {max_points}
-        
-        Provide grading in JSON format:
-        {{
-            "points_earned": <number>,
-            "max_points": {max_points},
-            "percentage": <percentage>,
-            "feedback": {{
-                "strengths": ["What the student did well"],
-                "weaknesses": ["What was missing or incorrect"],
-                "points_awarded_for": ["Specific aspects that earned points"],
-                "points_deducted_for": ["Specific aspects that lost points"]
-            }},
-            "suggested_answer": "An improved version of the answer",
-            "concepts_to_review": ["Specific concepts to study"]
-        }}
-        """
+        {answer}""",
+            max_points=max_points,
+            question=question.get('question', ''),
+            key=compact_json(question.get('correct_answer') or question.get('rubric')),
+            answer=student_answer
+        )
         
         try:
-            response = self.client.chat.completions.create(
-                model=AGENT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
+            problems = []
+            for attempt in range(1 + SCHEMA_REREQUEST_ATTEMPTS):
+                if attempt:
+                    self.validator.record_rerequest()
+                
+                content = self._chat(
+                    "ReviewerAgent.grade_individual_answer",
+                    messages=[{"role": "user", "content": prompt}],
+                    # A re-request must not be answered with the same cached response
+                    bypass_cache=attempt > 0,
+                    temperature=0.2,
+                    response_format={"type": "json_object"}
+                )
+                
+                grade = self.validator.parse(content)
+                if isinstance(grade, dict) and grade.get('max_points') in (None, ""):
+                    grade['max_points'] = max_points
+                
+                grade, problems = self.validator.validate(grade, GRADE_SCHEMA)
+                if grade is not None:
+                    grade['percentage'] = round(grade['points_earned'] / grade['max_points'] * 100, 1)
+                    return grade
             
-            return json.loads(response.choices[0].message.content)
+            return {
+                "error": f"Grading failed: {', '.join(problems)}",
+                "points_earned": 0,
+                "max_points": max_points
+            }
             
         except Exception as e:
             return {
@@ -118,6 +144,347 @@ class ReviewerAgent:
                 "max_points": max_points
             }
     
+    def grade_submission(self,
+                         quiz: Dict[str, Any],
+                         student_answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Grade a quiz submission using the configured GRADING_MODE
+        
+        Args:
+            quiz: Quiz with its id, type and questions
+            student_answers: Student's answers to the questions
+        
+        Returns:
+            Analysis in the same format as analyze_quiz_performance
+        """
+        
+        if GRADING_MODE == "per_question":
+            return self.grade_by_question(quiz, student_answers)
+        
+        return self.grade_whole_quiz(quiz, student_answers)
+    
+    def grade_whole_quiz(self,
+                         quiz: Dict[str, Any],
+                         student_answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Grade a submission with a whole-quiz analysis, reusing memoized grades
+        
+        Answers graded before (the same answer to the same question and answer
+        key, from another student or an earlier grading of this submission)
+        are served from the grade memo, and only the remaining answers are sent
+        to the model; their scores are memoized in turn. A submission with no
+        memoized answers gets exactly the model's analysis, and one whose
+        answers are all memoized needs no model call.
+        
+        Args:
+            quiz: Quiz with its id, type and questions
+            student_answers: Student's answers to the questions
+        
+        Returns:
+            Analysis in the same format as analyze_quiz_performance
+        """
+        
+        questions = quiz.get('questions', [])
+        count = min(len(questions), len(student_answers))
+        cache = get_grade_cache()
+        keys = [
+            cache.make_key(f"{quiz.get('id', '')}/{index}", questions[index], student_answers[index].get('answer', ''))
+            for index in range(count)
+        ]
+        
+        grades = {}
+        for index, key in enumerate(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                grades[index] = dict(cached, cached=True)
+        pending = [index for index in range(count) if index not in grades]
+        
+        if not pending:
+            return dict(self._aggregate_grades(questions, [grades[index] for index in range(count)]),
+                        grading_mode="whole_quiz")
+        
+        analysis = self.analyze_quiz_performance(
+            [questions[index] for index in pending],
+            [student_answers[index] for index in pending],
+            quiz.get('type', '')
+        )
+        if 'error' in analysis:
+            return analysis
+        
+        # Scores cover exactly the pending answers, in order (missing ones were graded individually)
+        scores = dict(zip(pending, analysis['question_scores']))
+        for index, score in scores.items():
+            cache.set(keys[index], {
+                "points_earned": score['points_earned'],
+                "max_points": score['max_points'],
+                "percentage": round(score['points_earned'] / score['max_points'] * 100, 1),
+                "feedback": score.get('feedback', ''),
+                "concepts_to_review": score.get('concepts_to_review', [])
+            })
+        
+        if not grades:
+            return analysis
+        return self._merge_grades(analysis, questions, grades, scores, count)
+    
+    def grade_by_question(self,
+                          quiz: Dict[str, Any],
+                          student_answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Grade each answer separately and aggregate the results
+        
+        Multiple-choice answers are scored locally. Other answers are graded
+        with grade_individual_answer, memoized by question, answer key version
+        and normalized answer, so identical answers from different students
+        (or unchanged answers on a regrade) reuse one grade.
+        
+        Args:
+            quiz: Quiz with its id, type and questions
+            student_answers: Student's answers to the questions
+        
+        Returns:
+            Analysis in the same format as analyze_quiz_performance
+        """
+        
+        questions = quiz.get('questions', [])
+        answers = [a.get('answer', '') for a in student_answers]
+        
+        def grade(index: int) -> Dict[str, Any]:
+            return self._grade_question(f"{quiz.get('id', '')}/{index}", questions[index], answers[index])
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(GRADING_QUESTION_CONCURRENCY, len(questions)))) as pool:
+            grades = list(pool.map(grade, range(min(len(questions), len(answers)))))
+        
+        errors = [g['error'] for g in grades if 'error' in g]
+        if errors:
+            return {
+                "error": f"Failed to analyze performance: {errors[0]}",
+                "overall_score": 0,
+                "needs_remediation": True
+            }
+        
+        return self._aggregate_grades(questions, grades)
+    
+    def _grade_question(self, question_id: str, question: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        """Grade one answer, from the memo when an identical answer was already graded"""
+        
+        if question.get('options') and question.get('correct_answer'):
+            return self._grade_choice(question, answer)
+        
+        cache = get_grade_cache()
+        key = cache.make_key(question_id, question, answer)
+        cached = cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        
+        def call_grader() -> Dict[str, Any]:
+            grade = self.grade_individual_answer(question, answer, question.get('points', QUESTION_MAX_POINTS))
+            if 'error' not in grade:
+                cache.set(key, grade)
+            return grade
+        
+        # Students submitting the same answer at the same moment share one call
+        grade, shared = self.single_flight.do(f"grade:{key}", call_grader)
+        return dict(grade, cached=shared)
+    
+    def _complete_question_scores(self,
+                                  scores: List[Any],
+                                  questions: List[Dict[str, Any]],
+                                  answers: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate the score entries of a whole-quiz analysis and grade only the
+        questions whose entry is missing or invalid
+        
+        Raises:
+            ValueError: If a missing question cannot be graded
+        """
+        
+        count = min(len(questions), len(answers))
+        valid, _ = self.validator.filter_items(scores, QUESTION_SCORE_SCHEMA)
+        by_number = {}
+        for score in valid:
+            if 1 <= score['question_number'] <= count:
+                by_number.setdefault(score['question_number'], score)
+        
+        missing = [number for number in range(1, count + 1) if number not in by_number]
+        if missing:
+            self.validator.record_rerequest()
+        
+        def grade(number: int) -> Dict[str, Any]:
+            question = questions[number - 1]
+            return self._grade_question(f"analysis/{number}", question, answers[number - 1].get('answer', ''))
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(GRADING_QUESTION_CONCURRENCY, len(missing)))) as pool:
+            for number, result in zip(missing, pool.map(grade, missing)):
+                if 'error' in result:
+                    raise ValueError(result['error'])
+                
+                feedback = self._feedback(result)
+                by_number[number] = {
+                    "question_number": number,
+                    "points_earned": result['points_earned'],
+                    "max_points": result['max_points'],
+                    "feedback": " ".join(feedback['strengths'] + feedback['weaknesses'])
+                }
+        
+        return [by_number[number] for number in sorted(by_number)]
+    
+    def _grade_choice(self, question: Dict[str, Any], answer: str) -> Dict[str, Any]:
+        """Score a multiple-choice answer locally against its answer key"""
+        
+        max_points = question.get('points', QUESTION_MAX_POINTS)
+        correct = str(question['correct_answer']).strip()
+        selected = str(answer or '').strip()
+        
+        def letter(text: str) -> str:
+            match = re.match(r"^\(?([A-Za-z])[\.\):]?(\s|$)", text)
+            return match.group(1).upper() if match else ""
+        
+        def text(value: str) -> str:
+            return " ".join(re.sub(r"^\(?[A-Za-z][\.\):]\s+", "", value).lower().split())
+        
+        if letter(correct) or len(correct) == 1:
+            is_correct = bool(selected) and letter(selected) == (letter(correct) or correct.upper())
+        else:
+            is_correct = text(selected) == text(correct)
+        
+        explanation = question.get('explanation', '')
+        objective = question.get('learning_objective')
+        return {
+            "points_earned": max_points if is_correct else 0,
+            "max_points": max_points,
+            "percentage": 100 if is_correct else 0,
+            "feedback": {
+                "strengths": ["Correct answer"] if is_correct else [],
+                "weaknesses": [] if is_correct else [f"The correct answer is {correct}. {explanation}".strip()],
+                "points_awarded_for": [],
+                "points_deducted_for": []
+            },
+            "concepts_to_review": [] if is_correct or not objective else [objective],
+            "cached": False
+        }
+    
+    def _aggregate_grades(self, questions: List[Dict[str, Any]], grades: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-question grades into a quiz analysis"""
+        
+        earned = sum(self._points(g, 'points_earned') for g in grades)
+        possible = sum(self._points(g, 'max_points') for g in grades) or 1.0
+        overall_score = round(earned / possible * 100, 1)
+        
+        question_scores = []
+        weak_areas, strong_areas, recommendations = [], [], []
+        
+        for number, (question, grade) in enumerate(zip(questions, grades), 1):
+            question_scores.append(self._question_score(number, grade))
+            self._collect_areas(question, grade, weak_areas, strong_areas, recommendations)
+        
+        return {
+            "overall_score": overall_score,
+            "question_scores": question_scores,
+            "weak_areas": self._unique(weak_areas),
+            "strong_areas": self._unique(strong_areas),
+            "recommendations": self._unique(recommendations),
+            "overall_feedback": f"You earned {earned:g} of {possible:g} points across {len(grades)} questions.",
+            "grading_mode": "per_question",
+            "needs_remediation": overall_score < PASSING_THRESHOLD
+        }
+    
+    def _merge_grades(self,
+                      analysis: Dict[str, Any],
+                      questions: List[Dict[str, Any]],
+                      grades: Dict[int, Dict[str, Any]],
+                      scores: Dict[int, Dict[str, Any]],
+                      count: int) -> Dict[str, Any]:
+        """
+        Combine a whole-quiz analysis of some answers (scores, by question
+        index) with the memoized grades of the others into one analysis
+        """
+        
+        question_scores = []
+        weak_areas = list(analysis.get('weak_areas', []))
+        strong_areas = list(analysis.get('strong_areas', []))
+        recommendations = list(analysis.get('recommendations', []))
+        
+        for index in range(count):
+            if index in scores:
+                question_scores.append(dict(scores[index], question_number=index + 1))
+            else:
+                question_scores.append(self._question_score(index + 1, grades[index]))
+                self._collect_areas(questions[index], grades[index], weak_areas, strong_areas, recommendations)
+        
+        earned = sum(self._points(score, 'points_earned') for score in question_scores)
+        possible = sum(self._points(score, 'max_points') for score in question_scores) or 1.0
+        overall_score = round(earned / possible * 100, 1)
+        
+        return dict(
+            analysis,
+            overall_score=overall_score,
+            question_scores=question_scores,
+            weak_areas=self._unique(weak_areas),
+            strong_areas=self._unique(strong_areas),
+            recommendations=self._unique(recommendations),
+            needs_remediation=overall_score < PASSING_THRESHOLD
+        )
+    
+    def _question_score(self, number: int, grade: Dict[str, Any]) -> Dict[str, Any]:
+        """Question score entry of an analysis, from one grade"""
+        
+        feedback = self._feedback(grade)
+        return {
+            "question_number": number,
+            "points_earned": self._points(grade, 'points_earned'),
+            "max_points": self._points(grade, 'max_points'),
+            "feedback": " ".join(feedback['strengths'] + feedback['weaknesses']),
+            "cached": grade.get('cached', False)
+        }
+    
+    def _collect_areas(self,
+                       question: Dict[str, Any],
+                       grade: Dict[str, Any],
+                       weak_areas: List[str],
+                       strong_areas: List[str],
+                       recommendations: List[str]):
+        """Add what one grade says about the student's weak and strong areas"""
+        
+        if self._points(grade, 'points_earned') >= self._points(grade, 'max_points'):
+            if question.get('learning_objective'):
+                strong_areas.append(question['learning_objective'])
+        else:
+            weak_areas.extend(grade.get('concepts_to_review', []))
+            recommendations.extend(self._feedback(grade)['weaknesses'])
+    
+    @staticmethod
+    def _feedback(grade: Dict[str, Any]) -> Dict[str, List[str]]:
+        """
+        A grade's feedback as lists of strengths and weaknesses (memoized
+        analysis scores carry plain text, and the schema accepts any dict, so
+        a field may be a string instead of a list)
+        """
+        
+        feedback = grade.get('feedback', {})
+        if not isinstance(feedback, dict):
+            return {"strengths": [], "weaknesses": [str(feedback)] if feedback else []}
+        
+        def items(field: str) -> List[str]:
+            value = _coerce(feedback.get(field) or [], list)
+            return [str(item) for item in value if item] if isinstance(value, list) else [str(value)]
+        
+        return {"strengths": items('strengths'), "weaknesses": items('weaknesses')}
+    
+    @staticmethod
+    def _points(grade: Dict[str, Any], field: str) -> float:
+        try:
+            return float(grade.get(field, 0) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+    
+    @staticmethod
+    def _unique(items: List[str], limit: int = 5) -> List[str]:
+        seen = []
+        for item in items:
+            if item and item not in seen:
+                seen.append(item)
+        return seen[:limit]
+    
     def generate_summary_report(self, analysis: Dict[str, Any]) -> str:
         """
         Generate a comprehensive summary report for the student
@@ -174,17 +541,15 @@ class ReviewerAgent:
     def _get_system_prompt(self, quiz_type: str) -> str:
         """Get system prompt for reviewer agent"""
         
-        return f"""You are an expert educational evaluator and learning analytics specialist.
+        # The quiz type comes last so the rest is a prefix shared by all quiz types
+        return fill("""You are an expert educational evaluator and learning analytics specialist.
         Your role is to:
-        
         1. Fairly and consistently grade student answers
         2. Provide constructive, actionable feedback
         3. Identify specific knowledge gaps and weak areas
         4. Suggest targeted improvements
         5. Recognize strengths and good understanding
         
-        Quiz Type: {quiz_type}
-        
         Grading Principles:
         - Be fair but rigorous
         - Partial credit for partially correct answers
@@ -192,48 +557,30 @@ class ReviewerAgent:
         - Focus on understanding, not just correctness
         - Identify misconceptions, not just errors
         
-        Return analysis in JSON format with:
-        {{
-            "overall_score": <percentage>,
-            "question_scores": [
-                {{
-                    "question_number": 1,
-                    "points_earned": <number>,
-                    "max_points": <number>,
-                    "feedback": "Detailed feedback"
-                }}
-            ],
-            "weak_areas": ["Specific concepts to review"],
-            "strong_areas": ["Concepts well understood"],
-            "recommendations": ["Specific study recommendations"],
-            "overall_feedback": "Summary of performance"
-        }}
-        """
+        Return analysis as JSON:
+        {"overall_score": <percentage>,
+        "question_scores": [{"question_number": 1, "points_earned": <number>, "max_points": <number>, "feedback": "Detailed feedback", "concepts_to_review": ["Concepts this answer shows gaps in"]}],
+        "weak_areas": ["Specific concepts to review"],
+        "strong_areas": ["Concepts well understood"],
+        "recommendations": ["Specific study recommendations"],
+        "overall_feedback": "Summary of performance"}
+        
+        Quiz Type: {quiz_type}""", quiz_type=quiz_type)
     
     def _build_analysis_prompt(self, questions: List[Dict], answers: List[Dict]) -> str:
         """Build prompt for quiz analysis"""
         
-        prompt = "Analyze this quiz submission:\n\n"
+        # One compact block per question: Q = question, K = answer key, A = student answer
+        header = compact("""Analyze this quiz submission. For each item, Qn is the question,
+        Kn the correct answer or rubric, and An the student's answer.
+        Provide: individual question scores and feedback, an overall score,
+        weak areas (specific concepts), strong areas, and actionable recommendations.""")
         
+        items = []
         for i, (q, a) in enumerate(zip(questions, answers), 1):
-            prompt += f"""
-        QUESTION {i}:
-        {q.get('question', '')}
-        Correct Answer: {q.get('correct_answer') or q.get('sample_answer', 'See rubric')}
-        
-        STUDENT ANSWER {i}:
-        {a.get('answer', 'No answer provided')}
-        
-        ---
-        """
-        
-        prompt += """
-        Provide comprehensive analysis with:
-        1. Individual question scores and feedback
-        2. Overall performance score
-        3. Identified weak areas (specific concepts)
-        4. Strong areas
-        5. Actionable recommendations for improvement
-        """
+            key = q.get('correct_answer') or q.get('sample_answer') or q.get('rubric') or 'See rubric'
+            if not isinstance(key, str):
+                key = compact_json(key)
+            items.append(f"Q{i}: {q.get('question', '')}\nK{i}: {key}\nA{i}: {a.get('answer', 'No answer provided')}")
         
-        return prompt
+        return header + "\n\n" + "\n\n".join(items)
@@ -0,0 +1,213 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, Optional
+from config import LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_BURST_SECONDS
+
+# Priority classes, most urgent first
+PRIORITY_GRADING = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_GRADING: "grading",
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_BACKGROUND: "background"
+}
+PRIORITY_BY_NAME = {name: priority for priority, name in PRIORITY_NAMES.items()}
+
+
+class QueueTimeoutError(TimeoutError):
+    """Raised when a request's deadline passes while it waits for admission"""
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate"""
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 when available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RequestScheduler:
+    """
+    Process-wide admission control for LLM calls
+
+    Requests are admitted in priority order (grading, then interactive, then
+    background) and round-robin across users within a priority class, subject
+    to token-bucket limits on requests and tokens per minute. After an
+    upstream rate-limit response, admission pauses for everyone instead of
+    letting each caller hammer the endpoint.
+    """
+
+    def __init__(self,
+                 requests_per_minute: float,
+                 tokens_per_minute: float,
+                 burst_seconds: float = 10.0):
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute / 60.0 * burst_seconds))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, max(1.0, tokens_per_minute / 60.0 * burst_seconds))
+        self._queues = {p: OrderedDict() for p in PRIORITY_NAMES}  # priority -> user -> deque of tickets
+        self._cond = threading.Condition()
+        self._tickets = itertools.count()
+        self._paused_until = 0.0
+        self._stats = {
+            name: {"admitted": 0, "timed_out": 0, "total_queue_seconds": 0.0, "max_queue_seconds": 0.0}
+            for name in PRIORITY_NAMES.values()
+        }
+        self._rate_limited = 0
+
+    def acquire(self, user: str, priority: int, estimated_tokens: int, timeout: Optional[float] = None) -> float:
+        """
+        Block until the request may be sent
+
+        Args:
+            user: Identity used for fair sharing (e.g. student name)
+            priority: One of the PRIORITY_* classes
+            estimated_tokens: Expected prompt plus completion tokens
+            timeout: Longest time to wait, e.g. what is left of the call's
+                deadline (unbounded when None)
+
+        Returns:
+            Seconds spent waiting in the queue
+
+        Raises:
+            QueueTimeoutError: If the request was not admitted within timeout
+                (it leaves the queue without being charged)
+        """
+        started = time.monotonic()
+        deadline = started + timeout if timeout is not None else None
+        ticket = next(self._tickets)
+
+        with self._cond:
+            self._queues[priority].setdefault(user, deque()).append(ticket)
+
+            while True:
+                wait = self._admission_wait(ticket, estimated_tokens)
+                if wait == 0:
+                    break
+                if deadline is not None:
+                    left = deadline - time.monotonic()
+                    if left <= 0:
+                        self._withdraw(priority, user, ticket)
+                        self._stats[PRIORITY_NAMES[priority]]["timed_out"] += 1
+                        self._cond.notify_all()
+                        raise QueueTimeoutError(f"Request waited {time.monotonic() - started:.1f}s for admission")
+                    wait = min(wait, left)
+                self._cond.wait(timeout=wait)
+
+            self._dequeue(priority, user)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+
+            queue_time = time.monotonic() - started
+            stats = self._stats[PRIORITY_NAMES[priority]]
+            stats["admitted"] += 1
+            stats["total_queue_seconds"] += queue_time
+            stats["max_queue_seconds"] = max(stats["max_queue_seconds"], queue_time)
+
+            self._cond.notify_all()
+
+        return queue_time
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the token bucket once the real usage of a request is known"""
+        if not actual_tokens:
+            return
+
+        with self._cond:
+            difference = estimated_tokens - actual_tokens
+            if difference > 0:
+                self.tokens.give_back(difference)
+            else:
+                self.tokens.take(-difference)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Stop admitting requests for a while (after an upstream 429)"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._rate_limited += 1
+
+    def queue_depth(self) -> int:
+        """Number of requests waiting for admission"""
+        with self._cond:
+            return sum(len(q) for users in self._queues.values() for q in users.values())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue-time metrics per priority class"""
+        with self._cond:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            for name, values in stats.items():
+                values["avg_queue_seconds"] = (
+                    values["total_queue_seconds"] / values["admitted"] if values["admitted"] else 0.0
+                )
+            stats["queue_depth"] = sum(len(q) for users in self._queues.values() for q in users.values())
+            stats["rate_limited"] = self._rate_limited
+        return stats
+
+    def _admission_wait(self, ticket: int, estimated_tokens: int) -> float:
+        """Seconds to wait before re-checking, or 0 when ticket may go now (caller holds the lock)"""
+        paused = self._paused_until - time.monotonic()
+        if paused > 0:
+            return paused
+
+        if self._next_ticket() != ticket:
+            return 1.0  # Woken by notify_all when the head of the queue changes
+
+        return max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+
+    def _next_ticket(self):
+        """Head ticket of the first user in the most urgent non-empty class (caller holds the lock)"""
+        for priority in sorted(self._queues):
+            for tickets in self._queues[priority].values():
+                if tickets:
+                    return tickets[0]
+        return None
+
+    def _withdraw(self, priority: int, user: str, ticket: int):
+        """Remove a ticket that gave up waiting, wherever it is in the user's queue (caller holds the lock)"""
+        users = self._queues[priority]
+        users[user].remove(ticket)
+        if not users[user]:
+            del users[user]
+
+    def _dequeue(self, priority: int, user: str):
+        """Pop the user's head ticket and rotate the user to the back (caller holds the lock)"""
+        users = self._queues[priority]
+        users[user].popleft()
+        if users[user]:
+            users.move_to_end(user)
+        else:
+            del users[user]
+
+
+_scheduler = RequestScheduler(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_BURST_SECONDS)
+
+
+def get_scheduler() -> RequestScheduler:
+    """Get the process-wide request scheduler shared by all agents"""
+    return _scheduler
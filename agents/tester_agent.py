@@ -1,21 +1,24 @@
-from config import get_openai_client, AGENT_MODEL
-from typing import List, Dict, Any
-import json
+from config import RETRIEVAL_TOP_K, SCHEMA_REREQUEST_ATTEMPTS, WEAK_AREA_TOP_K
+from agents.base_agent import BaseAgent
+from agents.prompts import compact, fill
+from agents.validation import PRACTICE_QUESTION_SCHEMA, QUICK_QUESTION_SCHEMA, repair_json, check_item
+from utils.retrieval import BM25Index
+from typing import List, Dict, Any, Iterator
+import threading
 
-class TesterAgent:
+class TesterAgent(BaseAgent):
     """
     Agent responsible for creating practice quizzes and test questions
     to help students prepare for exams
     """
     
-    def __init__(self):
-        self.client = get_openai_client()
-    
     def generate_practice_quiz(self,
                               slide_content: str,
                               difficulty_level: str = "Medium",
                               num_questions: int = 5,
-                              focus_areas: List[str] = None) -> Dict[str, Any]:
+                              focus_areas: List[str] = None,
+                              context_index: BM25Index = None,
+                              context_slide_id: str = None) -> Dict[str, Any]:
         """
         Generate practice quiz questions
         
@@ -23,18 +26,25 @@ class TesterAgent:
             slide_content: Content from slides to base questions on
             difficulty_level: Easy, Medium, or Hard
             num_questions: Number of questions to generate
-            focus_areas: Specific topics to focus on
+            focus_areas: Specific topics to focus on, most pressing first
+                (only the first WEAK_AREA_TOP_K are used)
+            context_index: Optional retrieval index; when given with focus areas,
+                questions are based on the most relevant page chunks only
+            context_slide_id: Restrict retrieval to this slide
         
         Returns:
             Dictionary with practice questions
         """
         
+        focus_areas = focus_areas[:WEAK_AREA_TOP_K] if focus_areas else None
+        slide_content = self._focus_context(slide_content, focus_areas, context_index, context_slide_id)
+        
         system_prompt = self._get_system_prompt(difficulty_level)
         user_prompt = self._build_prompt(slide_content, num_questions, focus_areas)
         
         try:
-            response = self.client.chat.completions.create(
-                model=AGENT_MODEL,
+            content = self._chat(
+                "TesterAgent.generate_practice_quiz",
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -43,7 +53,17 @@ class TesterAgent:
                 response_format={"type": "json_object"}
             )
             
-            quiz_data = json.loads(response.choices[0].message.content)
+            quiz_data = self.validator.parse(content)
+            if not isinstance(quiz_data, dict):
+                quiz_data = {"questions": quiz_data}
+            
+            questions = self._valid_items(quiz_data.get("questions", []), PRACTICE_QUESTION_SCHEMA)
+            quiz_data["questions"] = self._top_up_questions(
+                system_prompt, slide_content, focus_areas, questions, num_questions
+            )
+            
+            if not quiz_data["questions"]:
+                quiz_data["error"] = "Failed to generate practice quiz: no valid questions returned"
             return quiz_data
             
         except Exception as e:
@@ -52,44 +72,113 @@ class TesterAgent:
                 "questions": []
             }
     
-    def generate_quick_question(self, topic: str) -> Dict[str, Any]:
+    def stream_practice_quiz(self,
+                             slide_content: str,
+                             difficulty_level: str = "Medium",
+                             num_questions: int = 5,
+                             focus_areas: List[str] = None,
+                             context_index: BM25Index = None,
+                             context_slide_id: str = None) -> Iterator[Dict[str, Any]]:
+        """
+        Generate practice questions, yielding each one as soon as it is complete
+        
+        Args:
+            Same as generate_practice_quiz
+        
+        Yields:
+            Question dictionaries; on failure a final {"error": ...} item
+        """
+        
+        focus_areas = focus_areas[:WEAK_AREA_TOP_K] if focus_areas else None
+        slide_content = self._focus_context(slide_content, focus_areas, context_index, context_slide_id)
+        
+        system_prompt = self._get_system_prompt(difficulty_level)
+        user_prompt = self._build_prompt(slide_content, num_questions, focus_areas)
+        
+        try:
+            questions = []
+            for question in self._stream_json_items(
+                "TesterAgent.generate_practice_quiz",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                schema=PRACTICE_QUESTION_SCHEMA,
+                temperature=0.8,
+                response_format={"type": "json_object"}
+            ):
+                questions.append(question)
+                yield question
+            
+            # Invalid questions were dropped; ask only for the ones still missing
+            yield from self._top_up_questions(
+                system_prompt, slide_content, focus_areas, questions, num_questions
+            )[len(questions):]
+        except Exception as e:
+            yield {"error": f"Failed to generate practice quiz: {str(e)}"}
+    
+    def generate_quick_question(self, topic: str, bypass_cache: bool = False) -> Dict[str, Any]:
         """
         Generate a single quick practice question on a specific topic
         
         Args:
             topic: Specific topic or concept to test
+            bypass_cache: Skip cached questions and ask the model again
         
         Returns:
             Single question with answer
         """
         
-        prompt = f"""Generate one practice question on the topic: {topic}
-        
+        prompt = fill("""Generate one practice question on the topic below.
         Make it a thought-provoking question that tests understanding, not just memorization.
         Include the answer and a brief explanation.
+        Return JSON:
+        {"question": "Question text", "answer": "Detailed answer",
+        "explanation": "Why this answer is correct", "hints": ["Hint 1", "Hint 2"]}
         
-        Return in JSON format:
-        {{
-            "question": "Question text",
-            "answer": "Detailed answer",
-            "explanation": "Why this answer is correct",
-            "hints": ["Hint 1", "Hint 2"]
-        }}
-        """
+        TOPIC: {topic}""", topic=topic)
         
         try:
-            response = self.client.chat.completions.create(
-                model=AGENT_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                response_format={"type": "json_object"}
-            )
+            problems = []
+            for attempt in range(1 + SCHEMA_REREQUEST_ATTEMPTS):
+                if attempt:
+                    self.validator.record_rerequest()
+                
+                content = self._chat(
+                    "TesterAgent.generate_quick_question",
+                    messages=[{"role": "user", "content": prompt}],
+                    # A re-request must not be answered with the same cached response
+                    bypass_cache=bypass_cache or attempt > 0,
+                    validate=lambda content: not check_item(repair_json(content), QUICK_QUESTION_SCHEMA)[1],
+                    temperature=0.7,
+                    response_format={"type": "json_object"}
+                )
+                
+                question, problems = self.validator.validate(self.validator.parse(content), QUICK_QUESTION_SCHEMA)
+                if question is not None:
+                    return question
             
-            return json.loads(response.choices[0].message.content)
+            return {"error": f"Failed to generate question: {', '.join(problems)}"}
             
         except Exception as e:
             return {"error": f"Failed to generate question: {str(e)}"}
     
+    def _focus_context(self,
+                       slide_content: str,
+                       focus_areas: List[str],
+                       context_index: BM25Index,
+                       context_slide_id: str) -> str:
+        """Narrow slide content to the chunks most relevant to the focus areas, when an index is given"""
+        
+        if context_index is None or not focus_areas:
+            return slide_content
+        
+        return context_index.build_context(
+            " ".join(focus_areas),
+            top_k=RETRIEVAL_TOP_K,
+            slide_ids=[context_slide_id] if context_slide_id else None
+        ) or slide_content
+    
     def _get_system_prompt(self, difficulty_level: str) -> str:
         """Get system prompt based on difficulty level"""
         
@@ -112,11 +201,9 @@ class TesterAgent:
             """
         }
         
-        return f"""You are an expert educational test designer creating practice questions 
-        to help students prepare for exams. 
-        
-        Difficulty Level: {difficulty_level}
-        {difficulty_guidance.get(difficulty_level, difficulty_guidance["Medium"])}
+        # Difficulty comes last so the rest is a prefix shared by all levels
+        return fill("""You are an expert educational test designer creating practice questions
+        to help students prepare for exams.
         
         Create questions that:
         1. Test deep understanding, not just memorization
@@ -125,42 +212,70 @@ class TesterAgent:
         4. Cover various cognitive levels (Remember, Understand, Apply, Analyze)
         5. Include practical examples when applicable
         
-        Return questions in JSON format:
-        {{
-            "questions": [
-                {{
-                    "question": "Question text",
-                    "type": "MCQ or Short Answer or Problem Solving",
-                    "options": ["A. ", "B. ", "C. ", "D. "] (for MCQ only),
-                    "correct_answer": "Answer",
-                    "explanation": "Detailed explanation",
-                    "difficulty": "Easy/Medium/Hard",
-                    "topic": "Specific topic covered"
-                }}
+        Return questions as JSON:
+        {"questions": [{"question": "Question text",
+        "type": "MCQ or Short Answer or Problem Solving",
+        "options": ["A. ", "B. ", "C. ", "D. "] (for MCQ only),
+        "correct_answer": "Answer",
+        "explanation": "Detailed explanation",
+        "difficulty": "Easy/Medium/Hard",
+        "topic": "Specific topic covered"}]}
+        
+        Difficulty Level: {difficulty_level}
+        {guidance}""",
+            difficulty_level=difficulty_level,
+            guidance=compact(difficulty_guidance.get(difficulty_level, difficulty_guidance["Medium"]))
+        )
+    
+    def _top_up_questions(self,
+                          system_prompt: str,
+                          slide_content: str,
+                          focus_areas: List[str],
+                          questions: List[Dict[str, Any]],
+                          num_questions: int) -> List[Dict[str, Any]]:
+        """Request only the questions still missing after invalid ones were dropped"""
+        
+        def build_messages(missing: int) -> List[Dict[str, str]]:
+            user_prompt = self._build_prompt(slide_content, missing, focus_areas)
+            if questions:
+                asked = "\n".join(f"- {q['question']}" for q in questions)
+                user_prompt += f"\n\nDo not repeat these existing questions:\n{asked}"
+            return [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
             ]
-        }}
-        """
+        
+        return self._top_up_items(
+            "TesterAgent.generate_practice_quiz",
+            questions,
+            num_questions,
+            build_messages,
+            PRACTICE_QUESTION_SCHEMA,
+            temperature=0.8,
+            response_format={"type": "json_object"}
+        )
     
     def _build_prompt(self, slide_content: str, num_questions: int, focus_areas: List[str]) -> str:
         """Build user prompt for quiz generation"""
         
-        prompt = f"""Generate {num_questions} practice questions based on this content:
-        
-        CONTENT:
-        {slide_content}
-        """
+        prompt = fill("""Generate {num_questions} practice questions based on the content below.
+        Create a mix of question types (MCQ, short answer, problem-solving) that would
+        effectively prepare a student for an exam on this material.""", num_questions=num_questions)
         
         if focus_areas:
-            prompt += f"""
-            
-            FOCUS AREAS (prioritize questions on these topics):
-            {', '.join(focus_areas)}
-            """
-        
-        prompt += """
+            prompt += f"\n\nFOCUS AREAS (prioritize questions on these topics): {', '.join(focus_areas)}"
         
-        Create a mix of question types (MCQ, short answer, problem-solving) that would 
-        effectively prepare a student for an exam on this material.
-        """
-        
-        return prompt
+        return prompt + f"\n\nCONTENT:\n{slide_content.strip()}"
+
+
+_tester_agent = None
+_tester_lock = threading.Lock()
+
+
+def get_tester_agent() -> TesterAgent:
+    """Get the process-wide practice quiz agent (use for_user() to act for a student)"""
+    global _tester_agent
+    with _tester_lock:
+        if _tester_agent is None:
+            _tester_agent = TesterAgent(user_id="tester")
+        return _tester_agent
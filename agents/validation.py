@@ -0,0 +1,344 @@
+import json
+import re
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+NUMBER = (int, float)
+
+# Declared shapes of agent responses. "prepare" adjusts the raw item in place
+# before coercion; "required" fields must be present and of the given type after
+# coercion; "optional" fields are dropped when present but of the wrong type;
+# "fix" adjusts a coerced item in place (e.g. clamping a score) and "check"
+# returns a remaining problem description or None.
+
+MCQ_QUESTION_SCHEMA = {
+    "required": {"question": str, "options": list, "correct_answer": str},
+    "optional": {"learning_objective": str, "cognitive_level": str, "explanation": str},
+    "check": lambda item: None if len(item["options"]) >= 2 else "fewer than two options"
+}
+
+CONVERSATIONAL_QUESTION_SCHEMA = {
+    "required": {"question": str},
+    "optional": {"learning_objective": str, "cognitive_level": str, "sample_answer": str, "key_points": list}
+}
+
+LONG_ANSWER_QUESTION_SCHEMA = {
+    "required": {"question": str, "rubric": (dict, str)},
+    "optional": {"learning_objective": str, "cognitive_level": str, "expected_length": str}
+}
+
+QUESTION_SCHEMAS = {
+    "Multiple Choice (MCQ)": MCQ_QUESTION_SCHEMA,
+    "Conversational": CONVERSATIONAL_QUESTION_SCHEMA,
+    "Long Answer": LONG_ANSWER_QUESTION_SCHEMA
+}
+
+PRACTICE_QUESTION_SCHEMA = {
+    "required": {"question": str, "correct_answer": str},
+    "optional": {"type": str, "options": list, "explanation": str, "difficulty": str, "topic": str}
+}
+
+QUICK_QUESTION_SCHEMA = {
+    "required": {"question": str, "answer": str},
+    "optional": {"explanation": str, "hints": list}
+}
+
+_SHARE = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(?:(%)|/\s*(\d+(?:\.\d+)?))\s*$")
+
+
+def _scale_points(item: Dict[str, Any]):
+    """Read points given as "7/20" or "80%" as a share of max_points, not as points"""
+    match = _SHARE.match(item["points_earned"]) if isinstance(item.get("points_earned"), str) else None
+    max_points = _coerce(item.get("max_points"), NUMBER)
+    if not match or not isinstance(max_points, NUMBER) or isinstance(max_points, bool):
+        return
+
+    value = float(match.group(1))
+    total = 100.0 if match.group(2) else float(match.group(3))
+    if total > 0:
+        item["points_earned"] = round(value / total * max_points, 2)
+
+
+GRADE_SCHEMA = {
+    "prepare": _scale_points,
+    "required": {"points_earned": NUMBER, "max_points": NUMBER},
+    "optional": {"percentage": NUMBER, "feedback": (dict, str), "suggested_answer": str, "concepts_to_review": list},
+    "fix": lambda item: item.update(points_earned=min(max(item["points_earned"], 0), item["max_points"])),
+    "check": lambda item: None if item["max_points"] > 0 else "max_points is not positive"
+}
+
+QUESTION_SCORE_SCHEMA = {
+    "prepare": _scale_points,
+    "required": {"question_number": int, "points_earned": NUMBER, "max_points": NUMBER},
+    "optional": {"feedback": str, "concepts_to_review": list},
+    "fix": lambda item: item.update(points_earned=min(max(item["points_earned"], 0), item["max_points"])),
+    "check": lambda item: None if item["max_points"] > 0 else "max_points is not positive"
+}
+
+ANALYSIS_SCHEMA = {
+    "required": {},
+    "optional": {
+        "question_scores": list,
+        "overall_score": NUMBER,
+        "weak_areas": list,
+        "strong_areas": list,
+        "recommendations": list,
+        "overall_feedback": str
+    }
+}
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_NUMBER_PREFIX = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*(?:%|/\s*\d+(?:\.\d+)?|points?|pts?)?\s*$", re.IGNORECASE)
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse model output as JSON, repairing the breakages models commonly
+    produce: markdown code fences, prose around the object, trailing commas,
+    and output truncated mid-object (the incomplete last element of an array
+    is dropped and the open brackets are closed; a top-level object keeps its
+    complete fields, and a string cut off mid-way is closed only when nothing
+    else can be recovered)
+
+    Args:
+        text: Raw model output
+
+    Returns:
+        The parsed value
+
+    Raises:
+        ValueError: If the text cannot be repaired
+    """
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("no JSON object in model output")
+
+    body = text[start:]
+    for candidate in (body, _TRAILING_COMMA.sub(r"\1", body)):
+        try:
+            value, _ = json.JSONDecoder().raw_decode(candidate)
+            return value
+        except ValueError:
+            pass
+    body = _TRAILING_COMMA.sub(r"\1", body)
+
+    # Truncated output: walk the text, remembering the open brackets at every
+    # point where a field of the top-level value or an element of the arrays
+    # directly under it just ended, then close from the latest such point.
+    # Cutting inside a nested object would keep a partial element.
+    stack = []
+    in_string = escape = False
+    cut_points = []
+
+    def can_cut() -> bool:
+        return all(bracket == "]" for bracket in stack[1:])
+
+    for i, ch in enumerate(body):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            if ch == "[" and can_cut():
+                cut_points.append((i + 1, list(stack)))  # Keeps an array whose first element is cut off
+        elif ch in "}]":
+            if not stack:
+                break
+            stack.pop()
+            if can_cut():
+                cut_points.append((i + 1, list(stack)))
+        elif ch == "," and can_cut():
+            cut_points.append((i, list(stack)))
+
+    candidates = cut_points[-50:][::-1]
+    if in_string:
+        candidates.append((len(body), None))
+
+    for end, open_brackets in candidates:
+        if open_brackets is None:
+            candidate = body + '"' + "".join(reversed(stack))
+        else:
+            candidate = body[:end] + "".join(reversed(open_brackets))
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", candidate))
+        except ValueError:
+            continue
+
+    raise ValueError("model output is not valid JSON")
+
+
+def _coerce(value: Any, types) -> Any:
+    """Convert trivially mistyped values (numeric strings, single strings for lists)"""
+    if isinstance(value, types) and not (types is NUMBER and isinstance(value, bool)):
+        return value
+
+    if types in (NUMBER, int) and isinstance(value, str):
+        match = _NUMBER_PREFIX.match(value)
+        if match:
+            number = float(match.group(1))
+            return int(number) if types is int and number.is_integer() else number
+    if types is int and isinstance(value, float) and value.is_integer():
+        return int(value)
+    if types is str and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if types is list and isinstance(value, str):
+        return [value]
+
+    return value
+
+
+def _type_name(types) -> str:
+    if types is NUMBER:
+        return "number"
+    if isinstance(types, tuple):
+        return " or ".join(t.__name__ for t in types)
+    return types.__name__
+
+
+def check_item(item: Any, schema: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    Coerce an item's fields to a schema and validate it
+
+    Args:
+        item: One decoded object from a model response
+        schema: One of the *_SCHEMA declarations
+
+    Returns:
+        The coerced item (None when it is not an object) and its problems
+    """
+    if not isinstance(item, dict):
+        return None, ["not an object"]
+
+    item = dict(item)
+    problems = []
+    if schema.get("prepare"):
+        schema["prepare"](item)
+
+    for name, types in schema["required"].items():
+        value = item.get(name)
+        if value is None or value == "" or value == []:
+            problems.append(f"missing {name}")
+            continue
+        item[name] = _coerce(value, types)
+        if not isinstance(item[name], types):
+            problems.append(f"{name} is not a {_type_name(types)}")
+
+    for name, types in schema.get("optional", {}).items():
+        if item.get(name) is None:
+            continue
+        item[name] = _coerce(item[name], types)
+        if not isinstance(item[name], types):
+            del item[name]
+
+    if not problems and schema.get("fix"):
+        schema["fix"](item)
+
+    if not problems and schema.get("check"):
+        problem = schema["check"](item)
+        if problem:
+            problems.append(problem)
+
+    return item, problems
+
+
+class OutputValidator:
+    """
+    Parses and validates agent responses against their declared schemas,
+    counting how often output was accepted as-is, repaired locally, or had
+    items re-requested from the model
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "responses": 0,
+            "json_repaired": 0,
+            "unparseable": 0,
+            "items_valid": 0,
+            "items_coerced": 0,
+            "items_rejected": 0,
+            "re_requests": 0
+        }
+
+    def parse(self, content: str) -> Any:
+        """
+        Parse a model response, repairing it locally when it is not valid JSON
+
+        Raises:
+            ValueError: If the response cannot be repaired
+        """
+        try:
+            value = json.loads(content)
+            self._count("responses")
+            return value
+        except (TypeError, ValueError):
+            pass
+
+        try:
+            value = repair_json(content or "")
+        except ValueError:
+            self._count("responses")
+            self._count("unparseable")
+            raise
+
+        self._count("responses")
+        self._count("json_repaired")
+        return value
+
+    def validate(self, item: Any, schema: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """
+        Validate one item, coercing trivially mistyped fields
+
+        Returns:
+            The (possibly coerced) item, or None when it is invalid, and its problems
+        """
+        coerced, problems = check_item(item, schema)
+        if problems:
+            self._count("items_rejected")
+            return None, problems
+
+        self._count("items_coerced" if coerced != item else "items_valid")
+        return coerced, problems
+
+    def filter_items(self, items: Any, schema: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Keep the valid items of a response array
+
+        Returns:
+            Valid (possibly coerced) items and the problems of the rejected ones
+        """
+        valid, problems = [], []
+        for index, item in enumerate(items if isinstance(items, list) else []):
+            coerced, item_problems = self.validate(item, schema)
+            if coerced is None:
+                problems.append(f"item {index + 1}: {', '.join(item_problems)}")
+            else:
+                valid.append(coerced)
+        return valid, problems
+
+    def record_rerequest(self):
+        """Count a targeted re-request for missing or invalid items"""
+        self._count("re_requests")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get response and item counters"""
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+
+_output_validator = OutputValidator()
+
+
+def get_output_validator() -> OutputValidator:
+    """Get the process-wide output validator"""
+    return _output_validator
@@ -0,0 +1,254 @@
+"""
+Command-line entry point for headless bulk work
+
+Load a directory tree of PDF/image decks into a course, optionally drafting
+a quiz per deck for instructor review:
+
+    python cli.py ingest "Machine Learning Fundamentals" decks/ --storage-dir /srv/educanvas
+    python cli.py ingest "Web Development" decks/ --quizzes --questions 8 --quiz-type "Long Answer"
+
+Decks are rendered in parallel worker processes; quiz generation runs with
+bounded LLM concurrency. Results go to the configured store, so the store
+must be durable (EDUCANVAS_STORAGE=directory or --storage-dir).
+
+Train compression dictionaries on the stored data and repack existing values
+with them (and compress values stored before compression was enabled):
+
+    python cli.py --storage-dir /srv/educanvas compress
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any
+from utils.storage import get_next_slide_number, get_storage_backend, set_storage_backend, create_backend, MemoryBackend
+from services import build_slide, add_slides, draft_quiz
+from config import QUIZ_TYPES, CLI_INGEST_WORKERS, CLI_QUIZ_CONCURRENCY, CLI_FILE_EXTENSIONS, STORAGE_COMPRESSED_COLLECTIONS
+
+DEFAULT_OBJECTIVES = "- Check understanding of the key concepts in {title}\n- Apply them to a worked example"
+
+
+def find_decks(root: str) -> List[str]:
+    """Get the supported files under root (or root itself), in a stable order"""
+    if os.path.isfile(root):
+        return [root]
+
+    paths = []
+    for directory, subdirectories, names in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(names):
+            if name.lower().endswith(CLI_FILE_EXTENSIONS) and not name.startswith("."):
+                paths.append(os.path.join(directory, name))
+    return paths
+
+
+def _build_from_path(slide_id: str, order: int, title: str, path: str) -> Dict[str, Any]:
+    """Read and render one deck (runs in a worker process)"""
+    with open(path, "rb") as f:
+        return build_slide(slide_id, order, title, f.read())
+
+
+def ingest_decks(course_name: str, root: str, paths: List[str], workers: int) -> Dict[str, Any]:
+    """
+    Render decks in parallel and save them to the course as they finish,
+    keeping the order of paths
+
+    Returns:
+        {"slides": [...], "errors": [...], "pages": int, "seconds": float}
+    """
+    first_number = get_next_slide_number(course_name)
+    base = root if os.path.isdir(root) else os.path.dirname(root)
+    slides, errors, pages = [], [], 0
+    finished = {}  # position in paths -> slide, or None when it failed
+    next_to_save = 0
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                _build_from_path,
+                f"slide_{first_number + i}",
+                first_number + i,
+                os.path.relpath(path, base),
+                path
+            ): (i, path)
+            for i, path in enumerate(paths)
+        }
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            position, path = futures[future]
+            try:
+                slide = future.result()
+            except Exception as e:
+                slide = {"error": f"Error processing {path}: {str(e)}"}
+
+            if "error" in slide:
+                errors.append(slide["error"])
+                finished[position] = None
+                print(f"[{done}/{len(paths)}] ✗ {slide['error']}")
+            else:
+                finished[position] = slide
+                pages += slide["page_count"]
+                print(f"[{done}/{len(paths)}] ✓ {slide['title']} ({slide['page_count']} page(s))")
+
+            # Save the decks finished so far that are next in path order
+            ready = []
+            while next_to_save in finished:
+                if finished[next_to_save] is not None:
+                    ready.append(finished.pop(next_to_save))
+                next_to_save += 1
+            if ready:
+                add_slides(course_name, ready, background=False)
+                slides.extend(ready)
+
+    return {"slides": slides, "errors": errors, "pages": pages, "seconds": time.monotonic() - started}
+
+
+def draft_quizzes(course_name: str,
+                  slides: List[Dict[str, Any]],
+                  objectives: str,
+                  quiz_type: str,
+                  num_questions: int,
+                  concurrency: int) -> Dict[str, Any]:
+    """
+    Draft one quiz per deck, a bounded number at a time
+
+    Returns:
+        {"drafts": int, "questions": int, "errors": [...], "seconds": float}
+    """
+    drafts, questions, errors = 0, 0, []
+    started = time.monotonic()
+
+    def draft(slide: Dict[str, Any]) -> Dict[str, Any]:
+        return draft_quiz(
+            course_name,
+            slide,
+            objectives.format(title=slide["title"]),
+            quiz_type,
+            num_questions,
+            user_id="cli"
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(draft, slide): slide for slide in slides}
+        for done, future in enumerate(as_completed(futures), start=1):
+            slide = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)}
+
+            if "error" in result:
+                errors.append(f"{slide['title']}: {result['error']}")
+                print(f"[quiz {done}/{len(slides)}] ✗ {slide['title']}: {result['error']}")
+                continue
+
+            drafts += 1
+            questions += len(result["questions"])
+            note = f" - {result['warning']}" if result.get("warning") else ""
+            print(f"[quiz {done}/{len(slides)}] ✓ {slide['title']}: {len(result['questions'])} question(s){note}")
+
+    return {"drafts": drafts, "questions": questions, "errors": errors, "seconds": time.monotonic() - started}
+
+
+def _rate(count: float, seconds: float, unit: str) -> str:
+    return f"{count / seconds:.2f} {unit}/s" if seconds > 0 else f"- {unit}/s"
+
+
+def run_ingest(args) -> int:
+    paths = find_decks(args.path)
+    if not paths:
+        print(f"No {', '.join(CLI_FILE_EXTENSIONS)} files under {args.path}", file=sys.stderr)
+        return 1
+
+    print(f"Ingesting {len(paths)} file(s) into '{args.course}' with {args.workers} worker(s)")
+    ingest = ingest_decks(args.course, args.path, paths, args.workers)
+
+    print()
+    print(f"Ingested {len(ingest['slides'])}/{len(paths)} deck(s), {ingest['pages']} page(s) "
+          f"in {ingest['seconds']:.1f}s ({_rate(len(ingest['slides']), ingest['seconds'], 'decks')}, "
+          f"{_rate(ingest['pages'], ingest['seconds'], 'pages')})")
+
+    failed = bool(ingest["errors"])
+
+    if args.quizzes and ingest["slides"]:
+        print()
+        print(f"Drafting {args.quiz_type} quizzes ({args.questions} questions each, "
+              f"{args.quiz_concurrency} at a time)")
+        quizzes = draft_quizzes(
+            args.course,
+            ingest["slides"],
+            args.objectives,
+            args.quiz_type,
+            args.questions,
+            args.quiz_concurrency
+        )
+
+        print()
+        print(f"Drafted {quizzes['drafts']}/{len(ingest['slides'])} quiz(zes), {quizzes['questions']} question(s) "
+              f"in {quizzes['seconds']:.1f}s ({_rate(quizzes['questions'], quizzes['seconds'], 'questions')})")
+        print("Review and publish them under Create Quiz → AI-Assisted Quiz.")
+        failed = failed or bool(quizzes["errors"])
+
+    return 2 if failed else 0
+
+
+def run_compress(args) -> int:
+    backend = get_storage_backend()
+
+    if not args.no_dictionary:
+        for collection, size in backend.train_dictionaries().items():
+            print(f"{collection}: {f'{size / 1024:.1f} KB dictionary' if size else 'no dictionary'}")
+        print()
+
+    total_before = total_after = 0
+    for collection in STORAGE_COMPRESSED_COLLECTIONS:
+        stats = backend.recompress(collection)
+        total_before += stats["bytes_before"]
+        total_after += stats["bytes_after"]
+        print(f"{collection}: {stats['values']} value(s), {stats['bytes_before'] / 1024:.0f} KB → "
+              f"{stats['bytes_after'] / 1024:.0f} KB")
+
+    if total_after:
+        print()
+        print(f"Total {total_before / 1024:.0f} KB → {total_after / 1024:.0f} KB ({total_before / total_after:.1f}x)")
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="EduCanvas bulk operations")
+    parser.add_argument("--storage-dir", help="Use the directory store at this path (overrides EDUCANVAS_STORAGE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Load a directory tree of PDF/image decks into a course")
+    ingest.add_argument("course", help="Course name")
+    ingest.add_argument("path", help="Directory (searched recursively) or single file")
+    ingest.add_argument("--workers", type=int, default=CLI_INGEST_WORKERS, help="Decks rendered in parallel")
+    ingest.add_argument("--quizzes", action="store_true", help="Also draft a quiz per deck for review")
+    ingest.add_argument("--quiz-type", choices=QUIZ_TYPES, default=QUIZ_TYPES[0])
+    ingest.add_argument("--questions", type=int, default=5, help="Questions per drafted quiz")
+    ingest.add_argument("--objectives", default=DEFAULT_OBJECTIVES,
+                        help="Learning objectives for drafted quizzes ({title} is replaced by the deck name)")
+    ingest.add_argument("--quiz-concurrency", type=int, default=CLI_QUIZ_CONCURRENCY,
+                        help="Decks whose quizzes are generated at once")
+    ingest.set_defaults(handler=run_ingest)
+
+    compress = commands.add_parser("compress", help="Train compression dictionaries and repack stored values")
+    compress.add_argument("--no-dictionary", action="store_true", help="Repack without training dictionaries")
+    compress.set_defaults(handler=run_compress)
+
+    args = parser.parse_args(argv)
+
+    if args.storage_dir:
+        set_storage_backend(create_backend("directory", args.storage_dir))
+    if isinstance(get_storage_backend(), MemoryBackend):
+        parser.error("the in-memory store is lost when the CLI exits; "
+                     "set EDUCANVAS_STORAGE=directory or pass --storage-dir")
+
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
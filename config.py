@@ -1,4 +1,3 @@
-import streamlit as st
 import os
 
 # API Configuration - Add your API keys here
@@ -19,11 +18,210 @@ load_dotenv()  # Loads variables from a local .env if present
 # Model Configuration
 DEFAULT_MODEL = "openai.gpt-4o"
 AGENT_MODEL = "openai.gpt-4o"
+FAST_MODEL = "openai.gpt-4o-mini"
+
+# Model routing: each agent operation is sent to a tier's model.
+# Operations not listed use DEFAULT_MODEL_TIER.
+MODEL_TIERS = {
+    "fast": FAST_MODEL,
+    "standard": AGENT_MODEL
+}
+DEFAULT_MODEL_TIER = "standard"
+OPERATION_MODEL_TIERS = {
+    "TesterAgent.generate_quick_question": "fast",
+    "LearnerAgent.summarize_history": "fast",
+    "ReviewerAgent.analyze_quiz_performance": "standard",
+    "ReviewerAgent.grade_individual_answer": "standard"
+}
+
+# Interactive operations that drop to the fallback tier while the LLM queue or
+# their p95 latency is over the SLO. Grading is never downgraded.
+MODEL_TIER_FALLBACKS = {"standard": "fast"}
+SLO_FALLBACK_OPERATIONS = {
+    "LearnerAgent.teach_concept",
+    "TesterAgent.generate_practice_quiz"
+}
+ROUTING_SLO_QUEUE_DEPTH = 20           # Requests waiting for admission
+ROUTING_SLO_P95_SECONDS = 15.0
+ROUTING_FALLBACK_HOLD_SECONDS = 60     # Stay on the fallback tier this long once triggered
+
+# Offline endpoints: an OpenAI-compatible base URL (e.g. devtools.llm_stub) and a
+# record/replay cassette of agent exchanges. Both are disabled when unset.
+LLM_BASE_URL = os.getenv("EDUCANVAS_LLM_BASE_URL")
+LLM_CASSETTE = os.getenv("EDUCANVAS_CASSETTE")
+LLM_CASSETTE_MODE = os.getenv("EDUCANVAS_CASSETTE_MODE", "replay")  # "record" or "replay"
+
+# Response Cache Configuration
+RESPONSE_CACHE_MAX_ENTRIES = 512
+RESPONSE_CACHE_DIR = os.getenv("EDUCANVAS_CACHE_DIR")  # Optional on-disk tier, disabled when unset
+
+# Agent operations that may be served from the response cache, with TTL in seconds.
+# Operations not listed here always call the model.
+AGENT_CACHE_TTLS = {
+    "LearnerAgent.teach_concept": 6 * 60 * 60,
+    "TesterAgent.generate_quick_question": 60 * 60,
+    "QuizGeneratorAgent.generate_quiz": 24 * 60 * 60,
+    "QuizGeneratorAgent.generate_quiz_chunk": 24 * 60 * 60
+}
+
+# LLM Request Scheduling: process-wide limits shared by all agents
+LLM_REQUESTS_PER_MINUTE = 300
+LLM_TOKENS_PER_MINUTE = 300000
+LLM_BURST_SECONDS = 10                 # Bucket capacity, in seconds of refill
+LLM_DEFAULT_COMPLETION_TOKENS = 1000   # Completion estimate when a call sets no max_tokens
+LLM_RATE_LIMIT_PAUSE_SECONDS = 5       # Admission pause after an upstream 429
+
+# Resilience: deadlines (seconds, covering all retries), retries and circuit breaking
+LLM_CALL_DEADLINES = {
+    "default": 60,
+    "TesterAgent.generate_quick_question": 20,
+    "LearnerAgent.summarize_history": 20,
+    "ReviewerAgent.analyze_quiz_performance": 120,
+    "QuizGeneratorAgent.generate_quiz": 120
+}
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BASE_DELAY = 0.5             # Backoff doubles per retry, with full jitter
+LLM_RETRY_MAX_DELAY = 8
+CIRCUIT_BREAKER_FAILURES = 5           # Consecutive transient failures before failing fast
+CIRCUIT_BREAKER_RESET_SECONDS = 30
+
+# Short latency-critical operations that send a duplicate request once the
+# first is slower than that operation's p95 (HEDGE_MIN_DELAY until p95 is known)
+HEDGED_OPERATIONS = {"TesterAgent.generate_quick_question"}
+HEDGE_MIN_DELAY = 3.0
+
+# Instrumentation of agent calls
+METRICS_LATENCY_BUCKETS = [0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120]  # Histogram bounds, seconds
+METRICS_WINDOW = 1000                  # Recent samples per operation used for percentiles
+METRICS_JSONL_PATH = os.getenv("EDUCANVAS_METRICS_JSONL")  # Append one event per call, disabled when unset
+METRICS_PORT = int(os.getenv("EDUCANVAS_METRICS_PORT", "0"))  # Prometheus /metrics endpoint, disabled when 0
+ADMIN_VIEW_ENABLED = os.getenv("EDUCANVAS_ADMIN", "") == "1"  # Also enabled per session with ?admin=1
+
+# Scheduler class per operation: "grading" > "interactive" > "background".
+# Operations not listed are "interactive"; background workers override per agent.
+OPERATION_PRIORITIES = {
+    "ReviewerAgent.analyze_quiz_performance": "grading",
+    "ReviewerAgent.grade_individual_answer": "grading",
+    "LearnerAgent.summarize_history": "background"
+}
 
 # Quiz Configuration
 QUIZ_TYPES = ["Multiple Choice (MCQ)", "Conversational", "Long Answer"]
 PASSING_THRESHOLD = 90  # Percentage threshold for reviewer agent feedback
 
+# Quiz generation over large decks: content above the budget is split into chunks,
+# candidate questions are generated per chunk concurrently and merged locally
+QUIZ_CONTEXT_TOKEN_BUDGET = 12000  # Max slide tokens sent in a single quiz request
+QUIZ_CHUNK_TOKENS = 6000
+QUIZ_MAP_CONCURRENCY = 4
+QUIZ_CANDIDATE_OVERSAMPLE = 1.5  # Candidates generated per requested question
+
+# Retrieval Configuration: agents can send only the most relevant page chunks
+RETRIEVAL_TOP_K = 4
+RETRIEVAL_CHUNK_TOKENS = 400
+
+# Practice Question Pool Configuration
+DIFFICULTY_LEVELS = ["Easy", "Medium", "Hard"]
+PRACTICE_POOL_ENABLED = True
+PRACTICE_POOL_LOW_WATER = 5   # Refill a (slide, difficulty) bucket below this many questions
+PRACTICE_POOL_TARGET = 15     # Questions a refill aims to hold per bucket
+PRACTICE_POOL_BATCH = 5       # Questions generated per background call
+
+# Tutor Warm-up Configuration: baseline explanations are generated in the background after upload
+TUTOR_WARMUP_ENABLED = True
+WARMUP_MIN_INTERVAL_SECONDS = 5          # Minimum spacing between warm-up calls
+WARMUP_CACHE_TTL = 7 * 24 * 60 * 60      # Warmed explanations outlive regular cache entries
+
+# Tutoring Session Configuration
+TUTOR_HISTORY_TOKEN_BUDGET = 3000  # Dialogue tokens kept verbatim; older turns are summarized
+TUTOR_SUMMARY_MAX_TOKENS = 300
+
+# Weak-Area Model: phrasings of one concept are merged, weights decay with a
+# half-life and strong results build mastery; only the top-k reach prompts
+WEAK_AREA_TOP_K = 5
+WEAK_AREA_HALF_LIFE_DAYS = 14
+WEAK_AREA_SIMILARITY = 0.6      # Minimum label similarity to merge into an existing concept
+WEAK_AREA_MAX_TRACKED = 50
+WEAK_AREA_MIN_WEIGHT = 0.25
+
+# Storage: "memory" keeps courses, quizzes, attempts and progress in the process
+# (shared by all sessions); "directory" persists them under STORAGE_DIR, which
+# several server processes on a host can share (updates are file-locked, and
+# cached reads are revalidated against the files)
+STORAGE_BACKEND = os.getenv("EDUCANVAS_STORAGE", "memory")
+STORAGE_DIR = os.getenv(
+    "EDUCANVAS_STORAGE_DIR",
+    os.path.join(os.path.expanduser("~"), ".educanvas", "storage")
+)
+STORAGE_CACHE_ENTRIES = 256  # Values kept per process by the directory backend
+
+# Storage compression: slide text, quiz questions and attempts with their
+# analyses are held and written compressed, and decompressed on access; page
+# images and other large binary values are kept as they are. zlib can use
+# dictionaries trained on the stored data (python cli.py compress)
+STORAGE_COMPRESSION = os.getenv("EDUCANVAS_STORAGE_COMPRESSION", "zlib")  # "zlib", "lzma" or "none"
+STORAGE_COMPRESSION_LEVEL = 6
+STORAGE_COMPRESSED_COLLECTIONS = ("slides", "quizzes", "quiz_drafts", "quiz_attempts", "student_attempts", "practice_sessions")
+STORAGE_COMPRESSION_MIN_BYTES = 256  # Smaller values are stored uncompressed
+STORAGE_BLOB_MIN_BYTES = 4096        # bytes values this large (page images) are not compressed
+STORAGE_DICTIONARY_BYTES = 16384     # Size of trained dictionaries
+
+# Conversation State: tutoring conversations live outside the agents, keyed by
+# student, course and slide, so sessions survive reconnects and restarts
+CONVERSATION_DIR = os.getenv(
+    "EDUCANVAS_CONVERSATION_DIR",
+    os.path.join(os.path.expanduser("~"), ".educanvas", "conversations")
+)
+CONVERSATION_CACHE_SIZE = 256                # Conversations kept in memory
+CONVERSATION_TRANSCRIPT_MAX_MESSAGES = 200   # Displayed messages kept per conversation
+
+# Grading: "whole_quiz" sends the submission's answers in one call, for an
+# analysis with written overall feedback and recommendations; answers graded
+# before (by any student, same answer key) come from the grade memo and are
+# not sent. "per_question" (opt-in) grades each answer separately (MCQs scored
+# locally) and aggregates the scores, with shorter generated feedback
+GRADING_MODE = os.getenv("EDUCANVAS_GRADING_MODE", "whole_quiz")
+GRADING_QUESTION_CONCURRENCY = 4   # Per-question grading calls in flight per submission
+QUESTION_MAX_POINTS = 10
+GRADE_CACHE_MAX_ENTRIES = 20000
+
+# Output Validation: invalid JSON is repaired locally; missing or invalid items
+# (single questions, single scores) are re-requested up to this many times
+SCHEMA_REREQUEST_ATTEMPTS = 1
+
+# Asynchronous Submission: quizzes are spooled on submit and graded by a worker pool
+GRADING_WORKERS = 8
+GRADING_SPOOL_DIR = os.getenv(
+    "EDUCANVAS_SPOOL_DIR",
+    os.path.join(os.path.expanduser("~"), ".educanvas", "submissions")
+)
+GRADING_POLL_SECONDS = 2  # Results page refresh interval while grading
+GRADING_SPOOL_RETENTION_SECONDS = 7 * 86400  # Finished submissions are forgotten and unspooled after this
+
+# Batch Regrading: all stored attempts of a quiz are re-scored in the background
+REGRADE_CONCURRENCY = 8  # Grading calls in flight per job
+REGRADE_CHECKPOINT_DIR = os.getenv(
+    "EDUCANVAS_CHECKPOINT_DIR",
+    os.path.join(os.path.expanduser("~"), ".educanvas", "regrade")
+)
+
+# Snapshots: storage (in-memory backend), response and grade caches and the
+# practice pool are snapshotted periodically and on shutdown; at boot the
+# latest snapshot is restored and retrieval indexes are built before the
+# first page renders
+SNAPSHOT_ENABLED = True
+SNAPSHOT_DIR = os.getenv(
+    "EDUCANVAS_SNAPSHOT_DIR",
+    os.path.join(os.path.expanduser("~"), ".educanvas", "snapshots")
+)
+SNAPSHOT_INTERVAL_SECONDS = 300
+
+# Bulk CLI (cli.py): decks are rendered in worker processes and quiz drafts
+# generated with bounded concurrency
+CLI_INGEST_WORKERS = os.cpu_count() or 4
+CLI_QUIZ_CONCURRENCY = 4  # Decks whose quizzes are generated at once
+CLI_FILE_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
 # Course Configuration
 DEFAULT_COURSES = [
     "Introduction to Computer Science",
@@ -34,6 +232,9 @@ DEFAULT_COURSES = [
 
 def setup_page_config():
     """Configure Streamlit page settings with complete Canvas theme"""
+    # Imported here so the rest of the configuration loads without Streamlit
+    import streamlit as st
+
     st.set_page_config(
         page_title="EduCanvas - Learning Management System",
         page_icon="📚",
@@ -530,4 +731,19 @@ def get_openai_client():
     BASE_URL = "https://api.ai.it.cornell.edu/"
     OPENAI_BASE_URL = "https://api.ai.it.cornell.edu/"
     from openai import OpenAI
-    return OpenAI()
+
+    if LLM_CASSETTE and LLM_CASSETTE_MODE == "replay":
+        from agents.cassette import get_cassette_client
+        return get_cassette_client(LLM_CASSETTE, mode="replay")
+
+    # Retries and timeouts are handled per call by agents.resilience
+    if LLM_BASE_URL:
+        client = OpenAI(base_url=LLM_BASE_URL, max_retries=0)
+    else:
+        client = OpenAI(max_retries=0)
+
+    if LLM_CASSETTE:
+        from agents.cassette import get_cassette_client
+        return get_cassette_client(LLM_CASSETTE, mode=LLM_CASSETTE_MODE, client=client)
+
+    return client
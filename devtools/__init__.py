@@ -0,0 +1,2 @@
+# devtools/__init__.py
+"""Offline development and load-testing tools for EduCanvas"""
@@ -0,0 +1,204 @@
+"""
+Storage compression benchmark: size versus read latency
+
+Generates synthetic course data shaped like what the app stores (slide
+text, quiz questions, attempt histories with per-question feedback) and
+packs it with each compression setting, reporting the stored size, the
+compression ratio, the time to write and the latency of a read (unpack
+and unpickle, as the storage backends do on access). Dictionaries are
+trained on a separate sample of the same shape, not on the measured data.
+Also measures the memory the in-memory store holds for the attempt
+histories with and without compression:
+
+    python -m devtools.compression_bench
+    python -m devtools.compression_bench --students 80 --quizzes 30
+"""
+
+import argparse
+import pickle
+import random
+import statistics
+import time
+import tracemalloc
+from typing import List, Dict, Any
+from utils.compression import PayloadCodec
+from utils.storage import MemoryBackend
+
+WORDS = ("gradient descent learning rate momentum loss batch epoch regularization overfitting recursion "
+         "stack queue hash table tree graph traversal complexity sorting pointer variance bias kernel "
+         "convolution activation neuron layer weight update backpropagation dropout validation").split()
+PRAISE = ["Good explanation of {a}.", "You correctly identified {a}.", "Clear and well structured answer about {a}."]
+CRITIQUE = ["Your answer does not explain how {a} relates to {b}.", "Consider revisiting {a} before the next quiz.",
+            "The role of {a} in {b} is missing.", "Partially correct: {a} is mentioned but {b} is not."]
+
+SETTINGS = [
+    ("none", "none", 0, False),
+    ("zlib-1", "zlib", 1, False),
+    ("zlib-6", "zlib", 6, False),
+    ("zlib-9", "zlib", 9, False),
+    ("zlib-6+dict", "zlib", 6, True),
+    ("lzma-6", "lzma", 6, False)
+]
+
+
+def _phrase(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length))
+
+
+def _feedback(rng: random.Random) -> str:
+    a, b = rng.sample(WORDS, 2)
+    return " ".join(rng.choice(PRAISE + CRITIQUE).format(a=a, b=b) for _ in range(rng.randint(1, 3)))
+
+
+def make_quiz(rng: random.Random, quiz_id: int, questions: int) -> Dict[str, Any]:
+    return {
+        "id": f"quiz_{quiz_id}",
+        "title": f"Quiz {quiz_id}: {_phrase(rng, 3)}",
+        "quiz_type": "Multiple Choice (MCQ)",
+        "questions": [
+            {
+                "question": f"Which statement about {_phrase(rng, 4)} is correct?",
+                "options": [_phrase(rng, 8) for _ in range(4)],
+                "correct_answer": "A",
+                "learning_objective": f"Understand {_phrase(rng, 3)}",
+                "cognitive_level": rng.choice(["Remember", "Understand", "Apply", "Analyze"]),
+                "explanation": _phrase(rng, 30)
+            }
+            for _ in range(questions)
+        ]
+    }
+
+
+def make_attempts(rng: random.Random, quiz: Dict[str, Any], students: int) -> Dict[str, List[Dict[str, Any]]]:
+    attempts = {}
+    for s in range(students):
+        history = []
+        for _ in range(rng.randint(1, 3)):
+            scores = [
+                {
+                    "question_number": n + 1,
+                    "points_earned": rng.randint(0, 10),
+                    "max_points": 10,
+                    "feedback": _feedback(rng)
+                }
+                for n in range(len(quiz["questions"]))
+            ]
+            history.append({
+                "answers": {str(n): rng.choice("ABCD") for n in range(len(quiz["questions"]))},
+                "status": "graded",
+                "timestamp": "2026-10-19T10:00:00",
+                "key_version": "3f2a9c",
+                "analysis": {
+                    "question_scores": scores,
+                    "overall_score": sum(score["points_earned"] for score in scores) / len(scores) * 10,
+                    "weak_areas": [_phrase(rng, 2) for _ in range(3)],
+                    "strong_areas": [_phrase(rng, 2) for _ in range(2)],
+                    "recommendations": [f"Review {_phrase(rng, 3)} and practice {_phrase(rng, 2)}" for _ in range(3)],
+                    "overall_feedback": " ".join(_feedback(rng) for _ in range(3))
+                }
+            })
+        attempts[f"student_{s}"] = history
+    return attempts
+
+
+def make_slides(rng: random.Random, decks: int, pages: int, page_bytes: int) -> List[Dict[str, Any]]:
+    slides = []
+    for d in range(decks):
+        page_texts = [f"{_phrase(rng, 6).title()}\n" + ". ".join(_phrase(rng, 12) for _ in range(8)) for _ in range(pages)]
+        slides.append({
+            "id": f"slide_{d}",
+            "order": d,
+            "title": f"Deck {d}",
+            "file_type": "pdf",
+            "pages": [rng.randbytes(page_bytes) for _ in range(pages)],
+            "page_count": pages,
+            "content": "\n\n".join(page_texts),
+            "page_texts": page_texts
+        })
+    return slides
+
+
+def make_store(seed: int, args) -> Dict[str, List[Any]]:
+    rng = random.Random(seed)
+    quizzes = [make_quiz(rng, q, args.questions) for q in range(args.quizzes)]
+    return {
+        "slides": [make_slides(rng, args.decks, args.pages, args.page_bytes) for _ in range(args.courses)],
+        "quizzes": [quizzes],
+        "student_attempts": [
+            history for quiz in quizzes for history in make_attempts(rng, quiz, args.students).values()
+        ]
+    }
+
+
+def measure(codec: PayloadCodec, collection: str, values: List[Any], reads: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    packed = [codec.pack(collection, value) for value in values]
+    write_seconds = (time.perf_counter() - started) / len(values)
+
+    latencies = []
+    for _ in range(reads):
+        for item in packed:
+            started = time.perf_counter()
+            codec.unpack(item)
+            latencies.append(time.perf_counter() - started)
+
+    return {
+        "raw": sum(len(codec.pickled(value)[0]) for value in values),
+        "stored": sum(len(item.data) for item in packed),
+        "write_ms": write_seconds * 1000,
+        "read_ms": statistics.median(latencies) * 1000
+    }
+
+
+def memory_held(codec: PayloadCodec, attempts: List[List[Dict[str, Any]]]) -> int:
+    """Bytes the in-memory store allocates to hold the attempt histories"""
+    serialized = [pickle.dumps(value) for value in attempts]
+    tracemalloc.start()
+    backend = MemoryBackend(codec=codec)
+    for i, data in enumerate(serialized):
+        backend.set("student_attempts", f"course_quiz_student_{i}", pickle.loads(data))  # As built by the grading code
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare storage compression settings by size and read latency")
+    parser.add_argument("--courses", type=int, default=2, help="Courses (one slide list each)")
+    parser.add_argument("--decks", type=int, default=20, help="Slide decks per course")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per deck")
+    parser.add_argument("--page-bytes", type=int, default=20000, help="Size of each page rendition (kept uncompressed)")
+    parser.add_argument("--quizzes", type=int, default=20, help="Quizzes (one attempt history each)")
+    parser.add_argument("--questions", type=int, default=8, help="Questions per quiz")
+    parser.add_argument("--students", type=int, default=40, help="Students attempting each quiz")
+    parser.add_argument("--reads", type=int, default=5, help="Reads of every value per setting")
+    args = parser.parse_args()
+
+    store = make_store(1, args)
+    training = make_store(2, args)
+    collections = tuple(store)
+
+    print("Sizes are text and JSON only; page images are stored as they are.")
+    print()
+    print(f"{'Collection':<17} {'Setting':<12} {'Raw KB':>9} {'Stored KB':>10} {'Ratio':>7} "
+          f"{'Write ms':>9} {'Read ms':>8}")
+
+    for collection in collections:
+        for name, method, level, dictionary in SETTINGS:
+            codec = PayloadCodec(method=method, level=level, collections=collections)
+            if dictionary:
+                codec.train(collection, training[collection])
+            result = measure(codec, collection, store[collection], args.reads)
+            print(f"{collection:<17} {name:<12} {result['raw'] / 1024:>9.0f} {result['stored'] / 1024:>10.0f} "
+                  f"{result['raw'] / result['stored']:>6.1f}x {result['write_ms']:>9.2f} {result['read_ms']:>8.2f}")
+        print()
+
+    attempts = store["student_attempts"]
+    plain = memory_held(PayloadCodec(method="none"), attempts)
+    packed = memory_held(PayloadCodec(method="zlib", collections=collections), attempts)
+    print(f"Attempt histories held in memory: {plain / 1024 / 1024:.1f} MB uncompressed, "
+          f"{packed / 1024 / 1024:.1f} MB with zlib-6 ({plain / packed:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+Local OpenAI-compatible stub for exercising the agents without network access
+
+Serves POST /v1/chat/completions (streaming and non-streaming) with canned,
+schema-valid responses for each agent, configurable latency, token rate and
+error injection. Point the app at it with:
+
+    python -m devtools.llm_stub --port 8700 --latency lognormal:0.8,0.4 --tokens-per-second 80
+    EDUCANVAS_LLM_BASE_URL=http://127.0.0.1:8700/v1 streamlit run app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+
+def parse_latency(spec: str):
+    """
+    Parse a latency distribution spec into a sampler returning seconds
+
+    Args:
+        spec: "fixed:S", "uniform:LOW,HIGH" or "lognormal:MEDIAN,SIGMA"
+
+    Returns:
+        Function (random.Random) -> seconds
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda rng: median * rng.lognormvariate(0, sigma)
+
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+def canned_content(messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> str:
+    """
+    Build a plausible response for an agent request, recognised by its prompt
+
+    Args:
+        messages: Chat messages of the request
+        max_tokens: Completion limit of the request, if any
+
+    Returns:
+        Response text (JSON for the agents that expect JSON)
+    """
+    text = "\n".join(str(m.get("content", "")) for m in messages)
+
+    if "Grade the student answer" in text:
+        match = re.search(r"MAX POINTS:\s*(\d+)", text)
+        max_points = int(match.group(1)) if match else 10
+        return json.dumps({
+            "points_earned": max_points * 0.7,
+            "max_points": max_points,
+            "percentage": 70,
+            "feedback": {
+                "strengths": ["Identifies the main idea"],
+                "weaknesses": ["Misses a supporting detail"],
+                "points_awarded_for": ["Correct definition"],
+                "points_deducted_for": ["No example given"]
+            },
+            "suggested_answer": "A complete answer states the definition and gives an example.",
+            "concepts_to_review": ["Supporting examples"]
+        })
+
+    if "Analyze this quiz submission" in text:
+        count = len(re.findall(r"^Q\d+:", text, re.MULTILINE)) or 1
+        return json.dumps({
+            "overall_score": 70,
+            "question_scores": [
+                {"question_number": i, "points_earned": 7, "max_points": 10, "feedback": "Mostly correct."}
+                for i in range(1, count + 1)
+            ],
+            "weak_areas": ["Applying the concept to new examples"],
+            "strong_areas": ["Core definitions"],
+            "recommendations": ["Work through two more applied problems"],
+            "overall_feedback": "Solid understanding with room to practise application."
+        })
+
+    if "Generate one practice question" in text:
+        return json.dumps({
+            "question": "Why does the concept hold in the general case?",
+            "answer": "Because each step preserves the property being tested.",
+            "explanation": "The argument generalises from the worked example.",
+            "hints": ["Look at the worked example", "What stays the same at each step?"]
+        })
+
+    if "practice questions" in text:
+        match = re.search(r"Generate (\d+) practice questions", text)
+        count = int(match.group(1)) if match else 5
+        return json.dumps({"questions": [
+            {
+                "question": f"Practice question {i}: what is the key idea of this section?",
+                "type": "MCQ",
+                "options": ["A. The key idea", "B. A distractor", "C. Another distractor", "D. None of these"],
+                "correct_answer": "A",
+                "explanation": "The section introduces the key idea first.",
+                "difficulty": "Medium",
+                "topic": f"Topic {i}"
+            }
+            for i in range(1, count + 1)
+        ]})
+
+    if "quiz questions" in text:
+        match = re.search(r"generate (\d+) quiz questions", text, re.IGNORECASE)
+        count = int(match.group(1)) if match else 5
+        return json.dumps({"questions": [_quiz_question(text, i) for i in range(1, count + 1)]})
+
+    if "Update the summary of a tutoring session" in text:
+        return "The student asked about the slide's main concept and worked through one example."
+
+    words = max(20, min(max_tokens or 300, 300))
+    sentence = "This concept builds on the previous idea, and a worked example makes each step concrete. "
+    return (sentence * (words // len(sentence.split()) + 1)).strip()
+
+
+def _quiz_question(prompt: str, number: int) -> Dict[str, Any]:
+    """Question in the layout the quiz generator asked for"""
+    question = {
+        "question": f"Quiz question {number}: explain the concept in your own words.",
+        "learning_objective": f"Objective {number}",
+        "cognitive_level": "Understand"
+    }
+
+    if "4 answer options" in prompt:
+        question.update({
+            "options": ["A. Correct option", "B. Distractor", "C. Distractor", "D. Distractor"],
+            "correct_answer": "A",
+            "explanation": "Option A restates the definition."
+        })
+    elif "conversational questions" in prompt:
+        question.update({
+            "sample_answer": "A good response connects the concept to an example.",
+            "key_points": ["Definition", "Example"]
+        })
+    else:
+        question.update({
+            "rubric": {
+                "excellent": "Complete and well structured",
+                "good": "Mostly complete",
+                "needs_improvement": "Missing key parts"
+            },
+            "expected_length": "2-3 paragraphs"
+        })
+
+    return question
+
+
+class LLMStub:
+    """Behaviour of the stub: latency, token rate and injected errors"""
+
+    def __init__(self,
+                 latency: str = "fixed:0",
+                 tokens_per_second: float = 0,
+                 error_rate: float = 0.0,
+                 error_statuses: List[int] = None,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            latency: Time-to-first-token distribution (see parse_latency)
+            tokens_per_second: Generation speed after the first token (0 = instant)
+            error_rate: Fraction of requests answered with an injected error
+            error_statuses: HTTP statuses to inject (chosen at random)
+            seed: Seed for reproducible latency and error sequences
+        """
+        self.sample_latency = parse_latency(latency)
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 503]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "streams": 0}
+
+    def plan(self):
+        """Draw this request's first-token latency and injected error status (or None)"""
+        with self._lock:
+            self.stats["requests"] += 1
+            latency = self.sample_latency(self._rng)
+            status = None
+            if self._rng.random() < self.error_rate:
+                status = self._rng.choice(self.error_statuses)
+                self.stats["errors"] += 1
+        return latency, status
+
+    def token_delay(self, tokens: int) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return tokens / self.tokens_per_second
+
+
+def make_handler(stub: LLMStub):
+    """Build a request handler class bound to a stub configuration"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+                return
+
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+
+            latency, status = stub.plan()
+            time.sleep(latency)
+
+            if status is not None:
+                self._send_json(status, {"error": {"message": "Injected error", "type": "stub_error", "code": status}})
+                return
+
+            content = canned_content(request.get("messages", []), request.get("max_tokens"))
+            model = request.get("model", "stub")
+            prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+            pieces = re.findall(r"\S+\s*", content) or [content]
+
+            if request.get("stream"):
+                with stub._lock:
+                    stub.stats["streams"] += 1
+                self._stream(model, pieces)
+                return
+
+            time.sleep(stub.token_delay(len(pieces)))
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(pieces),
+                    "total_tokens": prompt_tokens + len(pieces)
+                }
+            })
+
+        def _stream(self, model: str, pieces: List[str]):
+            """Send the response as server-sent events, one token-sized piece at a time"""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            for piece in pieces + [None]:
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": piece} if piece is not None else {},
+                        "finish_reason": None if piece is not None else "stop"
+                    }]
+                }
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(stub.token_delay(1))
+
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+
+        def _write_chunk(self, text: str):
+            data = text.encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, status: int, body: Dict[str, Any]):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass  # Keep load tests quiet
+
+    return Handler
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, **options) -> ThreadingHTTPServer:
+    """
+    Start the stub in a background thread (for load tests and benchmarks)
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+        **options: LLMStub options (latency, tokens_per_second, error_rate, ...)
+
+    Returns:
+        The running server; its base_url attribute is the OpenAI base URL to use
+    """
+    stub = LLMStub(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(stub))
+    server.daemon_threads = True
+    server.stub = stub
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for EduCanvas agents")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--latency", default="fixed:0",
+                        help='Time to first token: "fixed:S", "uniform:LOW,HIGH" or "lognormal:MEDIAN,SIGMA"')
+    parser.add_argument("--tokens-per-second", type=float, default=0, help="Generation speed (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-statuses", default="429,500,503", help="Comma-separated statuses to inject")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    stub = LLMStub(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",") if s],
+        seed=args.seed
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    server.daemon_threads = True
+    print(f"LLM stub listening on http://{args.host}:{args.port}/v1")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
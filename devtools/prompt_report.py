@@ -0,0 +1,209 @@
+"""
+Token report for agent prompts
+
+Runs every agent operation against a capturing client (no network), counts
+the prompt tokens each one sends and compares them with a recorded baseline:
+
+    python -m devtools.prompt_report                   # compare with the baseline
+    python -m devtools.prompt_report --write-baseline  # record current prompts as the new baseline
+
+It also reports, per agent, how many leading tokens of the system prompt are
+identical across its variants (quiz types, difficulty levels, weak areas),
+i.e. the prefix that provider-side prompt caching can reuse.
+"""
+
+import argparse
+import json
+import os
+from types import SimpleNamespace
+from typing import List, Dict, Any, Callable
+from devtools.llm_stub import canned_content
+from utils.tokens import count_tokens
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "prompt_baseline.json")
+
+SAMPLE_SLIDE = """Lecture 4: Gradient Descent
+Gradient descent minimises a loss function by repeatedly stepping against its gradient.
+The learning rate controls the step size: too large diverges, too small converges slowly.
+Stochastic gradient descent estimates the gradient from a mini-batch of examples.
+Momentum accumulates past gradients to damp oscillations along steep directions.
+Example: for f(x) = x^2 with learning rate 0.1, x moves from 1.0 to 0.8 to 0.64."""
+
+SAMPLE_OBJECTIVES = """- Explain how the learning rate affects convergence
+- Compare batch and stochastic gradient descent
+- Apply one gradient descent step by hand"""
+
+SAMPLE_QUESTIONS = [
+    {"question": "What happens when the learning rate is too large?", "correct_answer": "The iterates diverge"},
+    {"question": "Why use mini-batches?", "sample_answer": "They give cheap, noisy gradient estimates"},
+    {"question": "Take one step on f(x) = x^2 from x = 1 with rate 0.1.", "rubric": {"excellent": "0.8 with working"}}
+]
+
+SAMPLE_ANSWERS = [
+    {"answer": "It overshoots the minimum and can diverge."},
+    {"answer": "They are faster."},
+    {"answer": "x = 0.8"}
+]
+
+
+class CapturingClient:
+    """Client stand-in that records requests and answers with the stub's canned content"""
+
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **request):
+        self.requests.append(request)
+        content = canned_content(request.get("messages", []), request.get("max_tokens"))
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0)
+        )
+
+
+def _scenarios() -> Dict[str, Callable[[Callable], None]]:
+    """Scenario name -> function running one agent call with a given agent factory"""
+    from agents import LearnerAgent, QuizGeneratorAgent, TesterAgent, ReviewerAgent
+    from config import QUIZ_TYPES, DIFFICULTY_LEVELS
+
+    scenarios = {}
+
+    for quiz_type in QUIZ_TYPES:
+        scenarios[f"QuizGeneratorAgent.generate_quiz[{quiz_type}]"] = (
+            lambda make, qt=quiz_type: make(QuizGeneratorAgent).generate_quiz(SAMPLE_SLIDE, SAMPLE_OBJECTIVES, qt, 5)
+        )
+        scenarios[f"ReviewerAgent.analyze_quiz_performance[{quiz_type}]"] = (
+            lambda make, qt=quiz_type: make(ReviewerAgent).analyze_quiz_performance(SAMPLE_QUESTIONS, SAMPLE_ANSWERS, qt)
+        )
+
+    for difficulty in DIFFICULTY_LEVELS:
+        scenarios[f"TesterAgent.generate_practice_quiz[{difficulty}]"] = (
+            lambda make, d=difficulty: make(TesterAgent).generate_practice_quiz(SAMPLE_SLIDE, d, 5)
+        )
+
+    scenarios["TesterAgent.generate_quick_question"] = (
+        lambda make: make(TesterAgent).generate_quick_question("learning rate")
+    )
+    scenarios["ReviewerAgent.grade_individual_answer"] = (
+        lambda make: make(ReviewerAgent).grade_individual_answer(SAMPLE_QUESTIONS[2], SAMPLE_ANSWERS[2]["answer"])
+    )
+    scenarios["LearnerAgent.teach_concept[explain]"] = (
+        lambda make: make(LearnerAgent).teach_concept(SAMPLE_SLIDE)
+    )
+    scenarios["LearnerAgent.teach_concept[weak areas]"] = (
+        lambda make: make(LearnerAgent).teach_concept(SAMPLE_SLIDE, weak_areas=["learning rate", "momentum"])
+    )
+    scenarios["LearnerAgent.teach_concept[question]"] = (
+        lambda make: make(LearnerAgent).teach_concept(SAMPLE_SLIDE, user_question="Why does momentum help?")
+    )
+
+    def summarize(make):
+        agent = make(LearnerAgent)
+        agent._summarize_turns([
+            {"role": "user", "content": "Why does momentum help?"},
+            {"role": "assistant", "content": "It averages gradients so oscillations cancel out."}
+        ])
+    scenarios["LearnerAgent.summarize_history"] = summarize
+
+    return scenarios
+
+
+def capture_prompts() -> Dict[str, List[Dict[str, str]]]:
+    """Run every scenario and return the messages each one sent"""
+    captured = {}
+
+    for name, run in _scenarios().items():
+        client = CapturingClient()
+
+        def make(agent_class):
+            agent = agent_class(user_id="prompt-report")
+            agent.client = client
+            agent.cache_ttls = {}
+            return agent
+
+        run(make)
+        captured[name] = [
+            {"role": m["role"], "content": m["content"]}
+            for request in client.requests
+            for m in request["messages"]
+        ]
+
+    return captured
+
+
+def _tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(count_tokens(m["content"]) for m in messages)
+
+
+def _shared_prefix_tokens(prompts: List[str]) -> int:
+    """Tokens in the longest common prefix of several prompts"""
+    if len(prompts) < 2:
+        return 0
+    prefix = os.path.commonprefix(prompts)
+    return count_tokens(prefix)
+
+
+def build_report(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """One row per scenario with baseline and current prompt tokens"""
+    rows = []
+    for name, messages in current.items():
+        old = _tokens(baseline[name]) if name in baseline else None
+        new = _tokens(messages)
+        rows.append({
+            "scenario": name,
+            "baseline": old,
+            "current": new,
+            "saved": f"{(old - new) / old * 100:.1f}%" if old else "-"
+        })
+    return rows
+
+
+def _prefix_report(prompts: Dict[str, List[Dict[str, str]]]) -> Dict[str, int]:
+    """Shared system-prompt prefix tokens per agent operation, across its variants"""
+    groups = {}
+    for name, messages in prompts.items():
+        operation = name.split("[")[0]
+        systems = [m["content"] for m in messages if m["role"] == "system"]
+        if systems:
+            groups.setdefault(operation, []).append(systems[0])
+    return {operation: _shared_prefix_tokens(systems) for operation, systems in groups.items() if len(systems) > 1}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare agent prompt tokens with the recorded baseline")
+    parser.add_argument("--write-baseline", action="store_true", help="Record the current prompts as the baseline")
+    args = parser.parse_args()
+
+    current = capture_prompts()
+
+    if args.write_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=1)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    rows = build_report(current, baseline)
+    width = max(len(row["scenario"]) for row in rows)
+    print(f"{'Scenario':<{width}}  {'Baseline':>8}  {'Current':>8}  {'Saved':>7}")
+    for row in rows:
+        print(f"{row['scenario']:<{width}}  {row['baseline'] or '-':>8}  {row['current']:>8}  {row['saved']:>7}")
+
+    old_total = sum(row["baseline"] or 0 for row in rows)
+    new_total = sum(row["current"] for row in rows if row["baseline"])
+    if old_total:
+        print(f"{'Total':<{width}}  {old_total:>8}  {new_total:>8}  {(old_total - new_total) / old_total * 100:>6.1f}%")
+
+    print("\nShared system-prompt prefix across variants (tokens): baseline -> current")
+    old_prefix = _prefix_report(baseline)
+    for operation, tokens in _prefix_report(current).items():
+        print(f"  {operation}: {old_prefix.get(operation, '-')} -> {tokens}")
+
+
+if __name__ == "__main__":
+    main()
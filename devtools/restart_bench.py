@@ -0,0 +1,164 @@
+"""
+Restart benchmark: cold boot versus warm start from a snapshot
+
+Populates a directory store with synthetic courses (slides with page
+images and text), warms the response cache and snapshots the state, then
+boots fresh processes with and without warm start and measures
+restart-to-ready time and the latency of the first requests after boot:
+
+    python -m devtools.restart_bench
+    python -m devtools.restart_bench --slides 40 --pages 20 --cached-responses 400
+
+Everything runs in a temporary directory; nothing touches ~/.educanvas.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Dict, Any
+
+WORDS = ("gradient descent learning rate momentum loss batch epoch regularization overfitting "
+         "recursion stack queue hash table tree graph traversal complexity sorting pointer").split()
+
+
+def _page_text(course: int, slide: int, page: int) -> str:
+    return " ".join(WORDS[(course * 7 + slide * 3 + page + i) % len(WORDS)] for i in range(120))
+
+
+def _cache_key(course: str, slide: int) -> str:
+    from agents.response_cache import make_cache_key
+    return make_cache_key("bench", [{"role": "user", "content": f"Explain {course} slide {slide}"}], {})
+
+
+def populate(args) -> Dict[str, Any]:
+    from utils.storage import save_slides, get_course_index
+    from agents.response_cache import get_response_cache
+    from utils.snapshots import get_snapshotter
+    from config import DEFAULT_COURSES
+
+    page_image = os.urandom(args.page_bytes)
+    for c, course in enumerate(DEFAULT_COURSES):
+        slides = []
+        for s in range(args.slides):
+            page_texts = [_page_text(c, s, p) for p in range(args.pages)]
+            slides.append({
+                "id": f"slide_{s}",
+                "order": s,
+                "title": f"Deck {s}",
+                "file_type": "pdf",
+                "pages": [page_image] * args.pages,
+                "page_count": args.pages,
+                "content": "\n\n".join(page_texts),
+                "page_texts": page_texts
+            })
+        save_slides(course, slides)
+        get_course_index(course)
+
+        for s in range(args.cached_responses // len(DEFAULT_COURSES)):
+            get_response_cache().set(_cache_key(course, s), "explanation " * 200, ttl=3600, latency=2.0)
+
+    return get_snapshotter().snapshot()
+
+
+def boot(args) -> Dict[str, Any]:
+    from utils.snapshots import get_snapshotter, _process_age
+    from utils.storage import get_slides, get_course_index
+    from agents.response_cache import get_response_cache
+    from config import DEFAULT_COURSES
+
+    if args.mode == "warm":
+        get_snapshotter().start()
+    ready = _process_age()
+
+    # First requests after boot: retrieval over each course's slides and
+    # lookups of explanations served before the restart
+    latencies, hits, lookups = [], 0, 0
+    for course in DEFAULT_COURSES:
+        started = time.perf_counter()
+        get_slides(course)
+        get_course_index(course).search(f"{WORDS[0]} {WORDS[5]}")
+        latencies.append(time.perf_counter() - started)
+
+        for s in range(args.cached_responses // len(DEFAULT_COURSES)):
+            lookups += 1
+            hits += get_response_cache().get(_cache_key(course, s)) is not None
+
+    return {
+        "ready_seconds": ready,
+        "first_request_max": max(latencies),
+        "first_request_avg": sum(latencies) / len(latencies),
+        "cache_hit_rate": hits / lookups if lookups else 0.0,
+        "warm_start": get_snapshotter().get_stats() if args.mode == "warm" else None
+    }
+
+
+def _run_child(root: str, args: List[str]) -> Dict[str, Any]:
+    env = dict(
+        os.environ,
+        HOME=root,
+        EDUCANVAS_STORAGE="directory",
+        EDUCANVAS_STORAGE_DIR=os.path.join(root, "store"),
+        EDUCANVAS_SNAPSHOT_DIR=os.path.join(root, "snapshots")
+    )
+    env.pop("EDUCANVAS_CACHE_DIR", None)
+    output = subprocess.run(
+        [sys.executable, "-m", "devtools.restart_bench", *args],
+        env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True,
+        capture_output=True,
+        text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure restart-to-ready time and first-request latency")
+    parser.add_argument("--slides", type=int, default=20, help="Slide decks per course")
+    parser.add_argument("--pages", type=int, default=12, help="Pages per deck")
+    parser.add_argument("--page-bytes", type=int, default=20000, help="Size of each page rendition")
+    parser.add_argument("--cached-responses", type=int, default=200, help="Explanations cached before the restart")
+    parser.add_argument("--runs", type=int, default=3, help="Boots per mode (the median is reported)")
+    parser.add_argument("--child", choices=["populate", "boot"], help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["cold", "warm"], default="cold", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child == "populate":
+        print(json.dumps(populate(args)))
+        return
+    if args.child == "boot":
+        print(json.dumps(boot(args)))
+        return
+
+    sizing = ["--slides", str(args.slides), "--pages", str(args.pages),
+              "--page-bytes", str(args.page_bytes), "--cached-responses", str(args.cached_responses)]
+    root = tempfile.mkdtemp(prefix="educanvas-bench-")
+    try:
+        snapshot = _run_child(root, ["--child", "populate", *sizing])
+        print(f"Snapshot: {snapshot['bytes'] / 1024:.0f} KB written in {snapshot['seconds']:.2f}s")
+        print()
+        print(f"{'Mode':<6} {'Ready (s)':>10} {'1st req max (s)':>16} {'1st req avg (s)':>16} {'Cache hits':>11}")
+
+        for mode in ("cold", "warm"):
+            runs = sorted(
+                (_run_child(root, ["--child", "boot", "--mode", mode, *sizing]) for _ in range(args.runs)),
+                key=lambda r: r["ready_seconds"] + r["first_request_max"]
+            )
+            result = runs[len(runs) // 2]
+            print(f"{mode:<6} {result['ready_seconds']:>10.2f} {result['first_request_max']:>16.4f} "
+                  f"{result['first_request_avg']:>16.4f} {result['cache_hit_rate'] * 100:>10.0f}%")
+            if result["warm_start"]:
+                stats = result["warm_start"]
+                print(f"       restore {stats['restore_seconds']:.2f}s, index warm-up {stats['warm_seconds']:.2f}s, "
+                      f"restored {stats['restored_entries']}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,13 @@ from config import setup_page_config
 from pages.instructor import render_instructor_mode
 from pages.student import render_student_mode
 from utils.storage import initialize_storage
+from utils.snapshots import warm_start
 
 def main():
     """Main application entry point"""
     setup_page_config()
     initialize_storage()
+    warm_start()  # Once per process: restores the latest snapshot before the first page renders
     
     # Header with mode toggle
     col1, col2, col3 = st.columns([2, 3, 2])
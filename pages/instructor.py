@@ -1,11 +1,25 @@
 import streamlit as st
-from utils.storage import save_slides, get_slides, save_quiz, get_quizzes, get_quiz_attempts
+from utils.storage import get_slides, get_quizzes, get_quiz_attempts
+from utils.question_pool import get_question_pool
+from utils.warmup import get_tutor_warmup
+from utils.grading_queue import get_grading_queue
 from utils.ui_components import render_quiz_card, render_progress_indicator
-from utils.pdf_handler import pdf_to_images, is_pdf, is_image, extract_text_from_pdf, get_pdf_page_count
-from agents.quiz_generator import QuizGeneratorAgent
+from services import ingest_files, delete_slide, compile_slide_content, stream_quiz_questions, get_drafts, discard_draft, publish_quiz, save_answer_key, start_regrade, get_regrade
 from agents.reviewer_agent import ReviewerAgent
-from config import DEFAULT_COURSES, QUIZ_TYPES
+from agents.response_cache import get_response_cache
+from agents.single_flight import get_single_flight
+from agents.scheduler import get_scheduler
+from agents.resilience import get_resilient_caller
+from agents.model_router import get_model_router
+from agents.metrics import get_metrics
+from agents.grade_cache import get_grade_cache
+from agents.validation import get_output_validator
+from utils.snapshots import get_snapshotter
+from utils.tokens import count_tokens
+from config import DEFAULT_COURSES, QUIZ_TYPES, QUIZ_CONTEXT_TOKEN_BUDGET, ADMIN_VIEW_ENABLED
+from typing import Dict, Any
 import json
+import time
 
 def render_instructor_mode():
     """Main render function for instructor mode"""
@@ -24,20 +38,136 @@ def render_instructor_mode():
 
     st.sidebar.divider()
 
-    # Navigation
+    # Navigation (the admin view is hidden unless enabled in config or with ?admin=1)
+    pages = ["📄 Manage Slides", "✍️ Create Quiz", "📊 Quiz Reports"]
+    if ADMIN_VIEW_ENABLED or st.query_params.get("admin") == "1":
+        pages.append("🛠️ Admin")
+
     page = st.sidebar.radio(
         "Navigation",
-        ["📄 Manage Slides", "✍️ Create Quiz", "📊 Quiz Reports"]
+        pages
     )
 
+    render_cache_stats()
+
     # Render selected page
     if page == "📄 Manage Slides":
         render_slides_management(selected_course)
     elif page == "✍️ Create Quiz":
         render_quiz_creation(selected_course)
+    elif page == "🛠️ Admin":
+        render_admin_metrics()
     else:
         render_quiz_reports(selected_course)
 
+def render_cache_stats():
+    """Render AI response cache statistics in the sidebar"""
+
+    stats = get_response_cache().get_stats()
+    flight_stats = get_single_flight().get_stats()
+    pool_stats = get_question_pool().get_stats()
+    warmup_stats = get_tutor_warmup().get_stats()
+    scheduler_stats = get_scheduler().get_stats()
+    resilience_stats = get_resilient_caller().get_stats()
+    routing_stats = get_model_router().get_stats()
+    grade_stats = get_grade_cache().get_stats()
+    submission_stats = get_grading_queue().get_stats()
+    validation_stats = get_output_validator().get_stats()
+    snapshot_stats = get_snapshotter().get_stats()
+
+    with st.sidebar.expander("⚡ AI Response Cache"):
+        st.markdown(f"**Hit rate:** {stats['hit_rate'] * 100:.1f}% ({stats['hits']} hits / {stats['misses']} misses)")
+        st.markdown(f"**Saved latency:** {stats['saved_latency_seconds']:.1f}s")
+        st.markdown(f"**Saved tokens:** {stats['saved_tokens']:,}")
+        st.markdown(f"**Entries:** {stats['entries']}")
+        st.markdown(f"**Coalesced requests:** {flight_stats['coalesced']} ({flight_stats['in_flight']} in flight)")
+        st.markdown(f"**Practice pool:** {pool_stats['questions']} questions, {pool_stats['hits']} served / {pool_stats['misses']} misses")
+        st.markdown(f"**Tutor warm-up:** {warmup_stats['warmed']} warmed, {warmup_stats['pending']} pending")
+        st.markdown(f"**LLM queue:** {scheduler_stats['queue_depth']} waiting, {scheduler_stats['rate_limited']} rate-limit pauses")
+        for name in ("grading", "interactive", "background"):
+            st.caption(f"{name}: avg wait {scheduler_stats[name]['avg_queue_seconds']:.2f}s, max {scheduler_stats[name]['max_queue_seconds']:.2f}s")
+        st.markdown(
+            f"**LLM reliability:** circuit {resilience_stats['circuit']}, {resilience_stats['retries']} retries, "
+            f"{resilience_stats['failures']} failures, {resilience_stats['hedge_wins']}/{resilience_stats['hedges']} hedges won"
+        )
+        tiers = ", ".join(f"{tier} {count}" for tier, count in sorted(routing_stats['routed'].items()))
+        st.markdown(
+            f"**Model routing:** {tiers or 'no calls yet'}; {routing_stats['fallbacks']} SLO fallbacks"
+            f"{' (degraded)' if routing_stats['degraded'] else ''}"
+        )
+        st.markdown(f"**Grade memo:** {grade_stats['hit_rate'] * 100:.1f}% reused ({grade_stats['hits']} of {grade_stats['hits'] + grade_stats['misses']} answers)")
+        st.markdown(
+            f"**Submission grading:** {submission_stats['queued']} queued, {submission_stats['grading']} grading, "
+            f"{submission_stats['failed']} failed; avg {submission_stats['avg_seconds_to_result']:.1f}s to result"
+        )
+        st.markdown(
+            f"**Output validation:** {validation_stats['json_repaired']} repaired locally, "
+            f"{validation_stats['items_rejected']} items rejected, {validation_stats['re_requests']} targeted re-requests"
+        )
+        ready = snapshot_stats['ready_after_start_seconds']
+        st.markdown(
+            f"**Warm start:** {'restored snapshot' if snapshot_stats['restored'] else 'no snapshot'}, "
+            f"ready {ready:.1f}s after start" if ready is not None else "**Warm start:** not run in this process"
+        )
+        if snapshot_stats['last_snapshot_at']:
+            st.caption(
+                f"Last snapshot {snapshot_stats['last_snapshot_at'][:19]}: "
+                f"{snapshot_stats['last_snapshot_bytes'] / 1024:.0f} KB in {snapshot_stats['last_snapshot_seconds']:.2f}s"
+            )
+
+def render_admin_metrics():
+    """Render per-operation latency, token and cache metrics for agent calls"""
+
+    st.header("🛠️ Agent Call Metrics")
+
+    metrics = get_metrics()
+    rows = metrics.get_summary()
+
+    if not rows:
+        st.info("No agent calls recorded yet")
+        return
+
+    st.subheader("Latency (seconds)")
+    st.dataframe(
+        [
+            {
+                "Operation": row["operation"],
+                "Calls": row["calls"],
+                "p50": row["latency_p50"],
+                "p95": row["latency_p95"],
+                "p99": row["latency_p99"],
+                "TTFT p95": row["ttft_p95"],
+                "Queue p95": row["queue_p95"],
+                "Total": row["total_latency"]
+            }
+            for row in rows
+        ],
+        use_container_width=True
+    )
+
+    st.subheader("Tokens and Cache")
+    st.dataframe(
+        [
+            {
+                "Operation": row["operation"],
+                "Prompt tokens": row["prompt_tokens"],
+                "Completion tokens": row["completion_tokens"],
+                "Cache hit rate": f"{row['cache_hit_rate'] * 100:.1f}%",
+                "Coalesced": row["coalesced"],
+                "Retries": row["retries"],
+                "Errors": row["errors"]
+            }
+            for row in rows
+        ],
+        use_container_width=True
+    )
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("📥 Events (JSONL)", metrics.export_jsonl(), file_name="agent_calls.jsonl")
+    with col2:
+        st.download_button("📥 Prometheus", metrics.export_prometheus(), file_name="metrics.prom")
+
 def render_slides_management(course_name: str):
     """Render slide upload and management interface"""
 
@@ -59,56 +189,14 @@ def render_slides_management(course_name: str):
     with col2:
         if st.button("📤 Upload Slides", type="primary"):
             if uploaded_files:
-                slides = []
-                current_slide_count = len(get_slides(course_name))
-
                 with st.spinner("Processing files..."):
-                    for file in uploaded_files:
-                        file_bytes = file.getvalue()
-                        file_type = file.type if hasattr(file, 'type') else 'unknown'
-
-                        # Check if PDF
-                        if is_pdf(file_bytes) or file_type == 'application/pdf':
-                            # Convert PDF to images and extract text
-                            try:
-                                images = pdf_to_images(file_bytes)
-                                text_content = extract_text_from_pdf(file_bytes)
-
-                                if images:
-                                    # Store PDF as single slide with multiple pages
-                                    slides.append({
-                                        'id': f"slide_{current_slide_count + len(slides)}",
-                                        'title': file.name,
-                                        'file_type': 'pdf',
-                                        'pages': images,  # List of image bytes for each page
-                                        'page_count': len(images),
-                                        'order': current_slide_count + len(slides),
-                                        'content': text_content,
-                                        'original_filename': file.name
-                                    })
-                                else:
-                                    st.warning(f"⚠️ Could not process PDF: {file.name}")
-                            except Exception as e:
-                                st.error(f"❌ Error processing {file.name}: {str(e)}")
-
-                        # Check if image
-                        elif is_image(file_bytes):
-                            slides.append({
-                                'id': f"slide_{current_slide_count + len(slides)}",
-                                'title': file.name,
-                                'file_type': 'image',
-                                'pages': [file_bytes],  # Single page for images
-                                'page_count': 1,
-                                'order': current_slide_count + len(slides),
-                                'content': f"Image: {file.name}",
-                                'original_filename': file.name
-                            })
-                        else:
-                            st.warning(f"⚠️ Unsupported file type: {file.name}")
-
-                if slides:
-                    save_slides(course_name, slides)
-                    st.success(f"✅ Uploaded {len(slides)} slide(s)!")
+                    result = ingest_files(course_name, [(file.name, file.getvalue()) for file in uploaded_files])
+
+                for error in result['errors']:
+                    st.warning(f"⚠️ {error}")
+
+                if result['slides']:
+                    st.success(f"✅ Uploaded {len(result['slides'])} slide(s)!")
                     st.rerun()
                 else:
                     st.error("❌ No valid slides to upload!")
@@ -145,8 +233,7 @@ def render_slides_management(course_name: str):
 
             with col3:
                 if st.button(f"🗑️ Remove", key=f"remove_{slide['id']}"):
-                    existing_slides.pop(idx)
-                    st.session_state.slides[course_name] = existing_slides
+                    delete_slide(course_name, slide)
                     st.rerun()
     else:
         st.info("No slides uploaded yet. Upload slides to get started!")
@@ -195,6 +282,8 @@ def render_ai_quiz_creation(course_name: str):
         st.warning("⚠️ Please upload slides first before creating AI-generated quizzes.")
         return
 
+    render_quiz_drafts(course_name)
+
     # Quiz configuration
     col1, col2 = st.columns(2)
 
@@ -227,6 +316,15 @@ def render_ai_quiz_creation(course_name: str):
         height=150
     )
 
+    # Compile slide content
+    slide_content = compile_slide_content(slides, selected_slide_indices)
+    content_tokens = count_tokens(slide_content)
+
+    if content_tokens > QUIZ_CONTEXT_TOKEN_BUDGET:
+        st.caption(f"📏 ~{content_tokens:,} tokens selected - content will be split into chunks and questions generated in parallel")
+    else:
+        st.caption(f"📏 ~{content_tokens:,} tokens selected")
+
     st.divider()
 
     # Generate quiz
@@ -236,37 +334,79 @@ def render_ai_quiz_creation(course_name: str):
         elif not learning_objectives:
             st.error("Please enter learning objectives!")
         else:
-            with st.spinner("🤖 AI is generating quiz questions..."):
-                # Compile slide content
-                slide_content = "\n\n".join([
-                    f"Slide {i+1}: {slides[i]['title']}\n{slides[i]['content']}"
-                    for i in selected_slide_indices
-                ])
-
-                # Generate quiz
-                agent = QuizGeneratorAgent()
-                quiz_data = agent.generate_quiz(
-                    slide_content=slide_content,
+            # Generate quiz, showing each question as soon as it is complete
+            questions = []
+            error = None
+            preview = st.empty()
+
+            with preview.container():
+                status = st.empty()
+                status.info(f"🤖 AI is generating quiz questions... (0/{num_questions})")
+
+                for item in stream_quiz_questions(
+                    course_name,
+                    selected_slide_indices,
                     learning_objectives=learning_objectives,
                     quiz_type=quiz_type,
-                    num_questions=num_questions
-                )
-
-                if 'error' in quiz_data:
-                    st.error(f"Error generating quiz: {quiz_data['error']}")
-                else:
-                    st.session_state.generated_quiz = {
-                        'title': quiz_title,
-                        'type': quiz_type,
-                        'learning_objectives': learning_objectives,
-                        'questions': quiz_data.get('questions', [])
-                    }
-                    st.success("✅ Quiz generated! Review below:")
+                    num_questions=num_questions,
+                    bypass_cache=st.session_state.pop('bypass_quiz_cache', False)
+                ):
+                    if 'error' in item:
+                        error = item['error']
+                        break
+
+                    questions.append(item)
+                    status.info(f"🤖 AI is generating quiz questions... ({len(questions)}/{num_questions})")
+                    with st.expander(f"Question {len(questions)}: {item.get('question', '')[:100]}...", expanded=False):
+                        render_question_details(item)
+
+            preview.empty()
+
+            if error and not questions:
+                st.error(f"Error generating quiz: {error}")
+            else:
+                if error:
+                    st.warning(f"⚠️ Generation stopped early: {error}")
+                st.session_state.generated_quiz = {
+                    'title': quiz_title,
+                    'type': quiz_type,
+                    'learning_objectives': learning_objectives,
+                    'questions': questions
+                }
+                st.success("✅ Quiz generated! Review below:")
 
     # Review and modify generated quiz
     if 'generated_quiz' in st.session_state:
         render_quiz_review(course_name)
 
+def render_quiz_drafts(course_name: str):
+    """Render the quizzes drafted by bulk generation (cli.py) for review"""
+
+    drafts = get_drafts(course_name)
+    if not drafts:
+        return
+
+    st.info(f"📥 {len(drafts)} drafted quiz(zes) awaiting review")
+
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col1:
+        draft_idx = st.selectbox(
+            "Drafts",
+            range(len(drafts)),
+            format_func=lambda x: f"{drafts[x]['title']} ({len(drafts[x]['questions'])} questions)",
+            label_visibility="collapsed"
+        )
+    with col2:
+        if st.button("📝 Review Draft"):
+            st.session_state.generated_quiz = dict(drafts[draft_idx])
+            st.rerun()
+    with col3:
+        if st.button("🗑️ Discard Draft"):
+            discard_draft(course_name, drafts[draft_idx]['draft_id'])
+            st.rerun()
+
+    st.divider()
+
 def render_quiz_review(course_name: str):
     """Render quiz review and modification interface"""
 
@@ -278,25 +418,15 @@ def render_quiz_review(course_name: str):
     st.markdown(f"**Title:** {quiz['title']}")
     st.markdown(f"**Type:** {quiz['type']}")
     st.markdown(f"**Questions:** {len(quiz['questions'])}")
+    if quiz.get('warning'):
+        st.warning(f"⚠️ {quiz['warning']}")
 
     st.divider()
 
     # Display each question for review
     for idx, question in enumerate(quiz['questions']):
         with st.expander(f"Question {idx + 1}: {question.get('question', '')[:100]}...", expanded=False):
-            st.markdown(f"**Question:** {question['question']}")
-
-            if 'options' in question:
-                st.markdown("**Options:**")
-                for opt in question['options']:
-                    st.markdown(f"  {opt}")
-                st.markdown(f"**Correct Answer:** {question.get('correct_answer', 'N/A')}")
-
-            st.markdown(f"**Learning Objective:** {question.get('learning_objective', 'N/A')}")
-            st.markdown(f"**Cognitive Level:** {question.get('cognitive_level', 'N/A')}")
-
-            if 'explanation' in question:
-                st.markdown(f"**Explanation:** {question['explanation']}")
+            render_question_details(question)
 
             col1, col2 = st.columns(2)
             with col1:
@@ -313,7 +443,7 @@ def render_quiz_review(course_name: str):
 
     with col1:
         if st.button("✅ Approve & Publish Quiz", type="primary"):
-            quiz_id = save_quiz(course_name, quiz)
+            quiz_id = publish_quiz(course_name, quiz)
             st.success(f"🎉 Quiz published successfully! Quiz ID: {quiz_id}")
             del st.session_state.generated_quiz
             st.rerun()
@@ -321,6 +451,8 @@ def render_quiz_review(course_name: str):
     with col2:
         if st.button("🔄 Regenerate"):
             del st.session_state.generated_quiz
+            # Identical inputs would otherwise be served the cached quiz again
+            st.session_state.bypass_quiz_cache = True
             st.rerun()
 
     with col3:
@@ -328,6 +460,99 @@ def render_quiz_review(course_name: str):
             del st.session_state.generated_quiz
             st.rerun()
 
+def render_question_details(question: dict):
+    """Render the body of a generated question"""
+
+    st.markdown(f"**Question:** {question.get('question', '')}")
+
+    if 'options' in question:
+        st.markdown("**Options:**")
+        for opt in question['options']:
+            st.markdown(f"  {opt}")
+        st.markdown(f"**Correct Answer:** {question.get('correct_answer', 'N/A')}")
+
+    st.markdown(f"**Learning Objective:** {question.get('learning_objective', 'N/A')}")
+    st.markdown(f"**Cognitive Level:** {question.get('cognitive_level', 'N/A')}")
+
+    if 'explanation' in question:
+        st.markdown(f"**Explanation:** {question['explanation']}")
+
+def render_answer_key_editor(course_name: str, quiz: Dict[str, Any]):
+    """Render inline editing of a quiz's answer key and rubrics"""
+
+    with st.expander("✏️ Edit Answer Key"):
+        st.caption("Saving changes the answer key version; regrade to re-score existing submissions.")
+
+        updates = {}
+        for idx, question in enumerate(quiz.get('questions', [])):
+            st.markdown(f"**Question {idx + 1}:** {question.get('question', '')}")
+            for field in ('correct_answer', 'sample_answer', 'rubric'):
+                if field not in question:
+                    continue
+                value = question[field]
+                text = json.dumps(value, indent=2) if not isinstance(value, str) else value
+                edited = st.text_area(
+                    field.replace('_', ' ').title(),
+                    value=text,
+                    key=f"answer_key_{quiz['id']}_{idx}_{field}"
+                )
+                if edited != text:
+                    updates[(idx, field)] = edited
+
+        if st.button("💾 Save Answer Key", key=f"save_answer_key_{quiz['id']}", disabled=not updates):
+            for (idx, field), text in updates.items():
+                if isinstance(quiz['questions'][idx][field], str):
+                    quiz['questions'][idx][field] = text
+                    continue
+                try:
+                    quiz['questions'][idx][field] = json.loads(text)
+                except ValueError:
+                    st.error(f"Question {idx + 1} {field.replace('_', ' ')} is not valid JSON")
+                    return
+            save_answer_key(course_name, quiz)
+            st.success("✅ Answer key updated")
+            st.rerun()
+
+def render_regrade(course_name: str, quiz: Dict[str, Any]):
+    """Render the batch regrade control and the progress of the current job"""
+
+    job = get_regrade(course_name, quiz['id'])
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.subheader("🔁 Regrade Submissions")
+    with col2:
+        if job is not None and job.running:
+            if st.button("⏹️ Cancel", key=f"cancel_regrade_{quiz['id']}"):
+                job.cancel()
+                st.rerun()
+        elif st.button("🔁 Regrade All", key=f"regrade_{quiz['id']}"):
+            job = start_regrade(course_name, quiz)
+            st.rerun()
+
+    if job is None:
+        st.caption("Re-score all stored attempts against the current answer key.")
+        return
+
+    progress = job.get_progress()
+    if progress['status'] == 'busy':
+        st.info("This quiz is already being regraded by another server process; results appear as attempts are updated.")
+        return
+
+    fraction = progress['done'] / progress['total'] if progress['total'] else 1.0
+    st.progress(fraction, text=f"{progress['done']}/{progress['total']} regraded ({progress['status']})")
+
+    details = f"{progress['up_to_date']} already up to date, {progress['resumed']} resumed from checkpoint"
+    if progress['failed']:
+        details += f", {progress['failed']} failed"
+    if progress['eta_seconds'] is not None:
+        details += f", about {progress['eta_seconds']:.0f}s remaining"
+    st.caption(details)
+
+    if job.running:
+        time.sleep(2)
+        st.rerun()
+
 def render_quiz_reports(course_name: str):
     """Render quiz reports and analytics"""
 
@@ -364,6 +589,9 @@ def render_quiz_reports(course_name: str):
     total_students = len(attempts)
     st.metric("Total Submissions", total_students)
 
+    render_answer_key_editor(course_name, selected_quiz)
+    render_regrade(course_name, selected_quiz)
+
     # Student results table
     st.subheader("🎓 Student Results")
 
@@ -372,7 +600,9 @@ def render_quiz_reports(course_name: str):
             for idx, attempt in enumerate(student_attempts):
                 st.markdown(f"**Attempt {idx + 1}** - {attempt.get('timestamp', 'N/A')}")
 
-                if 'analysis' in attempt:
+                if attempt.get('status') in ('queued', 'grading'):
+                    st.info("⏳ Grading in progress")
+                elif 'analysis' in attempt:
                     analysis = attempt['analysis']
 
                     # Show score
@@ -387,8 +617,8 @@ def render_quiz_reports(course_name: str):
                     # Individual question feedback
                     for q_idx, q_score in enumerate(analysis.get('question_scores', [])):
                         st.markdown(f"""
-                        **Question {q_score['question_number']}:** 
-                        {q_score['points_earned']}/{q_score['max_points']} points
+                        **Question {q_score.get('question_number', q_idx + 1)}:** 
+                        {q_score.get('points_earned', 0)}/{q_score.get('max_points', '?')} points
                         
                         {q_score.get('feedback', '')}
                         """)
@@ -1,10 +1,26 @@
 import streamlit as st
-from utils.storage import get_slides, get_quizzes, save_quiz_attempt, get_student_progress, update_student_progress
+import time
+from typing import Dict, Any
+from utils.storage import get_slides, get_quizzes, get_student_progress
+from utils.weak_areas import current_weak_areas
 from utils.ui_components import render_slide_viewer, render_chat_interface, render_progress_indicator
-from agents.learner_agent import LearnerAgent
-from agents.tester_agent import TesterAgent
-from agents.reviewer_agent import ReviewerAgent
-from config import DEFAULT_COURSES, PASSING_THRESHOLD
+from services import (
+    get_conversation,
+    ask_tutor,
+    reset_tutor,
+    stream_practice_questions,
+    save_practice,
+    resume_practice,
+    end_practice,
+    grade_practice_quiz,
+    summary_report,
+    submit_quiz,
+    get_submission,
+    latest_submission,
+    submission_position,
+    retry_submission
+)
+from config import DEFAULT_COURSES, PASSING_THRESHOLD, DIFFICULTY_LEVELS, GRADING_POLL_SECONDS
 import json
 
 def render_student_mode():
@@ -74,17 +90,10 @@ def render_ai_companion(course_name: str):
         st.warning("⚠️ No slides available. Please wait for your instructor to upload slides.")
         return
 
-    # Initialize learner agent
-    if 'learner_agent' not in st.session_state:
-        st.session_state.learner_agent = LearnerAgent()
-
-    if 'learner_messages' not in st.session_state:
-        st.session_state.learner_messages = []
-
     # Get student progress to identify weak areas
     student_name = st.session_state.get('student_name', 'Student')
     progress = get_student_progress(course_name, student_name)
-    weak_areas = progress.get('weak_areas', [])
+    weak_areas = current_weak_areas(progress)
 
     # Show weak areas if any
     if weak_areas:
@@ -109,31 +118,29 @@ def render_ai_companion(course_name: str):
 
     selected_slide = slides[selected_slide_idx]
 
+    # The conversation lives in the conversation store, not in the session
+    conversation = get_conversation(course_name, student_name, selected_slide['id'])
+
     col1, col2 = st.columns([3, 1])
 
     with col1:
         st.markdown(f"**Current Topic:** {selected_slide['title']}")
+        focused_context = st.checkbox(
+            "🔎 Answer questions from the most relevant pages only",
+            value=True,
+            key="tutor_focused_context",
+            help="Faster answers on long documents: only the passages matching your question are sent to the tutor."
+        )
 
     with col2:
         if st.button("🔄 Start Fresh Session"):
-            st.session_state.learner_agent.reset_conversation()
-            st.session_state.learner_messages = []
+            reset_tutor(course_name, student_name, selected_slide['id'])
             st.rerun()
 
     # Auto-teach mode
     if st.button("🎓 Explain This Topic", type="primary"):
         with st.spinner("🤖 Your AI tutor is preparing the explanation..."):
-            slide_content = f"{selected_slide['title']}\n{selected_slide.get('content', '')}"
-
-            response = st.session_state.learner_agent.teach_concept(
-                slide_content=slide_content,
-                weak_areas=weak_areas
-            )
-
-            st.session_state.learner_messages.append({
-                'role': 'assistant',
-                'content': response
-            })
+            ask_tutor(course_name, student_name, selected_slide)
             st.rerun()
 
     # Display conversation
@@ -141,7 +148,7 @@ def render_ai_companion(course_name: str):
     st.subheader("💬 Learning Session")
 
     # Show conversation history
-    for msg in st.session_state.learner_messages:
+    for msg in conversation['transcript']:
         if msg['role'] == 'assistant':
             with st.chat_message("assistant", avatar="🤖"):
                 st.markdown(msg['content'])
@@ -153,26 +160,12 @@ def render_ai_companion(course_name: str):
     user_question = st.chat_input("Ask a question about this topic...")
 
     if user_question:
-        # Add user message
-        st.session_state.learner_messages.append({
-            'role': 'user',
-            'content': user_question
-        })
+        # Show the question right away while the tutor answers
+        with st.chat_message("user", avatar="👤"):
+            st.markdown(user_question)
 
-        # Get AI response
         with st.spinner("🤖 Thinking..."):
-            slide_content = f"{selected_slide['title']}\n{selected_slide.get('content', '')}"
-
-            response = st.session_state.learner_agent.teach_concept(
-                slide_content=slide_content,
-                weak_areas=weak_areas,
-                user_question=user_question
-            )
-
-            st.session_state.learner_messages.append({
-                'role': 'assistant',
-                'content': response
-            })
+            ask_tutor(course_name, student_name, selected_slide, user_question, focused_context)
             st.rerun()
 
 def render_practice_quizzes(course_name: str):
@@ -186,14 +179,19 @@ def render_practice_quizzes(course_name: str):
         st.warning("⚠️ No slides available for practice quizzes.")
         return
 
-    # Initialize tester agent
-    if 'tester_agent' not in st.session_state:
-        st.session_state.tester_agent = TesterAgent()
-
     # Get student progress for focus areas
     student_name = st.session_state.get('student_name', 'Student')
     progress = get_student_progress(course_name, student_name)
-    weak_areas = progress.get('weak_areas', [])
+    weak_areas = current_weak_areas(progress)
+
+    # Pick up a practice quiz left in progress (e.g. before a reconnect or redeploy)
+    if 'practice_quiz' not in st.session_state:
+        stored = resume_practice(course_name, student_name)
+        if stored:
+            st.session_state.practice_quiz = stored['quiz']
+            st.session_state.practice_answers = dict(stored['answers'])
+            if stored.get('analysis'):
+                st.session_state.practice_analysis = stored['analysis']
 
     st.subheader("🎯 Generate Practice Questions")
 
@@ -214,7 +212,7 @@ def render_practice_quizzes(course_name: str):
     with col2:
         difficulty = st.selectbox(
             "Difficulty Level",
-            ["Easy", "Medium", "Hard"]
+            DIFFICULTY_LEVELS
         )
 
     num_practice_questions = st.slider("Number of Questions", 1, 10, 3)
@@ -223,24 +221,35 @@ def render_practice_quizzes(course_name: str):
         focus_on_weak = st.checkbox("Focus on my weak areas", value=True)
         if focus_on_weak:
             st.info(f"🎯 Will focus on: {', '.join(weak_areas)}")
+            focused_context = st.checkbox(
+                "🔎 Only use pages related to my weak areas",
+                value=True,
+                key="practice_focused_context"
+            )
 
     if st.button("🎲 Generate Practice Quiz", type="primary"):
         with st.spinner("🤖 Creating practice questions..."):
-            selected_slide = slides[selected_slide_idx]
-            slide_content = f"{selected_slide['title']}\n{selected_slide.get('content', '')}"
-
             focus_areas = weak_areas if weak_areas and focus_on_weak else None
 
-            quiz_data = st.session_state.tester_agent.generate_practice_quiz(
-                slide_content=slide_content,
-                difficulty_level=difficulty,
-                num_questions=num_practice_questions,
-                focus_areas=focus_areas
+            # Served from the pre-generated pool when it has enough questions
+            quiz_data = preview_practice_questions(
+                num_practice_questions,
+                stream_practice_questions(
+                    course_name,
+                    student_name,
+                    slides[selected_slide_idx],
+                    difficulty,
+                    num_practice_questions,
+                    focus_areas=focus_areas,
+                    focused_context=focus_areas is not None and focused_context
+                )
             )
 
             if 'error' not in quiz_data:
                 st.session_state.practice_quiz = quiz_data
                 st.session_state.practice_answers = {}
+                st.session_state.pop('practice_analysis', None)
+                save_practice(course_name, student_name, quiz_data, {})
                 st.success("✅ Practice quiz generated!")
                 st.rerun()
             else:
@@ -250,17 +259,39 @@ def render_practice_quizzes(course_name: str):
     if 'practice_quiz' in st.session_state:
         render_practice_quiz_interface(course_name)
 
+def preview_practice_questions(num_questions: int, items) -> dict:
+    """Collect practice questions, previewing each one as it arrives"""
+
+    questions = []
+    preview = st.empty()
+
+    with preview.container():
+        for item in items:
+            if 'error' in item:
+                preview.empty()
+                if questions:
+                    return {'questions': questions}
+                return {'error': item['error'], 'questions': []}
+
+            questions.append(item)
+            st.markdown(f"**Question {len(questions)} of {num_questions}:** {item.get('question', '')}")
+
+    preview.empty()
+    return {'questions': questions}
+
 def render_practice_quiz_interface(course_name: str):
     """Render practice quiz taking and review interface"""
 
     st.divider()
     st.subheader("📝 Practice Quiz")
 
+    student_name = st.session_state.get('student_name', 'Student')
     quiz = st.session_state.practice_quiz
     questions = quiz.get('questions', [])
 
     if 'practice_answers' not in st.session_state:
         st.session_state.practice_answers = {}
+    answers_before = dict(st.session_state.practice_answers)
 
     # Display questions
     for idx, question in enumerate(questions):
@@ -269,18 +300,22 @@ def render_practice_quiz_interface(course_name: str):
 
         q_type = question.get('type', 'Short Answer')
 
+        # Restored answers pre-fill the inputs after a reconnect
+        saved = st.session_state.practice_answers.get(idx)
+
         if q_type == 'MCQ' and 'options' in question:
             answer = st.radio(
                 "Select your answer:",
                 question['options'],
                 key=f"practice_q_{idx}",
-                index=None
+                index=question['options'].index(saved) if saved in question['options'] else None
             )
             if answer:
                 st.session_state.practice_answers[idx] = answer
         else:
             answer = st.text_area(
                 "Your answer:",
+                value=saved or "",
                 key=f"practice_q_{idx}",
                 height=100
             )
@@ -289,6 +324,15 @@ def render_practice_quiz_interface(course_name: str):
 
         st.divider()
 
+    if st.session_state.practice_answers != answers_before:
+        save_practice(
+            course_name,
+            student_name,
+            quiz,
+            st.session_state.practice_answers,
+            st.session_state.get('practice_analysis')
+        )
+
     # Submit and review
     col1, col2 = st.columns(2)
 
@@ -298,35 +342,25 @@ def render_practice_quiz_interface(course_name: str):
                 st.warning("Please answer all questions before submitting!")
             else:
                 with st.spinner("🤖 Reviewing your answers..."):
-                    # Use reviewer agent to analyze practice quiz
-                    reviewer = ReviewerAgent()
-
                     student_answers = [
                         {'answer': st.session_state.practice_answers.get(i, '')}
                         for i in range(len(questions))
                     ]
 
-                    analysis = reviewer.analyze_quiz_performance(
-                        quiz_questions=questions,
-                        student_answers=student_answers,
-                        quiz_type="Practice"
+                    # Also updates the student's weak areas (strong results build mastery)
+                    st.session_state.practice_analysis = grade_practice_quiz(
+                        course_name,
+                        student_name,
+                        questions,
+                        student_answers
+                    )
+                    save_practice(
+                        course_name,
+                        student_name,
+                        quiz,
+                        st.session_state.practice_answers,
+                        st.session_state.practice_analysis
                     )
-
-                    st.session_state.practice_analysis = analysis
-
-                    # Update student progress if needs remediation
-                    if analysis.get('needs_remediation'):
-                        student_name = st.session_state.get('student_name', 'Student')
-                        current_progress = get_student_progress(course_name, student_name)
-
-                        # Update weak areas
-                        new_weak_areas = analysis.get('weak_areas', [])
-                        current_progress['weak_areas'] = list(set(
-                            current_progress.get('weak_areas', []) + new_weak_areas
-                        ))
-
-                        update_student_progress(course_name, student_name, current_progress)
-
                     st.rerun()
 
     with col2:
@@ -337,6 +371,7 @@ def render_practice_quiz_interface(course_name: str):
                 del st.session_state.practice_answers
             if 'practice_analysis' in st.session_state:
                 del st.session_state.practice_analysis
+            end_practice(course_name, student_name)
             st.rerun()
 
     # Show analysis if available
@@ -353,9 +388,7 @@ def render_practice_quiz_interface(course_name: str):
         )
 
         # Detailed feedback
-        reviewer = ReviewerAgent()
-        summary_report = reviewer.generate_summary_report(analysis)
-        st.markdown(summary_report)
+        st.markdown(summary_report(analysis))
 
 def render_take_quiz(course_name: str):
     """Render interface for taking official instructor quizzes"""
@@ -419,63 +452,71 @@ def render_take_quiz(course_name: str):
         if len(st.session_state.current_quiz_answers) < len(questions):
             st.warning("⚠️ Please answer all questions before submitting!")
         else:
-            with st.spinner("📊 Grading your quiz..."):
-                # Prepare student answers
-                student_answers = [
-                    {'answer': st.session_state.current_quiz_answers.get(i, '')}
-                    for i in range(len(questions))
-                ]
-
-                # Grade with reviewer agent
-                reviewer = ReviewerAgent()
-                analysis = reviewer.analyze_quiz_performance(
-                    quiz_questions=questions,
-                    student_answers=student_answers,
-                    quiz_type=selected_quiz['type']
-                )
-
-                # Save attempt
-                student_name = st.session_state.get('student_name', 'Student')
-                save_quiz_attempt(
-                    course_name=course_name,
-                    quiz_id=selected_quiz['id'],
-                    student_name=student_name,
-                    attempt={
-                        'answers': student_answers,
-                        'analysis': analysis
-                    }
-                )
+            # Prepare student answers
+            student_answers = [
+                {'answer': st.session_state.current_quiz_answers.get(i, '')}
+                for i in range(len(questions))
+            ]
+
+            # Save the attempt right away; grading happens in the background
+            st.session_state.setdefault('quiz_submissions', {})[_submission_key(course_name, selected_quiz['id'])] = submit_quiz(
+                course_name, selected_quiz, st.session_state.get('student_name', 'Student'), student_answers
+            )
+            st.success("✅ Quiz submitted! Your results will appear below once grading finishes.")
+            st.rerun()
 
-                # Update student progress
-                if analysis.get('needs_remediation'):
-                    current_progress = get_student_progress(course_name, student_name)
-                    new_weak_areas = analysis.get('weak_areas', [])
-                    current_progress['weak_areas'] = list(set(
-                        current_progress.get('weak_areas', []) + new_weak_areas
-                    ))
-                    update_student_progress(course_name, student_name, current_progress)
-
-                st.session_state.quiz_result = analysis
-                st.success("✅ Quiz submitted successfully!")
-                st.rerun()
+    # Show results for the selected quiz. A quiz with no entry in this session
+    # recovers its latest submission (e.g. after a page refresh); an entry of
+    # None means the student dismissed the results to take the quiz again.
+    submissions = st.session_state.get('quiz_submissions', {})
+    key = _submission_key(course_name, selected_quiz['id'])
+    if key in submissions:
+        submission = get_submission(submissions[key]) if submissions[key] else None
+    else:
+        submission = latest_submission(
+            course_name, selected_quiz['id'], st.session_state.get('student_name', 'Student')
+        )
 
-    # Show results
-    if 'quiz_result' in st.session_state:
+    if submission:
         st.divider()
         st.subheader("📊 Quiz Results")
+        render_submission_result(course_name, submission)
 
-        analysis = st.session_state.quiz_result
+def _submission_key(course_name: str, quiz_id: str) -> str:
+    """Session key of the submission made for one quiz, so switching quizzes never shows another quiz's result"""
+    return f"{course_name}/{quiz_id}"
 
-        render_progress_indicator(
-            analysis.get('overall_score', 0),
-            "Final Score"
-        )
+def render_submission_result(course_name: str, submission: Dict[str, Any]):
+    """Render a submission's grading status, polling until the analysis is ready"""
 
-        reviewer = ReviewerAgent()
-        summary_report = reviewer.generate_summary_report(analysis)
-        st.markdown(summary_report)
+    if submission['status'] in ('queued', 'grading'):
+        ahead = submission_position(submission['id'])
+        status = f"{ahead} submission(s) ahead of yours" if ahead else "grading now"
+        st.info(f"⏳ Your quiz was received and is being graded ({status}). This page updates automatically.")
+        time.sleep(GRADING_POLL_SECONDS)
+        st.rerun()
+        return
 
-        if st.button("🔄 Take Another Quiz"):
-            del st.session_state.current_quiz_answers
-            del st.session_state.quiz_result
-            st.rerun()
\ No newline at end of file
+    if submission['status'] == 'failed':
+        st.error(f"Grading failed: {submission.get('error', 'unknown error')}")
+        if st.button("🔁 Retry Grading"):
+            retry_submission(submission['id'])
+            st.rerun()
+        return
+
+    # The grading queue has already folded the result into the student's weak areas
+    analysis = submission['analysis']
+
+    render_progress_indicator(
+        analysis.get('overall_score', 0),
+        "Final Score"
+    )
+
+    st.markdown(summary_report(analysis))
+
+    if st.button("🔄 Take Another Quiz"):
+        st.session_state.current_quiz_answers = {}
+        st.session_state.setdefault('quiz_submissions', {})[
+            _submission_key(submission['course'], submission['quiz']['id'])
+        ] = None
+        st.rerun()
\ No newline at end of file
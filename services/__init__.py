@@ -0,0 +1,78 @@
+# services/__init__.py
+"""
+Framework-free core of EduCanvas: ingest, quiz generation, grading and
+tutoring as plain functions over plain data. The Streamlit pages are thin
+clients of this package; CLIs and worker processes can use it directly.
+"""
+
+from .ingest import (
+    build_slide,
+    ingest_files,
+    add_slides,
+    delete_slide
+)
+
+from .quizzes import (
+    compile_slide_content,
+    stream_quiz_questions,
+    draft_quiz,
+    get_drafts,
+    discard_draft,
+    publish_quiz,
+    save_answer_key
+)
+
+from .grading import (
+    submit_quiz,
+    get_submission,
+    latest_submission,
+    submission_position,
+    retry_submission,
+    grade_practice_quiz,
+    summary_report,
+    start_regrade,
+    get_regrade
+)
+
+from .tutoring import (
+    get_conversation,
+    ask_tutor,
+    reset_tutor
+)
+
+from .practice import (
+    stream_practice_questions,
+    save_practice,
+    resume_practice,
+    end_practice
+)
+
+__all__ = [
+    'build_slide',
+    'ingest_files',
+    'add_slides',
+    'delete_slide',
+    'compile_slide_content',
+    'stream_quiz_questions',
+    'draft_quiz',
+    'get_drafts',
+    'discard_draft',
+    'publish_quiz',
+    'save_answer_key',
+    'submit_quiz',
+    'get_submission',
+    'latest_submission',
+    'submission_position',
+    'retry_submission',
+    'grade_practice_quiz',
+    'summary_report',
+    'start_regrade',
+    'get_regrade',
+    'get_conversation',
+    'ask_tutor',
+    'reset_tutor',
+    'stream_practice_questions',
+    'save_practice',
+    'resume_practice',
+    'end_practice'
+]
@@ -0,0 +1,86 @@
+from typing import List, Dict, Any, Optional
+from utils.storage import save_quiz_attempt
+from utils.grading_queue import get_grading_queue
+from utils.grading_jobs import get_regrade_manager, RegradeJob
+from utils.weak_areas import apply_quiz_result
+from agents.reviewer_agent import ReviewerAgent
+
+
+def submit_quiz(course_name: str,
+                quiz: Dict[str, Any],
+                student_name: str,
+                student_answers: List[Dict[str, Any]]) -> str:
+    """
+    Store a quiz attempt and queue it for grading
+
+    The attempt is saved right away with status "queued"; the grading queue
+    fills in its analysis and updates the student's weak areas.
+
+    Returns:
+        Submission ID to poll with get_submission()
+    """
+    attempt_index = save_quiz_attempt(
+        course_name=course_name,
+        quiz_id=quiz['id'],
+        student_name=student_name,
+        attempt={'answers': student_answers, 'status': 'queued'}
+    )
+    return get_grading_queue().submit(course_name, quiz, student_name, student_answers, attempt_index)
+
+
+def get_submission(submission_id: str) -> Optional[Dict[str, Any]]:
+    """Get a submission's status, and its analysis once graded"""
+    return get_grading_queue().get(submission_id)
+
+
+def latest_submission(course_name: str, quiz_id: str, student_name: str) -> Optional[Dict[str, Any]]:
+    """Get a student's most recent submission for a quiz"""
+    return get_grading_queue().latest_for(course_name, quiz_id, student_name)
+
+
+def submission_position(submission_id: str) -> int:
+    """Number of submissions queued ahead of this one"""
+    return get_grading_queue().position(submission_id)
+
+
+def retry_submission(submission_id: str):
+    """Queue a failed submission for grading again"""
+    get_grading_queue().retry(submission_id)
+
+
+def grade_practice_quiz(course_name: str,
+                        student_name: str,
+                        questions: List[Dict[str, Any]],
+                        student_answers: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Grade a practice quiz and fold the result into the student's weak areas
+
+    Returns:
+        The reviewer's analysis, or {"error": ...}
+    """
+    reviewer = ReviewerAgent(user_id=student_name)
+    analysis = reviewer.analyze_quiz_performance(
+        quiz_questions=questions,
+        student_answers=student_answers,
+        quiz_type="Practice"
+    )
+
+    if 'error' not in analysis:
+        apply_quiz_result(course_name, student_name, analysis)
+
+    return analysis
+
+
+def summary_report(analysis: Dict[str, Any]) -> str:
+    """Render an analysis as the markdown report shown to students"""
+    return ReviewerAgent().generate_summary_report(analysis)
+
+
+def start_regrade(course_name: str, quiz: Dict[str, Any]) -> RegradeJob:
+    """Regrade all stored attempts of a quiz against its current answer key"""
+    return get_regrade_manager().start(course_name, quiz)
+
+
+def get_regrade(course_name: str, quiz_id: str) -> Optional[RegradeJob]:
+    """Get the latest regrade job for a quiz, if any"""
+    return get_regrade_manager().get_job(course_name, quiz_id)
@@ -0,0 +1,113 @@
+from typing import List, Dict, Any, Tuple
+from utils.storage import save_slides, get_slide_text, remove_slide, get_next_slide_number
+from utils.question_pool import get_question_pool
+from utils.warmup import get_tutor_warmup
+from utils.pdf_handler import pdf_to_images, is_pdf, is_image, extract_page_texts_from_pdf
+from config import PRACTICE_POOL_ENABLED, TUTOR_WARMUP_ENABLED
+
+
+def build_slide(slide_id: str, order: int, file_name: str, file_bytes: bytes) -> Dict[str, Any]:
+    """
+    Turn an uploaded PDF or image into a slide record
+
+    Args:
+        slide_id: ID for the new slide
+        order: Slide number within the course
+        file_name: Original file name
+        file_bytes: File contents
+
+    Returns:
+        The slide dict, or {"error": ...} when the file cannot be used
+    """
+    if is_pdf(file_bytes) or file_name.lower().endswith('.pdf'):
+        try:
+            images = pdf_to_images(file_bytes)
+            page_texts = extract_page_texts_from_pdf(file_bytes)
+        except Exception as e:
+            return {"error": f"Error processing {file_name}: {str(e)}"}
+
+        if not images:
+            return {"error": f"Could not process PDF: {file_name}"}
+
+        # Store the PDF as a single slide with one image per page
+        return {
+            'id': slide_id,
+            'title': file_name,
+            'file_type': 'pdf',
+            'pages': images,
+            'page_count': len(images),
+            'order': order,
+            'content': "".join(f"{text}\n\n" for text in page_texts),
+            'page_texts': page_texts,
+            'original_filename': file_name
+        }
+
+    if is_image(file_bytes):
+        return {
+            'id': slide_id,
+            'title': file_name,
+            'file_type': 'image',
+            'pages': [file_bytes],
+            'page_count': 1,
+            'order': order,
+            'content': f"Image: {file_name}",
+            'original_filename': file_name
+        }
+
+    return {"error": f"Unsupported file type: {file_name}"}
+
+
+def ingest_files(course_name: str, files: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+    """
+    Add uploaded files to a course as slides (see add_slides)
+
+    Args:
+        course_name: Course to add the slides to
+        files: (file name, file bytes) pairs
+
+    Returns:
+        {"slides": [...saved slides], "errors": [...messages for skipped files]}
+    """
+    slides, errors = [], []
+    next_number = get_next_slide_number(course_name)
+
+    for file_name, file_bytes in files:
+        number = next_number + len(slides)
+        slide = build_slide(f"slide_{number}", number, file_name, file_bytes)
+        if "error" in slide:
+            errors.append(slide["error"])
+        else:
+            slides.append(slide)
+
+    if slides:
+        add_slides(course_name, slides)
+
+    return {"slides": slides, "errors": errors}
+
+
+def add_slides(course_name: str, slides: List[Dict[str, Any]], background: bool = True):
+    """
+    Save built slides to a course
+
+    Args:
+        course_name: Course to add the slides to
+        slides: Slides from build_slide
+        background: Also schedule practice-question pre-generation and tutor
+            warmup in this process (pointless in short-lived processes)
+    """
+    save_slides(course_name, slides)
+
+    if not background:
+        return
+
+    for slide in slides:
+        if PRACTICE_POOL_ENABLED:
+            get_question_pool().register_slide(get_slide_text(slide))
+        if TUTOR_WARMUP_ENABLED:
+            get_tutor_warmup().schedule(get_slide_text(slide))
+
+
+def delete_slide(course_name: str, slide: Dict[str, Any]):
+    """Remove a slide and the practice questions pre-generated for it"""
+    remove_slide(course_name, slide['id'])
+    get_question_pool().discard_slide(get_slide_text(slide))
@@ -0,0 +1,70 @@
+from typing import List, Dict, Any, Iterator, Optional
+from utils.storage import get_slide_text, get_course_index, save_practice_session, get_practice_session, clear_practice_session
+from utils.question_pool import get_question_pool
+from agents.tester_agent import get_tester_agent
+from config import PRACTICE_POOL_ENABLED
+
+
+def stream_practice_questions(course_name: str,
+                              student_name: str,
+                              slide: Dict[str, Any],
+                              difficulty: str,
+                              num_questions: int,
+                              focus_areas: List[str] = None,
+                              focused_context: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Get practice questions for a slide, from the pre-generated pool when it
+    has enough, otherwise generated for the student
+
+    Args:
+        course_name: Course the slide belongs to
+        student_name: Student practising
+        slide: Slide to practise on
+        difficulty: Difficulty level
+        num_questions: Number of questions
+        focus_areas: Weak areas to focus on, if any
+        focused_context: Use only the pages related to the focus areas
+
+    Yields:
+        Question dictionaries as they complete; on failure a final {"error": ...} item
+    """
+    slide_content = get_slide_text(slide)
+
+    if PRACTICE_POOL_ENABLED:
+        pooled = get_question_pool().take(slide_content, difficulty, num_questions, focus_areas=focus_areas)
+        if pooled:
+            yield from pooled
+            return
+
+    yield from get_tester_agent().for_user(student_name).stream_practice_quiz(
+        slide_content=slide_content,
+        difficulty_level=difficulty,
+        num_questions=num_questions,
+        focus_areas=focus_areas,
+        context_index=get_course_index(course_name) if focus_areas and focused_context else None,
+        context_slide_id=slide['id']
+    )
+
+
+def save_practice(course_name: str,
+                  student_name: str,
+                  quiz: Dict[str, Any],
+                  answers: Dict[int, str],
+                  analysis: Optional[Dict[str, Any]] = None):
+    """Store a practice quiz in progress, so it survives reconnects and redeploys"""
+    save_practice_session(course_name, student_name, {'quiz': quiz, 'answers': dict(answers), 'analysis': analysis})
+
+
+def resume_practice(course_name: str, student_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a student's stored practice quiz
+
+    Returns:
+        {"quiz", "answers", "analysis"} or None when there is none
+    """
+    return get_practice_session(course_name, student_name)
+
+
+def end_practice(course_name: str, student_name: str):
+    """Forget a student's practice quiz when they start a new one"""
+    clear_practice_session(course_name, student_name)
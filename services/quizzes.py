@@ -0,0 +1,117 @@
+from typing import List, Dict, Any, Iterator
+from utils.storage import get_slides, save_quiz, update_quiz, save_quiz_draft, get_quiz_drafts, remove_quiz_draft
+from agents.quiz_generator import QuizGeneratorAgent
+
+
+def compile_slide_content(slides: List[Dict[str, Any]], indices: List[int]) -> str:
+    """Join the selected slides into the content a quiz is generated from"""
+    return "\n\n".join(
+        f"Slide {i + 1}: {slides[i]['title']}\n{slides[i]['content']}"
+        for i in indices
+    )
+
+
+def stream_quiz_questions(course_name: str,
+                          slide_indices: List[int],
+                          learning_objectives: str,
+                          quiz_type: str,
+                          num_questions: int = 5,
+                          bypass_cache: bool = False,
+                          user_id: str = "instructor") -> Iterator[Dict[str, Any]]:
+    """
+    Generate quiz questions from a course's slides
+
+    Args:
+        course_name: Course whose slides are used
+        slide_indices: Positions of the slides to include
+        learning_objectives: Instructor's learning objectives
+        quiz_type: Type of quiz (MCQ, Conversational, Long Answer)
+        num_questions: Number of questions to generate
+        bypass_cache: Skip cached quizzes and ask the model again
+        user_id: Caller the requests are attributed to
+
+    Yields:
+        Question dictionaries as they complete; on failure a final {"error": ...} item
+    """
+    slide_content = compile_slide_content(get_slides(course_name), slide_indices)
+    agent = QuizGeneratorAgent(user_id=user_id)
+
+    yield from agent.stream_quiz(
+        slide_content=slide_content,
+        learning_objectives=learning_objectives,
+        quiz_type=quiz_type,
+        num_questions=num_questions,
+        bypass_cache=bypass_cache
+    )
+
+
+def draft_quiz(course_name: str,
+               slide: Dict[str, Any],
+               learning_objectives: str,
+               quiz_type: str,
+               num_questions: int = 5,
+               user_id: str = "instructor") -> Dict[str, Any]:
+    """
+    Generate a quiz for one slide deck and store it as a draft for review
+
+    Returns:
+        The stored draft, or {"error": ...} when no question could be generated
+    """
+    agent = QuizGeneratorAgent(user_id=user_id)
+    questions, error = [], None
+
+    for item in agent.stream_quiz(
+        slide_content=compile_slide_content([slide], [0]),
+        learning_objectives=learning_objectives,
+        quiz_type=quiz_type,
+        num_questions=num_questions
+    ):
+        if 'error' in item:
+            error = item['error']
+            break
+        questions.append(item)
+
+    if not questions:
+        return {"error": error or "no questions generated"}
+
+    draft = {
+        'title': f"Quiz: {slide['title']}",
+        'type': quiz_type,
+        'learning_objectives': learning_objectives,
+        'questions': questions,
+        'slide_id': slide['id']
+    }
+    if error:
+        draft['warning'] = f"Generation stopped early: {error}"
+    save_quiz_draft(course_name, draft)
+    return draft
+
+
+def get_drafts(course_name: str) -> List[Dict[str, Any]]:
+    """Get the generated quizzes awaiting review"""
+    return get_quiz_drafts(course_name)
+
+
+def discard_draft(course_name: str, draft_id: str):
+    """Drop a generated quiz without publishing it"""
+    remove_quiz_draft(course_name, draft_id)
+
+
+def publish_quiz(course_name: str, quiz: Dict[str, Any]) -> str:
+    """
+    Publish a reviewed quiz to students (removing the draft it came from, if any)
+
+    Returns:
+        The new quiz ID
+    """
+    draft_id = quiz.pop('draft_id', None)
+    quiz.pop('warning', None)
+    quiz_id = save_quiz(course_name, quiz)
+    if draft_id:
+        remove_quiz_draft(course_name, draft_id)
+    return quiz_id
+
+
+def save_answer_key(course_name: str, quiz: Dict[str, Any]):
+    """Store an edited answer key; existing attempts keep their grades until regraded"""
+    update_quiz(course_name, quiz)
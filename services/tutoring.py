@@ -0,0 +1,54 @@
+from typing import Dict, Any
+from utils.storage import get_slide_text, get_student_progress, get_course_index
+from utils.conversations import get_conversation_store
+from utils.weak_areas import current_weak_areas
+from agents.learner_agent import get_learner_agent
+
+
+def get_conversation(course_name: str, student_name: str, slide_id: str) -> Dict[str, Any]:
+    """Get a student's tutoring conversation about a slide"""
+    return get_conversation_store().load(student_name, course_name, slide_id)
+
+
+def ask_tutor(course_name: str,
+              student_name: str,
+              slide: Dict[str, Any],
+              question: str = None,
+              focused_context: bool = True) -> Dict[str, Any]:
+    """
+    Run one tutoring turn and store it
+
+    Args:
+        course_name: Course the slide belongs to
+        student_name: Student asking
+        slide: Slide being studied
+        question: Student's question; the tutor explains the slide when None
+        focused_context: Answer questions from the most relevant pages only
+
+    Returns:
+        The updated conversation (its "transcript" holds the displayed messages)
+    """
+    weak_areas = current_weak_areas(get_student_progress(course_name, student_name))
+
+    def turn(conversation: Dict[str, Any]):
+        if question:
+            conversation['transcript'].append({'role': 'user', 'content': question})
+
+        response = get_learner_agent().for_user(student_name).teach_concept(
+            slide_content=get_slide_text(slide),
+            weak_areas=weak_areas,
+            user_question=question,
+            context_index=get_course_index(course_name) if question and focused_context else None,
+            context_slide_id=slide['id'],
+            conversation=conversation
+        )
+        conversation['transcript'].append({'role': 'assistant', 'content': response})
+
+    # Held for the whole turn, so a second tab or replica waits for this
+    # answer instead of overwriting it
+    return get_conversation_store().update(student_name, course_name, slide['id'], turn)
+
+
+def reset_tutor(course_name: str, student_name: str, slide_id: str):
+    """Start a student's tutoring conversation about a slide over"""
+    get_conversation_store().reset(student_name, course_name, slide_id)
@@ -0,0 +1,41 @@
+import threading
+from types import SimpleNamespace
+from agents.cassette import CassetteClient, get_cassette_client
+
+
+class FakeClient:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **request):
+        content = request["messages"][-1]["content"].upper()
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+
+def ask(client, text):
+    return client.chat.completions.create(model="m", messages=[{"role": "user", "content": text}])
+
+
+def test_recorders_sharing_a_cassette_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    # Two processes recording at once, each with its own client
+    recorders = [CassetteClient(path, mode="record", client=FakeClient()) for _ in range(2)]
+
+    threads = [threading.Thread(target=lambda r=recorder, n=n: [ask(r, f"q{n}-{i}") for i in range(10)])
+               for n, recorder in enumerate(recorders)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    replay = CassetteClient(path, mode="replay")
+    assert len(replay) == 20
+    assert ask(replay, "q1-9").choices[0].message.content == "Q1-9"
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_one_client_per_cassette(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    ask(CassetteClient(path, mode="record", client=FakeClient()), "hello")
+
+    assert get_cassette_client(path) is get_cassette_client(path)
@@ -0,0 +1,85 @@
+import pytest
+from utils.compression import MAGIC, Packed, PayloadCodec
+from utils.storage import DirectoryBackend
+
+PAGE = bytes(range(256)) * 32  # 8 KB, like a page rendition
+
+
+def attempt(n):
+    return {
+        "answers": {str(q): "ABCD"[(n + q) % 4] for q in range(8)},
+        "status": "graded",
+        "analysis": {
+            "overall_score": n % 100,
+            "overall_feedback": f"Good explanation of gradient descent, attempt {n}. Consider revisiting momentum.",
+            "weak_areas": ["learning rate", f"regularization {n}"]
+        }
+    }
+
+
+def test_packed_round_trips_through_bytes():
+    packed = Packed(1, "0123456789abcdef", b"compressed", (PAGE, b"x" * 5000))
+    raw = b"".join(packed.chunks())
+
+    assert raw.startswith(MAGIC)
+    parsed = Packed.from_bytes(raw)
+    assert (parsed.method, parsed.dictionary_id, parsed.data, parsed.blobs) == \
+        (packed.method, packed.dictionary_id, packed.data, packed.blobs)
+    assert packed.size == len(b"compressed") + len(PAGE) + 5000
+
+    with pytest.raises(ValueError):
+        Packed.from_bytes(b"not packed")
+
+
+@pytest.mark.parametrize("method", ["none", "zlib", "lzma"])
+def test_values_round_trip_with_pages_kept_as_they_are(method):
+    codec = PayloadCodec(method=method, collections=("slides",))
+    slide = {"title": "Deck", "content": "gradient descent " * 200, "pages": [PAGE, PAGE[::-1]]}
+
+    packed = codec.pack("slides", slide)
+    assert codec.unpack(packed) == slide
+    assert packed.blobs == (PAGE, PAGE[::-1])
+    if method != "none":
+        assert len(packed.data) < len(codec.pickled(slide)[0]) / 5
+
+
+def test_small_values_are_not_compressed():
+    codec = PayloadCodec(collections=("quizzes",))
+    packed = codec.pack("quizzes", {"id": "quiz_0"})
+    assert packed.method == 0 and codec.unpack(packed) == {"id": "quiz_0"}
+
+
+def test_dictionary_shrinks_values_and_old_values_stay_readable():
+    codec = PayloadCodec(collections=("student_attempts",), min_bytes=0)
+    plain = codec.pack("student_attempts", [attempt(1)])
+
+    dictionary_id, dictionary = codec.train("student_attempts", [[attempt(n)] for n in range(100, 150)])
+    assert dictionary and codec.get_dictionary("student_attempts") == (dictionary_id, dictionary)
+    trained = codec.pack("student_attempts", [attempt(1)])
+    assert trained.dictionary_id == dictionary_id
+    assert len(trained.data) < len(plain.data)
+
+    codec.set_dictionary("student_attempts", b"")  # Turned off; values packed with it still decode
+    assert codec.unpack(trained) == codec.unpack(plain) == [attempt(1)]
+
+    other = PayloadCodec(collections=("student_attempts",), dictionary_loader={dictionary_id: dictionary}.get)
+    assert other.unpack(trained) == [attempt(1)]
+    with pytest.raises(ValueError):
+        PayloadCodec(collections=("student_attempts",)).unpack(trained)
+
+
+def test_directory_backend_recompresses_with_a_shared_dictionary(tmp_path):
+    plain = DirectoryBackend(str(tmp_path), codec=PayloadCodec(method="none"))
+    for n in range(40):
+        plain.set("student_attempts", f"student_{n}", [attempt(n)])
+
+    backend = DirectoryBackend(str(tmp_path), codec=PayloadCodec(collections=("student_attempts",)))
+    assert backend.train_dictionaries()["student_attempts"] > 0
+    stats = backend.recompress("student_attempts")
+    assert stats["values"] == 40 and stats["bytes_after"] < stats["bytes_before"]
+
+    # Another process finds the dictionary on disk
+    restarted = DirectoryBackend(str(tmp_path), codec=PayloadCodec(collections=("student_attempts",)))
+    assert all(restarted.get("student_attempts", f"student_{n}") == [attempt(n)] for n in range(40))
+    restarted.set("student_attempts", "student_new", [attempt(99)])
+    assert restarted.get("student_attempts", "student_new") == [attempt(99)]
@@ -0,0 +1,42 @@
+import threading
+import time
+import pytest
+from utils.conversations import ConversationStore
+
+
+@pytest.fixture(params=["directory", "memory"])
+def store(request, tmp_path):
+    return ConversationStore(directory=str(tmp_path) if request.param == "directory" else None)
+
+
+def test_concurrent_turns_keep_both_messages(store):
+    first_started = threading.Event()
+
+    def turn(message, delay):
+        def apply(conversation):
+            first_started.set()
+            time.sleep(delay)  # The model call
+            conversation["transcript"].append({"role": "user", "content": message})
+        return apply
+
+    # Another replica sharing the directory takes its turn at the same time
+    other = ConversationStore(directory=store.directory) if store.directory else store
+    thread = threading.Thread(target=store.update, args=("amy", "Course", "slide_0", turn("first", 0.2)))
+    thread.start()
+    first_started.wait(5)
+    other.update("amy", "Course", "slide_0", turn("second", 0))
+    thread.join(5)
+
+    messages = [m["content"] for m in store.load("amy", "Course", "slide_0")["transcript"]]
+    assert messages == ["first", "second"]
+
+
+def test_callers_get_their_own_copy(store):
+    store.update("amy", "Course", "slide_0", lambda c: c["transcript"].append({"role": "user", "content": "hi"}))
+
+    shown = store.load("amy", "Course", "slide_0")
+    shown["transcript"].append({"role": "user", "content": "not saved"})
+    assert store.load("amy", "Course", "slide_0")["transcript"] == [{"role": "user", "content": "hi"}]
+
+    store.reset("amy", "Course", "slide_0")
+    assert shown["transcript"] != [] and store.load("amy", "Course", "slide_0")["transcript"] == []
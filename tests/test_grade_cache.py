@@ -0,0 +1,114 @@
+import json
+import re
+import pytest
+from agents import reviewer_agent
+from agents.grade_cache import GradeCache, answer_fingerprint, answer_key_version
+from agents.reviewer_agent import ReviewerAgent
+
+QUESTION = {"question": "What is the velocity?", "sample_answer": "-3.2 m/s"}
+
+
+@pytest.mark.parametrize("a, b", [
+    ("-5", "5"),
+    ("-3.2 m/s", "3.2 m/s"),
+    ("5%", "5"),
+    ("$5", "5"),
+    ("CO", "Co"),
+])
+def test_fingerprint_keeps_meaningful_differences(a, b):
+    assert answer_fingerprint(a) != answer_fingerprint(b)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("photo  synthesis", "photo synthesis"),
+    ("  answer\n", "answer"),
+    ("ｆｕｌｌｗｉｄｔｈ", "fullwidth"),  # NFKC
+])
+def test_fingerprint_ignores_whitespace_and_unicode_forms(a, b):
+    assert answer_fingerprint(a) == answer_fingerprint(b)
+
+
+def test_key_changes_with_answer_key():
+    edited = dict(QUESTION, sample_answer="3.2 m/s")
+    assert GradeCache.make_key("quiz_0/0", QUESTION, "x") != GradeCache.make_key("quiz_0/0", edited, "x")
+    assert answer_key_version({"questions": [QUESTION]}) != answer_key_version({"questions": [edited]})
+
+
+def test_memo_hits_misses_and_eviction():
+    cache = GradeCache(max_entries=2)
+    keys = [GradeCache.make_key("quiz_0/0", QUESTION, answer) for answer in ("a", "b", "c")]
+
+    assert cache.get(keys[0]) is None
+    cache.set(keys[0], {"points_earned": 1})
+    cache.set(keys[1], {"points_earned": 2})
+    assert cache.get(keys[0]) == {"points_earned": 1}  # Now most recently used
+    cache.set(keys[2], {"points_earned": 3})
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) == {"points_earned": 3}
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 2, 2)
+
+
+def test_export_and_load_state_keep_existing_grades():
+    source = GradeCache()
+    source.set("k1", {"points_earned": 1})
+    source.set("k2", {"points_earned": 2})
+
+    target = GradeCache()
+    target.set("k1", {"points_earned": 5})
+    assert target.load_state(source.export_state()) == 1
+    assert target.get("k1") == {"points_earned": 5}
+    assert target.get("k2") == {"points_earned": 2}
+
+
+@pytest.fixture
+def reviewer(monkeypatch):
+    """Reviewer with its own grade memo; the model scores "right" answers 10 and others 3"""
+    monkeypatch.setattr(reviewer_agent, "get_grade_cache", lambda cache=GradeCache(): cache)
+    agent = ReviewerAgent(user_id="grader")
+    agent.prompts = []
+
+    def chat(operation, messages, **params):
+        prompt = messages[-1]["content"]
+        agent.prompts.append(prompt)
+        answers = re.findall(r"^A\d+: (.*)$", prompt, re.MULTILINE)
+        return json.dumps({
+            "question_scores": [
+                {"question_number": n, "points_earned": 10 if a == "right" else 3, "max_points": 10,
+                 "feedback": f"Feedback on {a}", "concepts_to_review": [] if a == "right" else [f"Concept {n}"]}
+                for n, a in enumerate(answers, 1)
+            ],
+            "weak_areas": ["From the model"],
+            "strong_areas": [],
+            "recommendations": ["Review the lecture"],
+            "overall_feedback": "Written by the model"
+        })
+
+    monkeypatch.setattr(agent, "_chat", chat)
+    return agent
+
+
+def test_whole_quiz_grading_sends_only_answers_not_graded_before(reviewer):
+    quiz = {"id": "quiz_0", "type": "Conversational",
+            "questions": [{"question": f"Question {n}", "sample_answer": "right"} for n in range(3)]}
+
+    first = reviewer.grade_submission(quiz, [{"answer": "right"}, {"answer": "wrong"}, {"answer": "right"}])
+    assert len(reviewer.prompts) == 1
+    assert first["overall_feedback"] == "Written by the model"
+    assert [s["points_earned"] for s in first["question_scores"]] == [10, 3, 10]
+
+    # A regrade of the same answers is served from the memo
+    again = reviewer.grade_submission(quiz, [{"answer": "right"}, {"answer": "wrong"}, {"answer": "right"}])
+    assert len(reviewer.prompts) == 1
+    assert again["overall_score"] == first["overall_score"]
+    assert all(s["cached"] for s in again["question_scores"])
+
+    # Another student with one new answer: only that answer is sent
+    other = reviewer.grade_submission(quiz, [{"answer": "right"}, {"answer": "wrong"}, {"answer": "almost"}])
+    assert len(reviewer.prompts) == 2
+    assert "A1: almost" in reviewer.prompts[-1] and "A2" not in reviewer.prompts[-1]
+    assert [(s["question_number"], s["points_earned"]) for s in other["question_scores"]] == [(1, 10), (2, 3), (3, 3)]
+    assert other["overall_score"] == round(16 / 30 * 100, 1)
+    assert other["overall_feedback"] == "Written by the model"
+    assert other["weak_areas"][:2] == ["From the model", "Concept 2"]
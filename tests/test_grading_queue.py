@@ -0,0 +1,118 @@
+import json
+import os
+import threading
+import time
+import pytest
+from utils import grading_queue
+from utils.grading_queue import GradingQueue
+
+QUIZ = {"id": "quiz_0", "type": "Multiple Choice (MCQ)", "questions": [{"question": "q", "correct_answer": "A"}]}
+
+
+@pytest.fixture
+def graded(monkeypatch):
+    """Replace the model call; returns the submissions graded so far"""
+    calls = []
+
+    def grade_submission(self, quiz, answers):
+        calls.append(answers)
+        return {"overall_score": 100, "weak_areas": [], "strong_areas": []}
+
+    monkeypatch.setattr(grading_queue.ReviewerAgent, "grade_submission", grade_submission)
+    monkeypatch.setattr(grading_queue, "apply_quiz_result", lambda *args: None)
+    return calls
+
+
+def spool(directory, record, mtime=None):
+    path = os.path.join(directory, f"{record['id']}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def record(submission_id, status, submitted_at="2026-01-01T10:00:00", student="amy", **fields):
+    return dict({
+        "id": submission_id,
+        "course": "Course",
+        "quiz": QUIZ,
+        "student": student,
+        "answers": [{"answer": submission_id}],
+        "attempt_index": None,
+        "status": status,
+        "submitted_at": submitted_at
+    }, **fields)
+
+
+def wait_for(grading, submission_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        current = grading.get(submission_id)
+        if current and current["status"] in ("graded", "failed"):
+            return current
+        time.sleep(0.02)
+    raise AssertionError(f"{submission_id} was not graded")
+
+
+def test_submissions_interrupted_by_a_crash_are_graded_on_start(tmp_path, graded):
+    spool(tmp_path, record("queued1", "queued", submitted_at="2026-01-01T10:00:01"))
+    spool(tmp_path, record("grading1", "grading", submitted_at="2026-01-01T10:00:00"))
+
+    grading = GradingQueue(workers=1, spool_dir=str(tmp_path))
+
+    assert wait_for(grading, "grading1")["status"] == "graded"
+    assert wait_for(grading, "queued1")["status"] == "graded"
+    assert [answers[0]["answer"] for answers in graded] == ["grading1", "queued1"]  # Oldest first
+    with open(tmp_path / "queued1.json", encoding="utf-8") as f:
+        assert json.load(f)["status"] == "graded"
+
+
+def test_expired_submissions_are_deleted_and_recent_ones_kept(tmp_path, graded):
+    old = time.time() - 3600
+    spool(tmp_path, record("old", "graded", finished_at=old))
+    spool(tmp_path, record("legacy", "graded"), mtime=old)  # No finished_at: the file time counts
+    spool(tmp_path, record("recent", "graded", submitted_at="2026-01-02T10:00:00", finished_at=time.time()))
+    (tmp_path / "old.lock").write_text("")
+
+    grading = GradingQueue(workers=1, spool_dir=str(tmp_path), retention_seconds=60)
+
+    assert sorted(os.listdir(tmp_path)) == ["recent.json"]
+    assert grading.get("old") is None
+    assert grading.latest_for("Course", "quiz_0", "amy")["id"] == "recent"
+    assert grading.get_stats()["graded"] == 1
+
+
+def test_finished_submissions_are_pruned_while_running(tmp_path, graded):
+    grading = GradingQueue(workers=1, spool_dir=str(tmp_path), retention_seconds=0.1)
+    submission_id = grading.submit("Course", QUIZ, "amy", [{"answer": "A"}])
+    wait_for(grading, submission_id)
+
+    time.sleep(0.2)
+    grading._prune(force=True)
+
+    assert grading.get(submission_id) is None
+    assert grading.get_stats()["graded"] == 0
+    assert not os.path.exists(tmp_path / f"{submission_id}.json")
+
+
+def test_position_and_latest_follow_the_queue(tmp_path, graded, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(grading_queue.ReviewerAgent, "grade_submission",
+                        lambda self, quiz, answers: release.wait() and {"overall_score": 50})
+
+    grading = GradingQueue(workers=1, spool_dir=str(tmp_path))
+    first = grading.submit("Course", QUIZ, "amy", [{"answer": "A"}])
+    time.sleep(0.1)  # The single worker is now busy with the first submission
+    second = grading.submit("Course", QUIZ, "bob", [{"answer": "B"}])
+    third = grading.submit("Course", QUIZ, "amy", [{"answer": "C"}])
+
+    assert grading.position(first) == 0
+    assert (grading.position(second), grading.position(third)) == (0, 1)
+    assert grading.latest_for("Course", "quiz_0", "amy")["id"] == third
+    assert grading.get_stats()["queued"] == 2
+
+    release.set()
+    for submission_id in (first, second, third):
+        wait_for(grading, submission_id)
+    assert grading.get_stats()["graded"] == 3
@@ -0,0 +1,40 @@
+import json
+import pytest
+from agents.json_stream import JsonArrayStreamParser
+
+DOCUMENT = {
+    "title": "Quiz {draft} [1]",
+    "meta": {"questions": [{"question": "nested, not emitted"}]},
+    "questions": [
+        {"question": "What does \"{}\" print?", "options": ["A) {", "B) ]"], "correct_answer": "A"},
+        {"question": "Escaped \\\\ backslash", "hints": [["a"], []]},
+        {"question": "Unicode: ∑ naïve"}
+    ],
+    "summary": "done"
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 10 ** 6])
+def test_elements_are_emitted_whatever_the_chunking(chunk_size):
+    text = json.dumps(DOCUMENT, ensure_ascii=False)
+    parser = JsonArrayStreamParser("questions")
+
+    emitted = []
+    for start in range(0, len(text), chunk_size):
+        emitted += parser.feed(text[start:start + chunk_size])
+
+    assert emitted == DOCUMENT["questions"]
+    assert parser.get_text() == text
+
+
+def test_each_element_is_emitted_as_soon_as_it_closes():
+    parser = JsonArrayStreamParser("questions")
+    assert parser.feed('{"questions": [{"question": "one"}') == [{"question": "one"}]
+    assert parser.feed(', {"question": "tw') == []
+    assert parser.feed('o"}') == [{"question": "two"}]
+    assert parser.feed(']}') == []
+
+
+def test_other_array_keys_are_ignored():
+    parser = JsonArrayStreamParser("items")
+    assert parser.feed(json.dumps({"questions": [{"a": 1}], "items": [{"b": 2}]})) == [{"b": 2}]
@@ -0,0 +1,27 @@
+from agents.learner_agent import LearnerAgent
+from config import TUTOR_SUMMARY_MAX_TOKENS
+from utils.tokens import count_tokens, truncate_to_tokens
+
+
+def test_truncation_can_keep_the_end():
+    text = "\n\n".join(f"Paragraph {n} " + "word " * 40 for n in range(20))
+
+    assert truncate_to_tokens(text, 100).startswith("Paragraph 0 ")
+    tail = truncate_to_tokens(text, 100, keep_end=True)
+    assert tail.startswith("Paragraph 1") and text.endswith(tail)
+    assert count_tokens(tail) <= 100
+
+
+def test_failed_summary_keeps_the_latest_turns(monkeypatch):
+    agent = LearnerAgent(user_id="tutor")
+
+    def chat(operation, messages, **params):
+        raise RuntimeError("endpoint down")
+
+    monkeypatch.setattr(agent, "_chat", chat)
+    summary = "Earlier the student asked about loops. " * 100
+    turns = [{"role": "user", "content": f"Question {n} " + "about recursion " * 20} for n in range(10)]
+
+    merged = agent._summarize_turns(turns, summary)
+    assert count_tokens(merged) <= TUTOR_SUMMARY_MAX_TOKENS
+    assert "Question 9" in merged and "Earlier the student asked about loops." in merged
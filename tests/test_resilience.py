@@ -0,0 +1,143 @@
+import time
+import pytest
+from agents import resilience
+from agents.base_agent import BaseAgent
+from agents.resilience import ResilientCaller, CircuitBreaker, CircuitOpenError
+from agents.scheduler import RequestScheduler, QueueTimeoutError, PRIORITY_INTERACTIVE
+from config import LLM_MAX_RETRIES
+
+
+def make_agent(monkeypatch, deadline: float) -> BaseAgent:
+    monkeypatch.setitem(resilience.LLM_CALL_DEADLINES, "Test.op", deadline)
+    agent = BaseAgent(user_id="alice")
+    agent.scheduler = RequestScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 7)
+    agent.resilience = ResilientCaller()
+    return agent
+
+
+def test_acquire_times_out_and_leaves_the_queue():
+    scheduler = RequestScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 7)
+    scheduler.pause(5)
+
+    started = time.monotonic()
+    with pytest.raises(QueueTimeoutError):
+        scheduler.acquire("alice", PRIORITY_INTERACTIVE, 10, timeout=0.2)
+
+    assert time.monotonic() - started < 1.0
+    assert scheduler.queue_depth() == 0
+    assert scheduler.get_stats()["interactive"]["timed_out"] == 1
+
+
+def test_request_gets_only_the_deadline_left_after_queueing(monkeypatch):
+    agent = make_agent(monkeypatch, deadline=2.0)
+    agent.scheduler.pause(0.5)
+    timeouts = []
+    monkeypatch.setattr(agent, "_create", lambda **request: timeouts.append(request["timeout"]) or "response")
+
+    assert agent._send("Test.op", "model", [{"role": "user", "content": "hi"}], {}) == "response"
+    assert 1.0 < timeouts[0] <= 1.55
+
+
+def test_queue_wait_past_the_deadline_fails_without_sending(monkeypatch):
+    agent = make_agent(monkeypatch, deadline=0.3)
+    agent.scheduler.pause(5)
+    monkeypatch.setattr(agent, "_create", lambda **request: pytest.fail("request sent after the deadline"))
+
+    started = time.monotonic()
+    with pytest.raises(QueueTimeoutError):
+        agent._send("Test.op", "model", [{"role": "user", "content": "hi"}], {})
+
+    assert time.monotonic() - started < 1.0
+    assert agent.resilience.breaker.state == "closed"  # The endpoint never failed
+
+
+@pytest.fixture
+def caller(monkeypatch):
+    monkeypatch.setattr(resilience, "LLM_RETRY_BASE_DELAY", 0.001)
+    caller = ResilientCaller()
+    caller.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=0.2)
+    return caller
+
+
+def failing(errors, result="response"):
+    """Attempt that raises the given errors in turn, then returns result"""
+    calls = []
+
+    def attempt(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return attempt, calls
+
+
+def test_transient_failures_are_retried(caller):
+    attempt, calls = failing([TimeoutError("slow"), TimeoutError("slow")])
+
+    assert caller.call("Test.op", attempt) == "response"
+    assert len(calls) == 3
+    assert caller.get_stats()["retries"] == 2
+    assert caller.breaker.state == "closed"  # Reset by the success
+
+
+def test_retries_are_bounded(caller):
+    attempt, calls = failing([TimeoutError(str(n)) for n in range(LLM_MAX_RETRIES + 2)])
+
+    with pytest.raises(TimeoutError, match=str(LLM_MAX_RETRIES)):
+        caller.call("Test.op", attempt)
+    assert len(calls) == LLM_MAX_RETRIES + 1
+    assert caller.get_stats()["failures"] == 1
+
+
+def test_bad_requests_are_not_retried(caller):
+    attempt, calls = failing([ValueError("invalid request")])
+
+    with pytest.raises(ValueError):
+        caller.call("Test.op", attempt)
+    assert len(calls) == 1
+    assert caller.breaker.state == "closed"
+
+
+def test_breaker_opens_fails_fast_and_recovers_after_a_probe(caller):
+    caller.breaker = CircuitBreaker(failure_threshold=LLM_MAX_RETRIES + 1, reset_timeout=0.2)
+    attempt, calls = failing([TimeoutError("down")] * (LLM_MAX_RETRIES + 1))
+    with pytest.raises(TimeoutError):
+        caller.call("Test.op", attempt)
+    assert caller.breaker.state == "open"
+
+    sent = len(calls)
+    with pytest.raises(CircuitOpenError):
+        caller.call("Test.op", attempt)
+    assert len(calls) == sent
+    assert caller.get_stats()["short_circuited"] == 1
+
+    time.sleep(0.25)
+    assert caller.call("Test.op", lambda timeout: "recovered") == "recovered"
+    assert caller.breaker.state == "closed"
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.15)
+    assert breaker.allow()
+    assert not breaker.allow()  # Only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+
+def test_probe_that_times_out_in_the_queue_does_not_block_the_breaker(caller):
+    caller.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    caller.breaker.record_failure()
+    time.sleep(0.15)
+
+    def queued_too_long(timeout):
+        raise QueueTimeoutError("waited for admission")
+
+    with pytest.raises(QueueTimeoutError):
+        caller.call("Test.op", queued_too_long)
+    assert caller.call("Test.op", lambda timeout: "ok") == "ok"
+    assert caller.breaker.state == "closed"
@@ -0,0 +1,103 @@
+import pytest
+from types import SimpleNamespace
+from agents import response_cache
+from agents.base_agent import BaseAgent
+from agents.response_cache import ResponseCache, make_cache_key
+
+MESSAGES = [{"role": "system", "content": "You are a tutor."}, {"role": "user", "content": "Explain recursion"}]
+
+
+def test_key_ignores_whitespace_only():
+    spaced = [{"role": "system", "content": "You are  a tutor.\n"}, {"role": "user", "content": " Explain recursion"}]
+    key = make_cache_key("gpt-4", MESSAGES, {"temperature": 0.7})
+
+    assert make_cache_key("gpt-4", spaced, {"temperature": 0.7}) == key
+    assert make_cache_key("gpt-4", MESSAGES[::-1], {"temperature": 0.7}) != key
+    assert make_cache_key("gpt-4o", MESSAGES, {"temperature": 0.7}) != key
+    assert make_cache_key("gpt-4", MESSAGES, {"temperature": 0.2}) != key
+    assert make_cache_key("gpt-4", [dict(MESSAGES[0]), {"role": "user", "content": "Explain Recursion"}],
+                          {"temperature": 0.7}) != key
+
+
+def test_entries_expire_after_ttl(monkeypatch, tmp_path):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    cache.set("key", "answer", ttl=60, latency=2.0, tokens=100)
+
+    now[0] += 59
+    assert cache.get("key")["content"] == "answer"
+
+    now[0] += 2
+    assert cache.get("key") is None  # Expired in memory and on disk
+
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert (stats["saved_latency_seconds"], stats["saved_tokens"]) == (2.0, 100)
+
+
+def test_disk_entries_survive_a_new_cache(tmp_path):
+    ResponseCache(disk_dir=str(tmp_path)).set("key", "answer", ttl=60)
+
+    cache = ResponseCache(disk_dir=str(tmp_path))
+    assert cache.get("key")["content"] == "answer"
+    assert cache.get("key")["content"] == "answer"
+
+    stats = cache.get_stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    cache.get("a")
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("b") is None
+    assert cache.get("a")["content"] == "1"
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_agent_caches_only_operations_with_a_ttl(monkeypatch):
+    agent = BaseAgent(user_id="alice")
+    agent.cache = ResponseCache()
+    agent.cache_ttls = {"Test.cached": 60}
+    sent = []
+
+    def send(operation, model, messages, params, stream=False, trace=None):
+        sent.append(operation)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=f"reply {len(sent)}"))])
+
+    monkeypatch.setattr(agent, "_send", send)
+
+    assert agent._chat("Test.cached", MESSAGES, model="m") == "reply 1"
+    assert agent._chat("Test.cached", MESSAGES, model="m") == "reply 1"
+    assert agent._chat("Test.cached", MESSAGES, model="m", bypass_cache=True) == "reply 2"
+    assert agent._chat("Test.cached", MESSAGES, model="m") == "reply 2"  # Refreshed by the bypassing call
+    assert agent._chat("Test.uncached", MESSAGES, model="m") == "reply 3"
+    assert agent._chat("Test.uncached", MESSAGES, model="m") == "reply 4"
+
+
+def test_agent_does_not_cache_rejected_responses(monkeypatch):
+    agent = BaseAgent(user_id="alice")
+    agent.cache = ResponseCache()
+    agent.cache_ttls = {"Test.cached": 60}
+    replies = iter(['{"questions": [{"question": "Q"', '', '{"questions": [{"question": "Q"}]}', "unused"])
+    monkeypatch.setattr(agent, "_send", lambda *args, **kwargs: SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=next(replies)))]
+    ))
+    check = BaseAgent._has_items({"required": {"question": str}}, wanted=1)
+
+    assert agent._chat("Test.cached", MESSAGES, model="m", validate=lambda content: False) == '{"questions": [{"question": "Q"'
+    assert agent._chat("Test.cached", MESSAGES, model="m", validate=check) == ''  # Empty: never cached
+    assert agent._chat("Test.cached", MESSAGES, model="m", validate=check) == '{"questions": [{"question": "Q"}]}'
+    assert agent._chat("Test.cached", MESSAGES, model="m", validate=check) == '{"questions": [{"question": "Q"}]}'
+
+
+def test_item_check_counts_valid_items():
+    check = BaseAgent._has_items({"required": {"question": str}}, wanted=2)
+    assert check('{"questions": [{"question": "A"}, {"question": "B"}]}')
+    assert not check('{"questions": [{"question": "A"}, {"text": "B"}]}')
+    with pytest.raises(ValueError):
+        check("no json here")
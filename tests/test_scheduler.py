@@ -0,0 +1,81 @@
+import threading
+import time
+from agents.scheduler import RequestScheduler, PRIORITY_GRADING, PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND
+
+
+def make_scheduler(**limits) -> RequestScheduler:
+    return RequestScheduler(**dict({"requests_per_minute": 6000, "tokens_per_minute": 10 ** 7}, **limits))
+
+
+def queue_while_paused(scheduler, requests):
+    """Queue (user, priority) requests in order while admission is paused; returns the admission order"""
+    admitted = []
+    dequeue = scheduler._dequeue
+
+    def record(priority, user):
+        admitted.append((user, priority))
+        dequeue(priority, user)
+
+    scheduler._dequeue = record
+    scheduler.pause(0.3)
+
+    threads = []
+    for user, priority in requests:
+        thread = threading.Thread(target=scheduler.acquire, args=(user, priority, 10))
+        thread.start()
+        threads.append(thread)
+        while scheduler.queue_depth() < len(threads):
+            time.sleep(0.001)
+
+    for thread in threads:
+        thread.join(5)
+    return admitted
+
+
+def test_users_take_turns_within_a_class():
+    scheduler = make_scheduler()
+    order = queue_while_paused(scheduler, [
+        ("alice", PRIORITY_INTERACTIVE),
+        ("alice", PRIORITY_INTERACTIVE),
+        ("alice", PRIORITY_INTERACTIVE),
+        ("bob", PRIORITY_INTERACTIVE),
+        ("carol", PRIORITY_INTERACTIVE)
+    ])
+    assert [user for user, _ in order] == ["alice", "bob", "carol", "alice", "alice"]
+
+
+def test_more_urgent_classes_go_first():
+    scheduler = make_scheduler()
+    order = queue_while_paused(scheduler, [
+        ("warmup", PRIORITY_BACKGROUND),
+        ("alice", PRIORITY_INTERACTIVE),
+        ("grader", PRIORITY_GRADING),
+        ("bob", PRIORITY_INTERACTIVE)
+    ])
+    assert order == [
+        ("grader", PRIORITY_GRADING),
+        ("alice", PRIORITY_INTERACTIVE),
+        ("bob", PRIORITY_INTERACTIVE),
+        ("warmup", PRIORITY_BACKGROUND)
+    ]
+    stats = scheduler.get_stats()
+    assert (stats["grading"]["admitted"], stats["interactive"]["admitted"], stats["background"]["admitted"]) == (1, 2, 1)
+    assert stats["queue_depth"] == 0
+
+
+def test_request_rate_is_limited():
+    scheduler = make_scheduler(requests_per_minute=600, burst_seconds=0.1)  # One at a time, ten per second
+
+    started = time.monotonic()
+    for _ in range(3):
+        scheduler.acquire("alice", PRIORITY_INTERACTIVE, 10)
+    assert time.monotonic() - started >= 0.18
+
+
+def test_settling_returns_unused_tokens():
+    scheduler = make_scheduler(tokens_per_minute=6000, burst_seconds=1)  # 100 tokens available
+    scheduler.acquire("alice", PRIORITY_INTERACTIVE, 100)
+    assert scheduler.tokens.wait_time(100) > 0.5
+
+    scheduler.settle(estimated_tokens=100, actual_tokens=20)
+    assert scheduler.tokens.wait_time(80) == 0
@@ -0,0 +1,74 @@
+import threading
+import time
+import pytest
+from agents.single_flight import SingleFlight
+
+
+def run_concurrently(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def test_concurrent_identical_calls_share_one_request():
+    group = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    leader = run_concurrently(1, lambda: results.append(group.do("key", fetch)))
+    while group.in_flight() == 0:
+        time.sleep(0.001)
+    followers = run_concurrently(4, lambda: results.append(group.do("key", fetch)))
+    while group.get_stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in leader + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("answer", False)] + [("answer", True)] * 4
+    assert group.get_stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_the_next_call_retries():
+    group = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fail():
+        release.wait(5)
+        raise RuntimeError("endpoint down")
+
+    def call():
+        try:
+            group.do("key", fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = run_concurrently(1, call)
+    while group.in_flight() == 0:
+        time.sleep(0.001)
+    threads += run_concurrently(2, call)
+    while group.get_stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["endpoint down"] * 3
+    assert group.do("key", lambda: "recovered") == ("recovered", False)
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    group = SingleFlight()
+    assert group.do("a", lambda: 1) == (1, False)
+    assert group.do("b", lambda: 2) == (2, False)
+    with pytest.raises(ValueError):
+        group.do("c", lambda: int("x"))
+    assert group.get_stats()["coalesced"] == 0
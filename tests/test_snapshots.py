@@ -0,0 +1,92 @@
+import pickle
+import time
+import pytest
+from agents.grade_cache import GradeCache
+from agents.response_cache import ResponseCache
+from utils import snapshots, storage
+from utils.compression import Packed, PayloadCodec
+from utils.question_pool import QuestionPool
+from utils.snapshots import StateSnapshotter
+
+SLIDE = {"id": "slide_0", "title": "Recursion", "content": "Recursion calls itself", "page_texts": ["Recursion calls itself"]}
+QUESTIONS = [{"question": f"Question {n}", "topic": "recursion"} for n in range(3)]
+
+
+@pytest.fixture
+def process(monkeypatch):
+    """Fresh process-wide state; calling it again simulates a restart"""
+    previous = storage.get_storage_backend()
+    monkeypatch.setattr(snapshots, "DEFAULT_COURSES", [])
+
+    def start(generate=lambda content, difficulty, count: []):
+        components = {
+            "response_cache": ResponseCache(),
+            "grade_cache": GradeCache(),
+            "question_pool": QuestionPool(generate, low_water=1, target=3, batch_size=3)
+        }
+        storage.set_storage_backend(storage.MemoryBackend(codec=PayloadCodec(collections=("slides",))))
+        for name, component in components.items():
+            monkeypatch.setattr(snapshots, f"get_{name}", lambda component=component: component)
+        return components
+
+    yield start
+    storage.set_storage_backend(previous)
+
+
+def test_restart_restores_data_and_warm_caches(process, tmp_path):
+    before = process(generate=lambda content, difficulty, count: QUESTIONS[:count])
+    storage.save_slides("Course", [SLIDE])
+    before["response_cache"].set("explain", "Recursion is...", ttl=3600)
+    before["grade_cache"].set("grade", {"points_earned": 5})
+    before["question_pool"].register_slide(SLIDE["content"], ["Easy"])
+    while before["question_pool"].get_stats()["generated"] < 3:
+        time.sleep(0.01)
+
+    assert StateSnapshotter(str(tmp_path)).snapshot()["bytes"] > 0
+
+    after = process()
+    assert storage.get_slides("Course") == []
+    restored = StateSnapshotter(str(tmp_path)).restore()
+
+    assert restored["storage"] == 2 and restored["indexes"] == 1  # The slides and their number counter
+    assert storage.get_slides("Course")[0]["content"] == SLIDE["content"]
+    assert "Course" in storage.get_indexed_courses()
+    assert after["response_cache"].get("explain")["content"] == "Recursion is..."
+    assert after["grade_cache"].get("grade") == {"points_earned": 5}
+    assert after["question_pool"].take(SLIDE["content"], "Easy", 3) == QUESTIONS
+
+
+def test_missing_or_corrupt_snapshot_starts_cold(process, tmp_path):
+    process()
+    snapshotter = StateSnapshotter(str(tmp_path))
+    assert snapshotter.restore() == {"indexes": 0, "restore_seconds": pytest.approx(0, abs=1),
+                                     "warm_seconds": pytest.approx(0, abs=1)}
+
+    with open(snapshotter.path, "wb") as f:
+        f.write(b"truncated")
+    assert "storage" not in snapshotter.restore()
+    assert snapshotter.get_stats()["restored"] is False
+
+
+def test_compressed_values_are_exported_packed(monkeypatch):
+    codec = PayloadCodec(collections=("slides",), min_bytes=0)
+    source = storage.MemoryBackend(codec=codec)
+    source.set("slides", "Course", [dict(SLIDE, id=f"slide_{n}", pages=[bytes(5000)]) for n in range(20)])
+    codec.train("slides", [[SLIDE], [dict(SLIDE, id="slide_1")]])
+    other = [dict(SLIDE, title=f"Recursion {n}") for n in range(5)]
+    source.set("slides", "Other", other)
+    source.set("progress", "Course_amy", {"weak_areas": ["recursion"]})
+
+    monkeypatch.setattr(codec, "unpack", lambda packed: pytest.fail("decompressed on export"))
+    state = pickle.loads(pickle.dumps(source.export_state(), protocol=pickle.HIGHEST_PROTOCOL))
+    monkeypatch.undo()
+    assert isinstance(state["slides"]["Other"], Packed) and state["slides"]["Other"].dictionary_id
+
+    # Restored packed where the collection is compressed, unpacked where it is not
+    compressed = storage.MemoryBackend(codec=PayloadCodec(collections=("slides",)))
+    plain = storage.MemoryBackend()
+    for target in (compressed, plain):
+        assert target.load_state(state) == 3
+        assert target.get("slides", "Other") == other
+        assert target.get("progress", "Course_amy") == {"weak_areas": ["recursion"]}
+    assert not isinstance(plain._collections["slides"]["Course"], Packed)
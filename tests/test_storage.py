@@ -0,0 +1,64 @@
+import pytest
+from utils import storage
+from utils.compression import PayloadCodec
+from utils.storage import (
+    DirectoryBackend,
+    get_quiz_attempts,
+    get_student_attempts,
+    save_quiz_attempt,
+    update_quiz_attempt
+)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    previous = storage.get_storage_backend()
+    backend = DirectoryBackend(str(tmp_path), codec=PayloadCodec(collections=("student_attempts",)))
+    storage.set_storage_backend(backend)
+    yield backend
+    storage.set_storage_backend(previous)
+
+
+def test_attempts_are_stored_per_student(backend):
+    assert save_quiz_attempt("Course", "quiz_0", "amy", {"answers": ["A"]}) == 0
+    assert save_quiz_attempt("Course", "quiz_0", "bob", {"answers": ["B"]}) == 0
+    before = backend.version("student_attempts", "Course_quiz_0_amy")
+
+    assert save_quiz_attempt("Course", "quiz_0", "bob", {"answers": ["C"]}) == 1
+    update_quiz_attempt("Course", "quiz_0", "bob", 0, lambda attempt: attempt.update(status="graded"))
+
+    # Bob's submission and regrade leave Amy's attempts untouched
+    assert backend.version("student_attempts", "Course_quiz_0_amy") == before
+    attempts = get_quiz_attempts("Course", "quiz_0")
+    assert sorted(attempts) == ["amy", "bob"]
+    assert [a["answers"] for a in attempts["bob"]] == [["B"], ["C"]]
+    assert attempts["bob"][0]["status"] == "graded"
+    assert get_student_attempts("Course", "quiz_1", "amy") == []
+
+
+def test_legacy_attempts_are_read_and_carried_over(backend):
+    backend.set("quiz_attempts", "Course_quiz_0", {"amy": [{"answers": ["A"]}], "bob": [{"answers": ["B"]}]})
+
+    assert save_quiz_attempt("Course", "quiz_0", "amy", {"answers": ["D"]}) == 1
+    update_quiz_attempt("Course", "quiz_0", "bob", 0, lambda attempt: attempt.update(status="graded"))
+
+    attempts = get_quiz_attempts("Course", "quiz_0")
+    assert [a["answers"] for a in attempts["amy"]] == [["A"], ["D"]]
+    assert attempts["bob"] == [{"answers": ["B"], "status": "graded"}]
+    assert get_student_attempts("Course", "quiz_0", "amy")[0] == {"answers": ["A"]}
+
+
+def test_removed_slide_numbers_are_not_reused(backend):
+    storage.save_slides("Course", [{"id": f"slide_{n}", "order": n, "title": str(n)} for n in range(2)])
+    storage.remove_slide("Course", "slide_1")
+    assert storage.get_next_slide_number("Course") == 2
+
+    # IDs picked before another process saved are renumbered past it
+    storage.save_slides("Course", [{"id": "slide_2", "order": 2, "title": "other process"}])
+    stale = {"id": "slide_2", "order": 2, "title": "this process"}
+    storage.save_slides("Course", [stale])
+    assert stale["id"] == "slide_3"
+
+    storage.remove_slide("Course", "slide_3")
+    storage.save_slides("Course", [{"id": "slide_1", "order": 1, "title": "reused number"}])
+    assert [slide["id"] for slide in storage.get_slides("Course")] == ["slide_0", "slide_2", "slide_4"]
@@ -0,0 +1,119 @@
+import json
+import pytest
+from agents import base_agent, reviewer_agent
+from agents.base_agent import BaseAgent
+from agents.grade_cache import GradeCache
+from agents.reviewer_agent import ReviewerAgent
+from agents.validation import (
+    GRADE_SCHEMA,
+    PRACTICE_QUESTION_SCHEMA,
+    QUESTION_SCORE_SCHEMA,
+    OutputValidator,
+    check_item,
+    repair_json
+)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('Sure! Here is the quiz:\n{"a": [1, 2]}\nLet me know if you need more.', {"a": [1, 2]}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+    # Truncated mid-element: the incomplete element is dropped
+    ('{"questions": [{"q": "one"}, {"q": "two", "options": ["A", "B"', {"questions": [{"q": "one"}]}),
+    ('{"title": "T", "questions": [{"q": "a", "rubric": {"x": 1}, "opt', {"title": "T", "questions": []}),
+    # Truncated mid-string
+    ('{"questions": [{"q": "one"}, {"q": "tw', {"questions": [{"q": "one"}]}),
+    ('{"question": "x", "answer": "cut o', {"question": "x"}),
+    ('{"answer": "cut o', {"answer": "cut o"}),
+])
+def test_repair_json(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_unrepairable_output_is_rejected_and_counted():
+    validator = OutputValidator()
+    with pytest.raises(ValueError):
+        validator.parse("I cannot help with that.")
+    assert validator.parse('```json\n{"a": 1}\n```') == {"a": 1}
+    assert validator.parse('{"a": 1}') == {"a": 1}
+
+    stats = validator.get_stats()
+    assert (stats["responses"], stats["json_repaired"], stats["unparseable"]) == (3, 1, 1)
+
+
+@pytest.mark.parametrize("points, max_points, expected", [
+    ("7/10", 10, 7.0),
+    ("7/20", 10, 3.5),
+    ("80%", 10, 8.0),
+    ("6 points", "10", 6.0),
+    ("6", 10, 6.0),
+    (15, 10, 10),   # Clamped to max_points
+    (-2, 10, 0),
+])
+def test_points_are_coerced_and_clamped(points, max_points, expected):
+    grade, problems = check_item({"points_earned": points, "max_points": max_points}, GRADE_SCHEMA)
+    assert problems == []
+    assert grade["points_earned"] == expected
+
+
+def test_invalid_fields_are_reported_or_dropped():
+    score, problems = check_item({"question_number": "2", "points_earned": "a lot", "max_points": 10,
+                                  "feedback": ["not", "a string"]}, QUESTION_SCORE_SCHEMA)
+    assert problems == ["points_earned is not a number"]
+
+    score, problems = check_item({"question_number": 2.0, "points_earned": 5, "max_points": 10,
+                                  "feedback": 7, "concepts_to_review": "Recursion"}, QUESTION_SCORE_SCHEMA)
+    assert problems == []
+    assert score == {"question_number": 2, "points_earned": 5, "max_points": 10,
+                     "feedback": "7", "concepts_to_review": ["Recursion"]}
+
+    assert check_item({"points_earned": 1, "max_points": 0}, GRADE_SCHEMA)[1] == ["max_points is not positive"]
+    assert check_item("not an object", GRADE_SCHEMA) == (None, ["not an object"])
+
+
+def test_top_up_requests_only_the_missing_items(monkeypatch):
+    monkeypatch.setattr(base_agent, "SCHEMA_REREQUEST_ATTEMPTS", 2)
+    agent = BaseAgent(user_id="alice")
+    agent.validator = OutputValidator()
+    replies = iter([
+        {"questions": [{"question": "Q3", "correct_answer": "A"}, {"question": "no answer"},
+                       {"question": "Q4", "correct_answer": "B"}]},
+        {"questions": [{"question": f"Q{n}", "correct_answer": "C"} for n in range(5, 9)]},
+    ])
+    asked = []
+
+    def chat(operation, messages, **params):
+        asked.append(messages[0]["content"])
+        return json.dumps(next(replies))
+
+    monkeypatch.setattr(agent, "_chat", chat)
+    items = [{"question": "Q1", "correct_answer": "A"}, {"question": "Q2", "correct_answer": "A"}]
+
+    result = agent._top_up_items("Test.op", items, 5, lambda missing: [{"role": "user", "content": str(missing)}],
+                                 PRACTICE_QUESTION_SCHEMA)
+    assert [item["question"] for item in result] == ["Q1", "Q2", "Q3", "Q4", "Q5"]
+    assert asked == ["3", "1"]
+    assert agent.validator.get_stats()["re_requests"] == 2
+
+    # Nothing is requested when the response was already complete
+    assert agent._top_up_items("Test.op", result, 5, lambda missing: pytest.fail("re-requested"),
+                               PRACTICE_QUESTION_SCHEMA) == result
+
+
+def test_string_feedback_fields_do_not_fail_the_analysis(monkeypatch):
+    monkeypatch.setattr(reviewer_agent, "get_grade_cache", lambda cache=GradeCache(): cache)
+    agent = ReviewerAgent(user_id="grader")
+
+    def chat(operation, messages, **params):
+        if operation == "ReviewerAgent.analyze_quiz_performance":
+            return json.dumps({"question_scores": [], "overall_feedback": "Scores are missing"})
+        return json.dumps({"points_earned": 6, "max_points": 10,
+                           "feedback": {"strengths": "Clear structure", "weaknesses": "No units"}})
+
+    monkeypatch.setattr(agent, "_chat", chat)
+    analysis = agent.analyze_quiz_performance([{"question": "Speed?", "sample_answer": "3 m/s"}],
+                                              [{"answer": "3"}], "Conversational")
+
+    assert "error" not in analysis
+    assert analysis["question_scores"][0]["feedback"] == "Clear structure No units"
+    assert analysis["overall_score"] == 60.0
@@ -0,0 +1,48 @@
+import time
+from utils import warmup
+from utils.warmup import TutorWarmup
+
+
+def test_worker_survives_bad_responses(monkeypatch):
+    responses = {"empty": None, "broken": RuntimeError("connection reset"), "good": "Explanation"}
+
+    def teach_concept(self, slide_content, **kwargs):
+        response = responses[slide_content]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(warmup.LearnerAgent, "teach_concept", teach_concept)
+    tutor_warmup = TutorWarmup(min_interval=0)
+    for slide_content in responses:
+        tutor_warmup.schedule(slide_content)
+
+    deadline = time.monotonic() + 5
+    while tutor_warmup.get_stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stats = tutor_warmup.get_stats()
+    assert stats["pending"] == 0
+    assert (stats["warmed"], stats["errors"]) == (1, 2)
+
+
+def test_weak_areas_stay_out_of_the_system_prompt(monkeypatch):
+    sent = []
+
+    def chat(self, operation, messages, **params):
+        sent.append(messages)
+        return "Explanation"
+
+    monkeypatch.setattr(warmup.LearnerAgent, "_chat", chat)
+    warmed = warmup.LearnerAgent(user_id="warmup", priority="background")
+    warmed.teach_concept(slide_content="Recursion calls itself")
+    student = warmup.LearnerAgent(user_id="tutor")
+    student.teach_concept(slide_content="Recursion calls itself", conversation={"history": [], "summary": ""})
+    student.teach_concept(slide_content="Recursion calls itself", weak_areas=["base case"],
+                          conversation={"history": [], "summary": ""})
+
+    # A student with no weak areas sends exactly what warm-up cached; one with
+    # weak areas shares the system prompt and gets the focus in the turn
+    assert sent[1] == sent[0]
+    assert sent[2][0] == sent[0][0]
+    assert "base case" in sent[2][-1]["content"]
@@ -0,0 +1,23 @@
+import time
+from utils.weak_areas import WeakAreaModel, current_weak_areas, record_quiz_result
+
+DAY = 86400
+
+
+def test_weak_areas_decay_between_quizzes():
+    progress = record_quiz_result({}, {"weak_areas": ["Recursion"], "strong_areas": []})
+    assert current_weak_areas(progress) == ["Recursion"]
+
+    # Nothing is graded for ten weeks; the stored list still names the concept
+    area = next(iter(progress["weak_area_model"]["areas"].values()))
+    area["updated"] -= 70 * DAY
+    assert progress["weak_areas"] == ["Recursion"]
+    assert current_weak_areas(progress) == []
+
+
+def test_repeated_weakness_outranks_a_single_one():
+    model = WeakAreaModel(half_life_days=14)
+    now = time.time()
+    model.record(["Pointers"], now=now - 2 * DAY)
+    model.record(["pointer", "Hash tables"], now=now)
+    assert model.top(5, now=now) == ["Pointers", "Hash tables"]
@@ -5,39 +5,69 @@ from .storage import (
     initialize_storage,
     save_slides,
     get_slides,
+    get_slide_text,
+    remove_slide,
+    get_next_slide_number,
+    get_course_index,
+    get_indexed_courses,
     save_quiz,
     get_quizzes,
     save_quiz_attempt,
     get_quiz_attempts,
+    get_student_attempts,
+    update_quiz_attempt,
+    update_quiz,
+    save_quiz_draft,
+    get_quiz_drafts,
+    remove_quiz_draft,
+    save_practice_session,
+    get_practice_session,
+    clear_practice_session,
     update_student_progress,
+    change_student_progress,
     get_student_progress
 )
 
-from .ui_components import (
-    render_slide_viewer,
-    render_quiz_card,
-    render_progress_indicator,
-    render_chat_interface
-)
-
 from .pdf_handler import (
     pdf_to_images,
     is_pdf,
     is_image,
     extract_text_from_pdf,
+    extract_page_texts_from_pdf,
     get_pdf_page_count,
     pdf_to_base64
 )
 
+from .tokens import (
+    count_tokens,
+    chunk_text,
+    truncate_to_tokens
+)
+
 __all__ = [
     'initialize_storage',
     'save_slides',
     'get_slides',
+    'get_slide_text',
+    'remove_slide',
+    'get_next_slide_number',
+    'get_course_index',
+    'get_indexed_courses',
     'save_quiz',
     'get_quizzes',
     'save_quiz_attempt',
     'get_quiz_attempts',
+    'get_student_attempts',
+    'update_quiz_attempt',
+    'update_quiz',
+    'save_quiz_draft',
+    'get_quiz_drafts',
+    'remove_quiz_draft',
+    'save_practice_session',
+    'get_practice_session',
+    'clear_practice_session',
     'update_student_progress',
+    'change_student_progress',
     'get_student_progress',
     'render_slide_viewer',
     'render_quiz_card',
@@ -47,6 +77,21 @@ __all__ = [
     'is_pdf',
     'is_image',
     'extract_text_from_pdf',
+    'extract_page_texts_from_pdf',
     'get_pdf_page_count',
-    'pdf_to_base64'
-]
\ No newline at end of file
+    'pdf_to_base64',
+    'count_tokens',
+    'chunk_text',
+    'truncate_to_tokens'
+]
+
+_UI_COMPONENTS = {'render_slide_viewer', 'render_quiz_card', 'render_progress_indicator', 'render_chat_interface'}
+
+
+def __getattr__(name):
+    # UI components need Streamlit; load them on first use so the rest of
+    # utils (and the services built on it) runs headless
+    if name in _UI_COMPONENTS:
+        from . import ui_components
+        return getattr(ui_components, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
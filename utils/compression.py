@@ -0,0 +1,287 @@
+import hashlib
+import io
+import lzma
+import pickle
+import pickletools
+import struct
+import threading
+import zlib
+from collections import Counter
+from typing import List, Dict, Any, Callable, Optional, Tuple
+
+MAGIC = b"ECZ1"
+METHODS = {"none": 0, "zlib": 1, "lzma": 2}
+
+# Magic, method, dictionary ID length, number of blobs; followed by the
+# dictionary ID, the lengths of the compressed pickle and of each blob, the
+# compressed pickle and the blobs
+_HEADER = struct.Struct("<4sBBI")
+
+
+class Packed:
+    """
+    A stored value in compressed form: the value pickled with its large bytes
+    objects (page images, which do not compress) taken out, compressed, plus
+    those bytes objects as they are. Decompressed only when unpacked.
+    """
+
+    __slots__ = ("method", "dictionary_id", "data", "blobs")
+
+    def __init__(self, method: int, dictionary_id: str, data: bytes, blobs: Tuple[bytes, ...]):
+        self.method = method
+        self.dictionary_id = dictionary_id
+        self.data = data
+        self.blobs = blobs
+
+    @property
+    def size(self) -> int:
+        """Bytes held (and written to disk, apart from a small header)"""
+        return len(self.data) + sum(len(blob) for blob in self.blobs)
+
+    def chunks(self) -> List[bytes]:
+        """The serialized form, in parts (so blobs are written without being joined)"""
+        dictionary_id = self.dictionary_id.encode("ascii")
+        lengths = struct.pack(f"<{len(self.blobs) + 1}Q", len(self.data), *(len(blob) for blob in self.blobs))
+        return [_HEADER.pack(MAGIC, self.method, len(dictionary_id), len(self.blobs)), dictionary_id, lengths,
+                self.data, *self.blobs]
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "Packed":
+        """
+        Parse the serialized form written from chunks()
+
+        Raises:
+            ValueError: If raw is not a packed value
+        """
+        if raw[:len(MAGIC)] != MAGIC:
+            raise ValueError("not a packed value")
+
+        view = memoryview(raw)
+        _, method, id_length, blob_count = _HEADER.unpack_from(view)
+        offset = _HEADER.size
+        dictionary_id = bytes(view[offset:offset + id_length]).decode("ascii")
+        offset += id_length
+        lengths = struct.unpack_from(f"<{blob_count + 1}Q", view, offset)
+        offset += 8 * (blob_count + 1)
+
+        parts = []
+        for length in lengths:
+            parts.append(bytes(view[offset:offset + length]))
+            offset += length
+        return cls(method, dictionary_id, parts[0], tuple(parts[1:]))
+
+
+class _BlobPickler(pickle.Pickler):
+    """Pickler that leaves large bytes objects out of the stream"""
+
+    def __init__(self, file, blob_min_bytes: int):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.blob_min_bytes = blob_min_bytes
+        self.blobs = []
+
+    def persistent_id(self, obj):
+        if type(obj) is bytes and len(obj) >= self.blob_min_bytes:
+            self.blobs.append(obj)
+            return len(self.blobs) - 1
+        return None
+
+
+class _BlobUnpickler(pickle.Unpickler):
+    def __init__(self, file, blobs: Tuple[bytes, ...]):
+        super().__init__(file)
+        self.blobs = blobs
+
+    def persistent_load(self, pid):
+        return self.blobs[pid]
+
+
+def train_dictionary(samples: List[bytes], size: int = 16384) -> bytes:
+    """
+    Build a zlib preset dictionary from pickled sample values: the strings
+    that recur across samples (field names, question text, stock feedback
+    phrases), the most valuable last, where zlib reaches them most cheaply
+
+    Args:
+        samples: Pickled values, as from PayloadCodec.pickled()
+        size: Maximum dictionary size in bytes (zlib uses at most 32 KB)
+
+    Returns:
+        The dictionary (empty when the samples have nothing in common)
+    """
+    counts = Counter()
+    for sample in samples:
+        try:
+            strings = {arg for _, arg, _ in pickletools.genops(sample) if isinstance(arg, str) and 4 <= len(arg) <= 2048}
+        except ValueError:
+            continue
+        counts.update(strings)
+
+    scored = []
+    for string, count in counts.items():
+        if count >= 2:
+            encoded = string.encode("utf-8")
+            scored.append((count * len(encoded), encoded))
+    scored.sort(key=lambda item: -item[0])
+
+    chosen, total = [], 0
+    for _, encoded in scored:
+        if total + len(encoded) > size:
+            continue
+        chosen.append(encoded)
+        total += len(encoded)
+    return b"".join(reversed(chosen))
+
+
+class PayloadCodec:
+    """
+    Compresses the values of selected storage collections (slide text, quiz
+    questions, attempts with their analyses) with zlib or lzma. zlib can use
+    a preset dictionary per collection, trained on stored values, which
+    helps most with many small, similarly shaped JSON-like values; lzma
+    ignores dictionaries. Values packed with any method or dictionary stay
+    readable after the configuration changes.
+    """
+
+    def __init__(self,
+                 method: str = "zlib",
+                 level: int = 6,
+                 collections: Tuple[str, ...] = (),
+                 min_bytes: int = 256,
+                 blob_min_bytes: int = 4096,
+                 dictionary_bytes: int = 16384,
+                 dictionary_loader: Optional[Callable[[str], Optional[bytes]]] = None):
+        """
+        Args:
+            method: "zlib", "lzma" or "none" (values are stored as before)
+            level: Compression level (lzma preset), 0-9
+            collections: Collections whose values are compressed
+            min_bytes: Pickled values smaller than this are not compressed
+            blob_min_bytes: bytes values at least this large are kept uncompressed
+            dictionary_bytes: Size of dictionaries built by train()
+            dictionary_loader: Looks up a dictionary by ID when unpacking a
+                value packed with one this codec does not hold
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method: {method}")
+
+        self.method = method
+        self.level = level
+        self.collections = set(collections) if method != "none" else set()
+        self.min_bytes = min_bytes
+        self.blob_min_bytes = blob_min_bytes
+        self.dictionary_bytes = dictionary_bytes
+        self.dictionary_loader = dictionary_loader
+        self._dictionaries = {}  # ID -> dictionary
+        self._current = {}  # collection -> ID of the dictionary new values are packed with
+        self._lock = threading.Lock()
+
+    def handles(self, collection: str) -> bool:
+        """Whether values of a collection are stored compressed"""
+        return collection in self.collections
+
+    def pickled(self, value: Any) -> Tuple[bytes, Tuple[bytes, ...]]:
+        """Pickle a value, taking out its large bytes objects"""
+        buffer = io.BytesIO()
+        pickler = _BlobPickler(buffer, self.blob_min_bytes)
+        pickler.dump(value)
+        return buffer.getvalue(), tuple(pickler.blobs)
+
+    def pack(self, collection: str, value: Any) -> Packed:
+        """Compress a value for storage"""
+        data, blobs = self.pickled(value)
+        if self.method == "none" or len(data) < self.min_bytes:
+            return Packed(METHODS["none"], "", data, blobs)
+
+        if self.method == "lzma":
+            return self._smaller(Packed(METHODS["lzma"], "", lzma.compress(data, preset=self.level), blobs), data)
+
+        with self._lock:
+            dictionary_id = self._current.get(collection, "")
+            dictionary = self._dictionaries.get(dictionary_id)
+        compressor = zlib.compressobj(self.level, zdict=dictionary) if dictionary else zlib.compressobj(self.level)
+        return self._smaller(
+            Packed(METHODS["zlib"], dictionary_id, compressor.compress(data) + compressor.flush(), blobs),
+            data
+        )
+
+    def unpack(self, packed: Packed) -> Any:
+        """
+        Decompress a stored value (a fresh copy on every call)
+
+        Raises:
+            ValueError: If the value was packed with a dictionary that cannot be found
+        """
+        if packed.method == METHODS["zlib"]:
+            if packed.dictionary_id:
+                decompressor = zlib.decompressobj(zdict=self._dictionary(packed.dictionary_id))
+                data = decompressor.decompress(packed.data) + decompressor.flush()
+            else:
+                data = zlib.decompress(packed.data)
+        elif packed.method == METHODS["lzma"]:
+            data = lzma.decompress(packed.data)
+        else:
+            data = packed.data
+        return _BlobUnpickler(io.BytesIO(data), packed.blobs).load()
+
+    def train(self, collection: str, values: List[Any]) -> Tuple[str, bytes]:
+        """
+        Train a dictionary on stored values of a collection and pack its new
+        values with it (zlib only)
+
+        Returns:
+            The dictionary's ID and contents ("" and b"" when none was trained)
+        """
+        if self.method != "zlib" or not values:
+            return "", b""
+        dictionary = train_dictionary([self.pickled(value)[0] for value in values], self.dictionary_bytes)
+        return self.set_dictionary(collection, dictionary), dictionary
+
+    def set_dictionary(self, collection: str, dictionary: bytes) -> str:
+        """
+        Pack new values of a collection with a dictionary (an empty one turns it off)
+
+        Returns:
+            The dictionary's ID, recorded with every value packed with it
+        """
+        dictionary_id = hashlib.sha1(dictionary).hexdigest()[:16] if dictionary else ""
+        with self._lock:
+            if dictionary:
+                self._dictionaries[dictionary_id] = dictionary
+            self._current[collection] = dictionary_id
+        return dictionary_id
+
+    def get_dictionary(self, collection: str) -> Tuple[str, bytes]:
+        """The ID and contents of the dictionary a collection is packed with ("" and b"" when none)"""
+        with self._lock:
+            dictionary_id = self._current.get(collection, "")
+            return dictionary_id, self._dictionaries.get(dictionary_id, b"")
+
+    def export_dictionaries(self) -> Dict[str, bytes]:
+        """All dictionaries held, by ID, so values packed with them can be read elsewhere"""
+        with self._lock:
+            return dict(self._dictionaries)
+
+    def load_dictionaries(self, dictionaries: Dict[str, bytes]):
+        """Hold dictionaries from export_dictionaries() for reading (new values are packed as before)"""
+        with self._lock:
+            for dictionary_id, dictionary in dictionaries.items():
+                self._dictionaries.setdefault(dictionary_id, dictionary)
+
+    def _dictionary(self, dictionary_id: str) -> bytes:
+        with self._lock:
+            dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is None and self.dictionary_loader:
+            dictionary = self.dictionary_loader(dictionary_id)
+            if dictionary is not None:
+                with self._lock:
+                    self._dictionaries[dictionary_id] = dictionary
+        if dictionary is None:
+            raise ValueError(f"Compression dictionary {dictionary_id} not found")
+        return dictionary
+
+    @staticmethod
+    def _smaller(packed: Packed, data: bytes) -> Packed:
+        """Keep the pickle uncompressed when compressing did not make it smaller"""
+        if len(packed.data) < len(data):
+            return packed
+        return Packed(METHODS["none"], "", data, packed.blobs)
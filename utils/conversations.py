@@ -0,0 +1,185 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, Optional
+from utils.file_lock import FileLock, unique_tmp_path
+from config import CONVERSATION_DIR, CONVERSATION_CACHE_SIZE, CONVERSATION_TRANSCRIPT_MAX_MESSAGES
+
+
+def new_conversation() -> Dict[str, Any]:
+    """
+    Empty tutoring conversation record
+
+    "history" holds the dialogue turns sent to the model (trimmed to the
+    token budget by LearnerAgent), "summary" the running summary of older
+    turns, and "transcript" the messages shown to the student.
+    """
+    return {"history": [], "summary": "", "transcript": []}
+
+
+class ConversationStore:
+    """
+    Tutoring conversations keyed by student, course and slide, kept outside
+    the agents and the Streamlit session. Records are written as compact JSON
+    under directory (one file per conversation), so sessions survive
+    reconnects and server restarts; the most recently used ones stay in memory.
+    Cached conversations are checked against their file on load, so server
+    processes sharing the directory see each other's turns, and update() runs
+    a turn under a lock on the conversation so concurrent turns do not
+    overwrite each other.
+    """
+
+    def __init__(self, directory: Optional[str] = None, cache_size: int = 256, transcript_max_messages: int = 200):
+        """
+        Args:
+            directory: Directory for conversation files (memory only when None)
+            cache_size: Conversations kept in memory
+            transcript_max_messages: Displayed messages kept per conversation
+        """
+        self.directory = directory
+        self.cache_size = cache_size
+        self.transcript_max_messages = transcript_max_messages
+        self._cache = OrderedDict()  # key -> (file signature, conversation)
+        self._lock = threading.Lock()
+        self._turn_locks = {}  # key -> lock for a turn (memory-only mode)
+
+    def load(self, student_name: str, course_name: str, slide_id: str) -> Dict[str, Any]:
+        """
+        Get a conversation, starting a new one if none is stored
+
+        Returns:
+            A copy of the conversation record; changes to it are stored by
+            update() or save()
+        """
+        return copy.deepcopy(self._load(self._key(student_name, course_name, slide_id)))
+
+    def update(self, student_name: str, course_name: str, slide_id: str,
+               apply: Callable[[Dict[str, Any]], Any]) -> Dict[str, Any]:
+        """
+        Run a turn on a conversation and store the result, holding the
+        conversation's lock from the read to the write
+
+        Args:
+            student_name: Student the conversation belongs to
+            course_name: Course of the slide
+            slide_id: Slide discussed
+            apply: Called with the current conversation, changes it in place
+
+        Returns:
+            A copy of the stored conversation
+        """
+        key = self._key(student_name, course_name, slide_id)
+        with self._turn_lock(key):
+            conversation = copy.deepcopy(self._load(key))
+            apply(conversation)
+            self._store(key, conversation)
+        return copy.deepcopy(conversation)
+
+    def save(self, student_name: str, course_name: str, slide_id: str, conversation: Dict[str, Any]):
+        """Store a conversation, replacing the stored one"""
+        key = self._key(student_name, course_name, slide_id)
+        with self._turn_lock(key):
+            self._store(key, copy.deepcopy(conversation))
+
+    def reset(self, student_name: str, course_name: str, slide_id: str):
+        """Start the conversation over"""
+        self.save(student_name, course_name, slide_id, new_conversation())
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get the number of conversations held in memory"""
+        with self._lock:
+            return {"cached": len(self._cache)}
+
+    @staticmethod
+    def _key(student_name: str, course_name: str, slide_id: str) -> str:
+        return hashlib.sha1(f"{course_name}\x00{student_name}\x00{slide_id}".encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _turn_lock(self, key: str):
+        """Lock held for a turn: on the conversation file, so it covers other processes too"""
+        if self.directory:
+            return FileLock(f"{self._path(key)}.lock")
+        with self._lock:
+            return self._turn_locks.setdefault(key, threading.Lock())
+
+    def _load(self, key: str) -> Dict[str, Any]:
+        """The conversation as cached (callers must not change it)"""
+        signature = self._signature(key)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        conversation = self._read(key) or new_conversation()
+        self._remember(key, signature, conversation)
+        return conversation
+
+    def _store(self, key: str, conversation: Dict[str, Any]):
+        """Write a conversation the caller no longer holds (under the turn lock)"""
+        conversation["transcript"] = conversation.get("transcript", [])[-self.transcript_max_messages:]
+        self._remember(key, self._write(key, conversation), conversation)
+
+    def _signature(self, key: str):
+        """Identity of the conversation file's current contents (None in memory-only mode or when missing)"""
+        if not self.directory:
+            return None
+        try:
+            st = os.stat(self._path(key))
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _remember(self, key: str, signature, conversation: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = (signature, conversation)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.directory or not os.path.exists(self._path(key)):
+            return None
+
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading conversation: {str(e)}")
+            return None
+
+    def _write(self, key: str, conversation: Dict[str, Any]):
+        """Write a conversation file, returning its new signature"""
+        if not self.directory:
+            return None
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = unique_tmp_path(self._path(key))
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(conversation, f, ensure_ascii=False, separators=(",", ":"))
+                f.flush()
+                st = os.fstat(f.fileno())
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing conversation: {str(e)}")
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+_conversation_store = ConversationStore(
+    directory=CONVERSATION_DIR,
+    cache_size=CONVERSATION_CACHE_SIZE,
+    transcript_max_messages=CONVERSATION_TRANSCRIPT_MAX_MESSAGES
+)
+
+
+def get_conversation_store() -> ConversationStore:
+    """Get the process-wide conversation store"""
+    return _conversation_store
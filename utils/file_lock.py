@@ -0,0 +1,76 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows: locks only apply within the process
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock shared by all processes on the host, held on a lock file
+    next to the data it protects. Released automatically if the holding
+    process dies, so a crashed replica never leaves data locked.
+
+    Usable as a context manager (blocking) or through acquire()/release().
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Lock file to create (its directory must be writable)
+        """
+        self.path = path
+        self._file = None
+        self._thread_lock = threading.Lock()
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Take the lock
+
+        Args:
+            blocking: Wait for the lock; when False, return at once if it is held
+
+        Returns:
+            Whether the lock was taken
+        """
+        if not self._thread_lock.acquire(blocking):
+            return False
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a+b")
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            return True
+        except (BlockingIOError, PermissionError):
+            self._close()
+            self._thread_lock.release()
+            return False
+        except BaseException:
+            self._close()
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        """Release the lock"""
+        self._close()
+        self._thread_lock.release()
+
+    def _close(self):
+        file, self._file = self._file, None
+        if file is not None:
+            file.close()  # Closing the descriptor drops the flock
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def unique_tmp_path(path: str) -> str:
+    """Temporary file name for an atomic replace of path, unique per process and thread"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional
+from agents.reviewer_agent import ReviewerAgent
+from agents.grade_cache import answer_key_version
+from utils.storage import get_quiz_attempts, update_quiz_attempt
+from utils.file_lock import FileLock, unique_tmp_path
+from config import REGRADE_CONCURRENCY, REGRADE_CHECKPOINT_DIR
+
+
+class RegradeJob:
+    """
+    Re-scores the stored attempts of a quiz through ReviewerAgent in the
+    background, with bounded concurrency. Attempts already graded against the
+    current answer key are skipped. Completed results are checkpointed to disk
+    as they arrive, so a cancelled or failed job resumes without regrading
+    attempts that are already done. With a checkpoint directory shared by
+    several server processes, only one of them runs a given job at a time
+    (the others report status "busy").
+    """
+
+    def __init__(self,
+                 course_name: str,
+                 quiz: Dict[str, Any],
+                 concurrency: int = 8,
+                 checkpoint_dir: Optional[str] = None):
+        """
+        Args:
+            course_name: Course the quiz belongs to
+            quiz: Quiz with its current questions and answer key; its stored
+                attempts are regraded and updated in storage
+            concurrency: Maximum grading calls in flight
+            checkpoint_dir: Directory for progress checkpoints (disabled when None)
+        """
+        self.course_name = course_name
+        self.quiz = quiz
+        self.attempts = {}
+        self.concurrency = concurrency
+        self.key_version = answer_key_version(quiz)
+        self.job_id = f"{course_name}_{quiz['id']}_{self.key_version}"
+        self.checkpoint_path = (
+            os.path.join(checkpoint_dir, f"{hashlib.sha1(self.job_id.encode('utf-8')).hexdigest()}.json")
+            if checkpoint_dir else None
+        )
+
+        self.status = "pending"
+        self.total = 0
+        self.done = 0
+        self.resumed = 0
+        self.up_to_date = 0
+        self.failed = []
+        self.started_at = None
+        self.finished_at = None
+        self._completed = {}
+        self._last_checkpoint = 0.0
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()  # Counters and results only; held briefly
+        self._checkpoint_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Run the job in a background thread"""
+        self._thread = threading.Thread(target=self._run, name=f"regrade-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stop after the grading calls already in flight; progress stays checkpointed"""
+        self._cancel.set()
+
+    @property
+    def running(self) -> bool:
+        return self.status in ("pending", "running")
+
+    def get_progress(self) -> Dict[str, Any]:
+        """Get counts, status and an ETA for the progress view"""
+        with self._lock:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at if self.started_at else 0.0
+            graded_now = self.done - self.resumed
+            remaining = self.total - self.done - len(self.failed)
+            eta = elapsed / graded_now * remaining if graded_now and self.running else None
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "total": self.total,
+                "done": self.done,
+                "resumed": self.resumed,
+                "up_to_date": self.up_to_date,
+                "failed": len(self.failed),
+                "elapsed_seconds": elapsed,
+                "eta_seconds": eta
+            }
+
+    def _run(self):
+        self.started_at = time.monotonic()
+
+        claim = FileLock(f"{self.checkpoint_path}.lock") if self.checkpoint_path else None
+        if claim is not None and not claim.acquire(blocking=False):
+            self.finished_at = time.monotonic()
+            self.status = "busy"  # Another process is running this job
+            return
+
+        try:
+            self._regrade()
+        finally:
+            if claim is not None:
+                claim.release()
+
+    def _regrade(self):
+        self.status = "running"
+
+        self.attempts = get_quiz_attempts(self.course_name, self.quiz["id"])
+
+        items = []
+        for student_name, student_attempts in list(self.attempts.items()):
+            for index, attempt in enumerate(student_attempts):
+                if not attempt.get("answers") or attempt.get("status") in ("queued", "grading"):
+                    continue  # Still with the submission grading queue
+                if attempt.get("key_version") == self.key_version:
+                    self.up_to_date += 1
+                else:
+                    items.append((student_name, index))
+        self.total = len(items)
+        self._completed = self._load_checkpoint()
+
+        pending = []
+        for item in items:
+            result = self._completed.get(self._item_key(item))
+            if result is not None:
+                self._apply(item, result)
+                self.done += 1
+                self.resumed += 1
+            else:
+                pending.append(item)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = [(item, pool.submit(self._grade, item)) for item in pending]
+
+        for (student_name, index), future in futures:
+            error = future.exception()
+            if error is not None:
+                with self._lock:
+                    self.failed.append({"student": student_name, "attempt": index, "error": str(error)})
+
+        self._save_checkpoint(force=True)
+        with self._lock:
+            self.finished_at = time.monotonic()
+            if self._cancel.is_set():
+                self.status = "cancelled"
+            elif self.failed:
+                self.status = "failed"
+            else:
+                self.status = "completed"
+
+    def _grade(self, item):
+        """Grade one attempt and record the result (runs on a pool thread)"""
+        if self._cancel.is_set():
+            return
+
+        student_name, index = item
+        attempt = self.attempts[student_name][index]
+
+        reviewer = ReviewerAgent(user_id=f"regrade:{self.job_id}", priority="background")
+        analysis = reviewer.grade_submission(self.quiz, attempt["answers"])
+
+        if "error" in analysis:
+            with self._lock:
+                self.failed.append({"student": student_name, "attempt": index, "error": analysis["error"]})
+            return
+
+        self._apply(item, analysis)
+        with self._lock:
+            self._completed[self._item_key(item)] = analysis
+            self.done += 1
+        self._save_checkpoint()
+
+    def _apply(self, item, analysis: Dict[str, Any]):
+        """
+        Write a regraded analysis back to its stored attempt, keeping only
+        the analysis it replaces (so repeated regrades do not grow the attempt)
+        """
+        student_name, index = item
+
+        def apply(attempt: Dict[str, Any]):
+            attempt.pop("previous_analyses", None)  # Unbounded history kept by earlier versions
+            if "analysis" in attempt:
+                attempt["previous_analysis"] = attempt["analysis"]
+            attempt["analysis"] = analysis
+            attempt["key_version"] = self.key_version
+            attempt["regraded_at"] = datetime.now().isoformat()
+
+        update_quiz_attempt(self.course_name, self.quiz["id"], student_name, index, apply)
+
+    @staticmethod
+    def _item_key(item) -> str:
+        student_name, index = item
+        return f"{student_name}/{index}"
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return {}
+
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("completed", {})
+        except (OSError, ValueError) as e:
+            print(f"Error reading regrade checkpoint: {str(e)}")
+            return {}
+
+    def _save_checkpoint(self, force: bool = False):
+        """
+        Persist completed results, at most every couple of seconds unless
+        forced. Written outside the job lock, one writer at a time; a due
+        checkpoint is skipped while another is being written.
+        """
+        if not self.checkpoint_path:
+            return
+        if not self._checkpoint_lock.acquire(blocking=force):
+            return
+
+        try:
+            with self._lock:
+                if not self._completed:
+                    return
+                if not force and time.monotonic() - self._last_checkpoint < 2.0:
+                    return
+                self._last_checkpoint = time.monotonic()
+                completed = dict(self._completed)
+
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+            tmp_path = unique_tmp_path(self.checkpoint_path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"job_id": self.job_id, "completed": completed}, f)
+            os.replace(tmp_path, self.checkpoint_path)
+        except OSError as e:
+            print(f"Error writing regrade checkpoint: {str(e)}")
+        finally:
+            self._checkpoint_lock.release()
+
+
+class RegradeManager:
+    """Keeps the latest regrade job per quiz so progress survives page reruns"""
+
+    def __init__(self, concurrency: int = 8, checkpoint_dir: Optional[str] = None):
+        self.concurrency = concurrency
+        self.checkpoint_dir = checkpoint_dir
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, course_name: str, quiz: Dict[str, Any]) -> RegradeJob:
+        """
+        Start regrading all attempts of a quiz, unless a job for it is already running
+
+        Returns:
+            The running job for the quiz
+        """
+        with self._lock:
+            job = self._jobs.get((course_name, quiz["id"]))
+            if job is not None and job.running:
+                return job
+
+            job = RegradeJob(course_name, quiz, self.concurrency, self.checkpoint_dir)
+            self._jobs[(course_name, quiz["id"])] = job
+            job.start()
+            return job
+
+    def get_job(self, course_name: str, quiz_id: str) -> Optional[RegradeJob]:
+        """Get the latest regrade job for a quiz, if any"""
+        with self._lock:
+            return self._jobs.get((course_name, quiz_id))
+
+
+_regrade_manager = RegradeManager(concurrency=REGRADE_CONCURRENCY, checkpoint_dir=REGRADE_CHECKPOINT_DIR)
+
+
+def get_regrade_manager() -> RegradeManager:
+    """Get the process-wide regrade job manager"""
+    return _regrade_manager
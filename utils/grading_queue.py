@@ -0,0 +1,445 @@
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from agents.reviewer_agent import ReviewerAgent
+from agents.grade_cache import answer_key_version
+from utils.storage import update_quiz_attempt, get_student_attempts
+from utils.weak_areas import apply_quiz_result
+from utils.file_lock import FileLock, unique_tmp_path
+from config import GRADING_WORKERS, GRADING_SPOOL_DIR, GRADING_SPOOL_RETENTION_SECONDS
+
+FINISHED = ("graded", "failed")
+PRUNE_INTERVAL_SECONDS = 600
+
+
+class GradingQueue:
+    """
+    Accepts quiz submissions immediately and grades them on a background
+    worker pool. Each submission is spooled to disk before it is
+    acknowledged, so it survives page refreshes and process restarts; on
+    start-up, submissions that were still queued are graded again.
+
+    Results are written into the submission record, which the results page
+    polls, and into the stored quiz attempt; graded results also update the
+    student's weak areas.
+
+    Server processes can share the spool directory: a submission is graded
+    by whichever process claims its lock file first, and submissions
+    accepted by another process are read from the spool when polled.
+
+    Finished submissions are kept for retention_seconds, then dropped from
+    memory and the spool (the result stays in the stored attempt).
+    """
+
+    def __init__(self,
+                 workers: int = 8,
+                 spool_dir: Optional[str] = None,
+                 retention_seconds: float = 7 * 86400):
+        """
+        Args:
+            workers: Submissions graded concurrently
+            spool_dir: Directory for durable submission records (disabled when None)
+            retention_seconds: How long finished submissions are kept
+        """
+        self.workers = workers
+        self.spool_dir = spool_dir
+        self.retention_seconds = retention_seconds
+        self._records = {}
+        self._statuses = {}  # submission ID -> status counted in _counts
+        self._counts = Counter()
+        self._waiting = OrderedDict()  # IDs of queued submissions, in queue order
+        self._latest = {}  # (course, quiz ID, student) -> ID of the latest submission
+        self._waits = deque(maxlen=500)  # Seconds to result of recent submissions
+        self._last_prune = time.time()
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._recover()
+
+    def submit(self,
+               course_name: str,
+               quiz: Dict[str, Any],
+               student_name: str,
+               student_answers: List[Dict[str, Any]],
+               attempt_index: Optional[int] = None) -> str:
+        """
+        Persist a submission and queue it for grading
+
+        Args:
+            course_name: Course the quiz belongs to
+            quiz: Quiz being answered (a snapshot is stored with the submission)
+            student_name: Student submitting
+            student_answers: Student's answers to the questions
+            attempt_index: Index of the stored attempt (from save_quiz_attempt)
+                to fill in once graded
+
+        Returns:
+            Submission ID to poll with get()
+        """
+        record = {
+            "id": uuid.uuid4().hex,
+            "course": course_name,
+            "quiz": {"id": quiz["id"], "type": quiz.get("type", ""), "questions": quiz.get("questions", [])},
+            "student": student_name,
+            "answers": student_answers,
+            "attempt_index": attempt_index,
+            "status": "queued",
+            "submitted_at": datetime.now().isoformat(),
+            "enqueued": time.monotonic()
+        }
+
+        with self._lock:
+            self._records[record["id"]] = record
+            self._track(record)
+            self._spool(record)
+
+        self._prune()
+        if attempt_index is not None:
+            # Lets any process find the submission from the stored attempt
+            self._update_attempt_fields(record, {"submission_id": record["id"]})
+
+        self._enqueue(record["id"])
+        return record["id"]
+
+    def retry(self, submission_id: str):
+        """Queue a failed submission for grading again"""
+        spooled = self._read_spool(submission_id)
+
+        with self._lock:
+            record = self._merge(spooled) if spooled is not None else self._records.get(submission_id)
+            if record is None or record["status"] != "failed":
+                return
+            record["status"] = "queued"
+            record.pop("error", None)
+            record.pop("finished_at", None)
+            record["enqueued"] = time.monotonic()
+            self._waiting.pop(submission_id, None)  # Back of the queue
+            self._track(record)
+            self._spool(record)
+
+        self._enqueue(submission_id)
+
+    def get(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        """Get a submission record (status, and analysis once graded)"""
+        # The spool is shared, so it also has submissions accepted, graded or
+        # retried by other processes
+        spooled = self._read_spool(submission_id)
+
+        with self._lock:
+            record = self._merge(spooled) if spooled is not None else self._records.get(submission_id)
+            return dict(record) if record else None
+
+    def latest_for(self, course_name: str, quiz_id: str, student_name: str) -> Optional[Dict[str, Any]]:
+        """Get a student's most recent submission for a quiz (e.g. after a refresh)"""
+        with self._lock:
+            latest = self._records.get(self._latest.get((course_name, quiz_id, student_name)))
+
+        # The stored attempts also cover submissions made through other processes
+        attempts = get_student_attempts(course_name, quiz_id, student_name)
+        submission_id = next((a["submission_id"] for a in reversed(attempts) if a.get("submission_id")), None)
+        if submission_id and (latest is None or latest["id"] != submission_id):
+            stored = self.get(submission_id)
+            if stored is not None and (latest is None or stored["submitted_at"] > latest["submitted_at"]):
+                return stored
+
+        return self.get(latest["id"]) if latest else None
+
+    def position(self, submission_id: str) -> int:
+        """Number of queued submissions ahead of this one"""
+        with self._lock:
+            if submission_id not in self._waiting:
+                return 0
+            for ahead, waiting_id in enumerate(self._waiting):
+                if waiting_id == submission_id:
+                    return ahead
+        return 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get counts by status of the submissions kept (see retention_seconds)
+        and the average wait before grading finished for recent ones
+        """
+        with self._lock:
+            stats = {"queued": 0, "grading": 0, "graded": 0, "failed": 0}
+            stats.update(self._counts)
+            waits = list(self._waits)
+        stats["avg_seconds_to_result"] = sum(waits) / len(waits) if waits else 0.0
+        return stats
+
+    def _enqueue(self, submission_id: str):
+        self._queue.put(submission_id)
+
+        with self._lock:
+            self._threads = [t for t in self._threads if t.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name="grading-worker", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            submission_id = self._queue.get()
+
+            claim = FileLock(os.path.join(self.spool_dir, f"{submission_id}.lock")) if self.spool_dir else None
+            if claim is not None and not claim.acquire(blocking=False):
+                continue  # Being graded by another process
+
+            try:
+                if self._start_grading(submission_id):
+                    self._grade(submission_id)
+            finally:
+                if claim is not None:
+                    claim.release()
+
+    def _start_grading(self, submission_id: str) -> bool:
+        """Mark a queued submission as grading, unless another process already graded it"""
+        spooled = self._read_spool(submission_id)
+
+        with self._lock:
+            if spooled is not None:
+                self._merge(spooled)
+            record = self._records.get(submission_id)
+            if record is None or record["status"] != "queued":
+                return False
+            record["status"] = "grading"
+            self._track(record)
+            return True
+
+    def _grade(self, submission_id: str):
+        with self._lock:
+            record = self._records[submission_id]
+
+        try:
+            reviewer = ReviewerAgent(user_id=record["student"], priority="grading")
+            analysis = reviewer.grade_submission(record["quiz"], record["answers"])
+        except Exception as e:
+            analysis = {"error": f"Failed to analyze performance: {str(e)}"}
+
+        with self._lock:
+            record["grading_seconds"] = time.monotonic() - record["enqueued"]
+            record["finished_at"] = time.time()
+            if "error" in analysis:
+                record["status"] = "failed"
+                record["error"] = analysis["error"]
+            else:
+                record["status"] = "graded"
+                record["analysis"] = analysis
+                record["graded_at"] = datetime.now().isoformat()
+
+            self._waits.append(record["grading_seconds"])
+            self._track(record)
+            self._spool(record)
+
+        if record.get("attempt_index") is not None:
+            self._update_attempt(record, analysis)
+        if record["status"] == "graded":
+            try:
+                apply_quiz_result(record["course"], record["student"], analysis)
+            except Exception as e:
+                print(f"Error updating student progress: {str(e)}")
+
+    def _update_attempt(self, record: Dict[str, Any], analysis: Dict[str, Any]):
+        """Write the grading result into the stored attempt"""
+        fields = {"status": record["status"], "analysis": analysis}
+        if record["status"] == "graded":
+            fields["key_version"] = answer_key_version(record["quiz"])
+        self._update_attempt_fields(record, fields)
+
+    def _update_attempt_fields(self, record: Dict[str, Any], fields: Dict[str, Any]):
+        """Set fields on the stored attempt of a submission"""
+        try:
+            update_quiz_attempt(
+                record["course"],
+                record["quiz"]["id"],
+                record["student"],
+                record["attempt_index"],
+                lambda attempt: attempt.update(fields)
+            )
+        except Exception as e:
+            print(f"Error updating stored attempt: {str(e)}")
+
+    def _merge(self, spooled: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Bring the in-memory record up to date with its spool file (caller holds the lock)
+
+        Returns:
+            The in-memory record
+        """
+        record = self._records.get(spooled["id"])
+        if record is None:
+            spooled["enqueued"] = time.monotonic()
+            self._records[spooled["id"]] = spooled
+            self._track(spooled)
+            return spooled
+
+        if record["status"] == "grading" and spooled["status"] == "queued":
+            return record  # Being graded here; the spool catches up when it finishes
+
+        for name in [name for name in record if name not in spooled and name != "enqueued"]:
+            del record[name]
+        record.update(spooled)
+        self._track(record)
+        return record
+
+    def _track(self, record: Dict[str, Any]):
+        """Bring the status counts, queue order and latest-submission index up to date with a record (caller holds the lock)"""
+        submission_id = record["id"]
+        previous = self._statuses.get(submission_id)
+        if previous != record["status"]:
+            if previous is not None:
+                self._counts[previous] -= 1
+            self._counts[record["status"]] += 1
+            self._statuses[submission_id] = record["status"]
+
+        if record["status"] == "queued":
+            self._waiting.setdefault(submission_id)
+        else:
+            self._waiting.pop(submission_id, None)
+
+        key = (record["course"], record["quiz"]["id"], record["student"])
+        latest = self._records.get(self._latest.get(key))
+        if latest is None or latest["submitted_at"] <= record["submitted_at"]:
+            self._latest[key] = submission_id
+
+    def _forget(self, submission_id: str):
+        """Drop a record and its index entries (caller holds the lock)"""
+        record = self._records.pop(submission_id)
+        self._counts[self._statuses.pop(submission_id)] -= 1
+        self._waiting.pop(submission_id, None)
+        key = (record["course"], record["quiz"]["id"], record["student"])
+        if self._latest.get(key) == submission_id:
+            del self._latest[key]
+
+    def _expired(self, record: Dict[str, Any], now: float) -> bool:
+        return record["status"] in FINISHED and now - record.get("finished_at", now) > self.retention_seconds
+
+    def _prune(self, force: bool = False):
+        """Forget finished submissions past the retention period and delete their spool files"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+                return
+            self._last_prune = now
+            expired = [submission_id for submission_id, record in self._records.items() if self._expired(record, now)]
+            for submission_id in expired:
+                self._forget(submission_id)
+
+        for submission_id in expired:
+            self._delete_spool(submission_id)
+
+    def _delete_spool(self, submission_id: str):
+        if not self.spool_dir:
+            return
+        for suffix in (".json", ".lock"):
+            try:
+                os.remove(os.path.join(self.spool_dir, f"{submission_id}{suffix}"))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Error removing spooled submission {submission_id}: {str(e)}")
+
+    def _read_spool(self, submission_id: str) -> Optional[Dict[str, Any]]:
+        """Read a submission record from the spool directory, if present"""
+        if not self.spool_dir:
+            return None
+
+        try:
+            with open(os.path.join(self.spool_dir, f"{submission_id}.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading spooled submission {submission_id}: {str(e)}")
+            return None
+
+    def _spool(self, record: Dict[str, Any]):
+        """Write a submission record to the spool directory (caller holds the lock)"""
+        if not self.spool_dir:
+            return
+
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = os.path.join(self.spool_dir, f"{record['id']}.json")
+            tmp_path = unique_tmp_path(path)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({k: v for k, v in record.items() if k != "enqueued"}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error spooling submission: {str(e)}")
+
+    def _recover(self):
+        """
+        Reload spooled submissions still within the retention period, delete
+        expired ones, and requeue the ones that were not graded, oldest first
+        """
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return
+
+        now = time.time()
+        pending = []
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    record = json.load(f)
+                if record["status"] in FINISHED:
+                    record.setdefault("finished_at", os.path.getmtime(path))  # Spooled before it was recorded
+            except (OSError, ValueError) as e:
+                print(f"Error reading spooled submission {name}: {str(e)}")
+                continue
+
+            if self._expired(record, now):
+                self._delete_spool(record["id"])
+                continue
+
+            record["enqueued"] = time.monotonic()
+            if record["status"] in ("queued", "grading"):
+                if record["status"] == "grading":
+                    claim = FileLock(os.path.join(self.spool_dir, f"{record['id']}.lock"))
+                    if claim.acquire(blocking=False):
+                        # Interrupted mid-grade: spool it as queued again, or reading the
+                        # spool back would mark it as being graded and no worker would take it
+                        record["status"] = "queued"
+                        self._spool(record)
+                        claim.release()
+                    else:
+                        record["status"] = "queued"  # Still being graded by another process
+                pending.append(record)
+            else:
+                self._records[record["id"]] = record
+                self._track(record)
+
+        for record in sorted(pending, key=lambda r: r["submitted_at"]):
+            self._records[record["id"]] = record
+            self._track(record)
+            self._enqueue(record["id"])
+
+
+_grading_queue = None
+_grading_queue_lock = threading.Lock()
+
+
+def get_grading_queue() -> GradingQueue:
+    """
+    Get the process-wide grading queue
+
+    Created on first use, so processes that never grade (e.g. the CLI) do
+    not pick up spooled submissions.
+    """
+    global _grading_queue
+    with _grading_queue_lock:
+        if _grading_queue is None:
+            _grading_queue = GradingQueue(
+                workers=GRADING_WORKERS,
+                spool_dir=GRADING_SPOOL_DIR,
+                retention_seconds=GRADING_SPOOL_RETENTION_SECONDS
+            )
+        return _grading_queue
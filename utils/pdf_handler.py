@@ -104,6 +104,32 @@ def extract_text_from_pdf(pdf_bytes: bytes) -> str:
 
     return text
 
+def extract_page_texts_from_pdf(pdf_bytes: bytes) -> List[str]:
+    """
+    Extract text content from each page of a PDF
+
+    Args:
+        pdf_bytes: PDF file content as bytes
+
+    Returns:
+        List of page texts (one per page)
+    """
+    page_texts = []
+
+    try:
+        pdf_document = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+        for page_num in range(pdf_document.page_count):
+            page_texts.append(pdf_document[page_num].get_text())
+
+        pdf_document.close()
+
+    except Exception as e:
+        print(f"Error extracting text from PDF: {str(e)}")
+        return []
+
+    return page_texts
+
 def is_pdf(file_bytes: bytes) -> bool:
     """
     Check if bytes represent a PDF file
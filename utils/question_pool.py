@@ -0,0 +1,239 @@
+import hashlib
+import queue
+import re
+import threading
+import time
+from typing import List, Dict, Any, Callable, Optional
+from agents.tester_agent import get_tester_agent
+from config import (
+    DIFFICULTY_LEVELS,
+    PRACTICE_POOL_LOW_WATER,
+    PRACTICE_POOL_TARGET,
+    PRACTICE_POOL_BATCH
+)
+
+def content_key(slide_content: str) -> str:
+    """Stable key for a slide's content (identical decks share a pool bucket)"""
+    return hashlib.sha1(slide_content.encode("utf-8")).hexdigest()
+
+class QuestionPool:
+    """
+    Bank of pre-generated practice questions, bucketed by slide content and
+    difficulty. A background worker refills buckets that fall below the
+    low-water mark so most practice quizzes are served without a model call.
+    """
+
+    def __init__(self,
+                 generate: Callable[[str, str, int], List[Dict[str, Any]]],
+                 low_water: int = 5,
+                 target: int = 15,
+                 batch_size: int = 5):
+        """
+        Args:
+            generate: Function (slide_content, difficulty, num_questions) -> questions
+            low_water: Refill a bucket when it holds fewer questions than this
+            target: Number of questions a refill aims for
+            batch_size: Questions requested per generation call
+        """
+        self.generate = generate
+        self.low_water = low_water
+        self.target = target
+        self.batch_size = batch_size
+        self._buckets = {}      # (content key, difficulty) -> [question, ...]
+        self._contents = {}     # content key -> slide content, for refills
+        self._pending = set()   # bucket keys queued for refill
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stats = {"hits": 0, "misses": 0, "generated": 0, "refill_errors": 0}
+
+    def register_slide(self, slide_content: str, difficulties: List[str] = None):
+        """
+        Schedule background generation for a newly uploaded slide
+
+        Args:
+            slide_content: Slide text as sent to the tester agent
+            difficulties: Difficulty levels to fill (defaults to all)
+        """
+        key = content_key(slide_content)
+
+        with self._lock:
+            self._contents[key] = slide_content
+
+        for difficulty in difficulties or DIFFICULTY_LEVELS:
+            self._schedule_refill((key, difficulty))
+
+    def discard_slide(self, slide_content: str):
+        """Drop all pooled questions for a removed slide"""
+        key = content_key(slide_content)
+
+        with self._lock:
+            self._contents.pop(key, None)
+            for bucket_key in [k for k in self._buckets if k[0] == key]:
+                del self._buckets[bucket_key]
+
+    def take(self,
+             slide_content: str,
+             difficulty: str,
+             num_questions: int,
+             focus_areas: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Serve practice questions from the pool
+
+        Args:
+            slide_content: Slide text as sent to the tester agent
+            difficulty: Easy, Medium, or Hard
+            num_questions: Number of questions wanted
+            focus_areas: Topics to prefer when choosing questions
+
+        Returns:
+            Exactly num_questions questions, or an empty list on a pool miss
+        """
+        key = content_key(slide_content)
+        bucket_key = (key, difficulty)
+
+        with self._lock:
+            self._contents.setdefault(key, slide_content)
+            bucket = self._buckets.get(bucket_key, [])
+
+            if len(bucket) < num_questions:
+                self._stats["misses"] += 1
+                selected = []
+            else:
+                order = sorted(
+                    range(len(bucket)),
+                    key=lambda i: -self._focus_score(bucket[i], focus_areas)
+                )
+                chosen = set(order[:num_questions])
+                selected = [bucket[i] for i in order[:num_questions]]
+                self._buckets[bucket_key] = [q for i, q in enumerate(bucket) if i not in chosen]
+                self._stats["hits"] += 1
+
+        self._schedule_refill(bucket_key)
+        return selected
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and pool size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buckets"] = len(self._buckets)
+            stats["questions"] = sum(len(b) for b in self._buckets.values())
+            stats["pending_refills"] = len(self._pending)
+        return stats
+
+    def export_state(self) -> Dict[str, Any]:
+        """Pooled questions and the slide content they were generated from (for snapshots)"""
+        with self._lock:
+            return {
+                "contents": dict(self._contents),
+                "buckets": [[key, difficulty, list(bucket)] for (key, difficulty), bucket in self._buckets.items()]
+            }
+
+    def load_state(self, state: Dict[str, Any]) -> int:
+        """
+        Restore pooled questions from export_state(), topping up buckets that
+        are still below target in the background
+
+        Returns:
+            Number of questions restored
+        """
+        restored = 0
+        with self._lock:
+            for key, slide_content in state.get("contents", {}).items():
+                self._contents.setdefault(key, slide_content)
+            for key, difficulty, questions in state.get("buckets", []):
+                bucket = self._buckets.setdefault((key, difficulty), [])
+                if not bucket:
+                    bucket.extend(questions)
+                    restored += len(questions)
+
+        for key, difficulty, _ in state.get("buckets", []):
+            self._schedule_refill((key, difficulty))
+        return restored
+
+    def _schedule_refill(self, bucket_key):
+        """Queue a bucket for refill if it is below the low-water mark"""
+        with self._lock:
+            if bucket_key in self._pending:
+                return
+            if len(self._buckets.get(bucket_key, [])) >= self.low_water:
+                return
+
+            self._pending.add(bucket_key)
+            self._queue.put(bucket_key)
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="question-pool-refill", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        """Refill worker: generates one batch at a time until each bucket reaches its target"""
+        while True:
+            bucket_key = self._queue.get()
+            key, difficulty = bucket_key
+
+            with self._lock:
+                slide_content = self._contents.get(key)
+
+            questions = []
+            if slide_content is not None:
+                try:
+                    questions = self.generate(slide_content, difficulty, self.batch_size)
+                except Exception as e:
+                    print(f"Error refilling practice pool: {str(e)}")
+
+            with self._lock:
+                if slide_content is None or key not in self._contents:
+                    self._pending.discard(bucket_key)
+                    continue
+
+                failed = not questions
+                if failed:
+                    self._stats["refill_errors"] += 1
+                    self._pending.discard(bucket_key)
+                else:
+                    bucket = self._buckets.setdefault(bucket_key, [])
+                    bucket.extend(questions)
+                    self._stats["generated"] += len(questions)
+
+                    if len(bucket) < self.target:
+                        self._queue.put(bucket_key)
+                    else:
+                        self._pending.discard(bucket_key)
+
+            if failed:
+                time.sleep(1)  # Back off before serving the next refill, without holding the lock
+
+    @staticmethod
+    def _focus_score(question: Dict[str, Any], focus_areas: Optional[List[str]]) -> int:
+        """Number of focus-area words that appear in the question's topic or text"""
+        if not focus_areas:
+            return 0
+
+        text = f"{question.get('topic', '')} {question.get('question', '')}".lower()
+        question_words = set(re.findall(r"[a-z0-9]+", text))
+        focus_words = set(re.findall(r"[a-z0-9]+", " ".join(focus_areas).lower()))
+        return len(question_words & focus_words)
+
+
+def _generate_with_tester(slide_content: str, difficulty: str, num_questions: int) -> List[Dict[str, Any]]:
+    """Pool generator backed by TesterAgent"""
+    quiz_data = get_tester_agent().for_user("question-pool", priority="background").generate_practice_quiz(
+        slide_content=slide_content,
+        difficulty_level=difficulty,
+        num_questions=num_questions
+    )
+    return quiz_data.get("questions", [])
+
+
+_question_pool = QuestionPool(
+    _generate_with_tester,
+    low_water=PRACTICE_POOL_LOW_WATER,
+    target=PRACTICE_POOL_TARGET,
+    batch_size=PRACTICE_POOL_BATCH
+)
+
+
+def get_question_pool() -> QuestionPool:
+    """Get the process-wide practice question pool"""
+    return _question_pool
@@ -0,0 +1,170 @@
+import math
+import re
+import threading
+import heapq
+from typing import List, Dict, Any, Optional
+from utils.tokens import chunk_text
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from",
+    "how", "i", "if", "in", "is", "it", "its", "me", "of", "on", "or", "so", "that", "the",
+    "this", "to", "was", "what", "when", "where", "which", "why", "with", "you", "your"
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stopwords"""
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 index over page-level chunks of a course's slides
+
+    Documents are added and removed per slide so the index can be kept up
+    to date incrementally as slides are uploaded or deleted.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, chunk_tokens: int = 400):
+        self.k1 = k1
+        self.b = b
+        self.chunk_tokens = chunk_tokens
+        self._chunks = {}      # chunk_id -> {'slide_id', 'page', 'text', 'length'}
+        self._postings = {}    # term -> {chunk_id: term frequency}
+        self._by_slide = {}    # slide_id -> [chunk_id, ...]
+        self._total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def add_slide(self, slide_id: str, page_texts: List[str]):
+        """
+        Index a slide, replacing any previous version of it
+
+        Args:
+            slide_id: Slide identifier
+            page_texts: Extracted text of each page, in order
+        """
+        self.remove_slide(slide_id)
+
+        with self._lock:
+            chunk_ids = []
+
+            for page_num, page_text in enumerate(page_texts, 1):
+                for text in chunk_text(page_text, self.chunk_tokens):
+                    terms = tokenize(text)
+                    if not terms:
+                        continue
+
+                    chunk_id = self._next_id
+                    self._next_id += 1
+
+                    self._chunks[chunk_id] = {
+                        'slide_id': slide_id,
+                        'page': page_num,
+                        'text': text,
+                        'length': len(terms)
+                    }
+                    self._total_length += len(terms)
+
+                    for term in terms:
+                        postings = self._postings.setdefault(term, {})
+                        postings[chunk_id] = postings.get(chunk_id, 0) + 1
+
+                    chunk_ids.append(chunk_id)
+
+            self._by_slide[slide_id] = chunk_ids
+
+    def remove_slide(self, slide_id: str):
+        """
+        Remove a slide's chunks from the index
+
+        Args:
+            slide_id: Slide identifier
+        """
+        with self._lock:
+            for chunk_id in self._by_slide.pop(slide_id, []):
+                chunk = self._chunks.pop(chunk_id)
+                self._total_length -= chunk['length']
+
+                for term in set(tokenize(chunk['text'])):
+                    postings = self._postings.get(term)
+                    if postings is None:
+                        continue
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def search(self,
+               query: str,
+               top_k: int = 4,
+               slide_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Find the chunks most relevant to a query
+
+        Args:
+            query: Question or topic text
+            top_k: Maximum number of chunks to return
+            slide_ids: Restrict results to these slides
+
+        Returns:
+            Chunks with 'slide_id', 'page', 'text' and 'score', best first
+        """
+        terms = set(tokenize(query))
+
+        with self._lock:
+            n_chunks = len(self._chunks)
+            if not n_chunks or not terms:
+                return []
+
+            allowed = set(slide_ids) if slide_ids else None
+            avg_length = self._total_length / n_chunks
+            scores = {}
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+
+                idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+
+                for chunk_id, tf in postings.items():
+                    chunk = self._chunks[chunk_id]
+                    if allowed is not None and chunk['slide_id'] not in allowed:
+                        continue
+
+                    norm = self.k1 * (1 - self.b + self.b * chunk['length'] / avg_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+            return [
+                {
+                    'slide_id': self._chunks[chunk_id]['slide_id'],
+                    'page': self._chunks[chunk_id]['page'],
+                    'text': self._chunks[chunk_id]['text'],
+                    'score': score
+                }
+                for chunk_id, score in best
+            ]
+
+    def build_context(self,
+                      query: str,
+                      top_k: int = 4,
+                      slide_ids: Optional[List[str]] = None) -> str:
+        """
+        Build prompt context from the chunks most relevant to a query
+
+        Args:
+            query: Question or topic text
+            top_k: Maximum number of chunks to include
+            slide_ids: Restrict results to these slides
+
+        Returns:
+            Relevant passages labelled by page, in page order, or an empty
+            string when nothing matches
+        """
+        results = self.search(query, top_k, slide_ids)
+        results.sort(key=lambda r: (r['slide_id'], r['page']))
+
+        return "\n\n".join(f"[Page {r['page']}]\n{r['text']}" for r in results)
+
+    def __len__(self) -> int:
+        return len(self._chunks)
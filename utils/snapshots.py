@@ -0,0 +1,208 @@
+import atexit
+import os
+import pickle
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional
+from utils.storage import get_storage_backend, get_slides, get_course_index, get_indexed_courses, MemoryBackend
+from utils.question_pool import get_question_pool
+from utils.file_lock import unique_tmp_path
+from agents.response_cache import get_response_cache
+from agents.grade_cache import get_grade_cache
+from config import SNAPSHOT_ENABLED, SNAPSHOT_DIR, SNAPSHOT_INTERVAL_SECONDS, DEFAULT_COURSES
+
+SNAPSHOT_FORMAT = 1
+
+
+def _process_age() -> float:
+    """Seconds since this process started (Linux), or since this module was imported"""
+    try:
+        with open("/proc/self/stat", "r") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", "r") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return time.monotonic() - _IMPORTED_AT
+
+
+_IMPORTED_AT = time.monotonic()
+
+
+class StateSnapshotter:
+    """
+    Periodically snapshots in-process state to local disk and restores it at
+    boot, so a redeploy neither loses data held by the in-memory storage
+    backend nor starts with cold caches.
+
+    A snapshot holds the in-memory storage collections (or, with the
+    directory backend, which keys are hot), the response and grade caches,
+    the practice question pool and the courses in active use. Warm start
+    restores it and then builds those courses' retrieval indexes, which also
+    loads their slides (page renditions included), before reporting ready.
+    """
+
+    def __init__(self, directory: str, interval: float = 300):
+        """
+        Args:
+            directory: Directory for the snapshot file
+            interval: Seconds between periodic snapshots
+        """
+        self.directory = directory
+        self.interval = interval
+        self.path = os.path.join(directory, "state.pkl")
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stats = {
+            "snapshots": 0,
+            "last_snapshot_at": None,
+            "last_snapshot_seconds": 0.0,
+            "last_snapshot_bytes": 0,
+            "restored": False,
+            "restore_seconds": 0.0,
+            "warm_seconds": 0.0,
+            "ready_after_start_seconds": None,
+            "restored_entries": {}
+        }
+
+    def start(self):
+        """
+        Warm-start from the latest snapshot and begin periodic snapshots
+        (once per process; concurrent callers wait until warm start is done)
+        """
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+
+            self.restore()
+            self._stats["ready_after_start_seconds"] = _process_age()
+
+            threading.Thread(target=self._run, name="state-snapshots", daemon=True).start()
+            atexit.register(self.snapshot)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Write the current state to disk (atomically replacing the previous snapshot)
+
+        Returns:
+            Snapshot size and duration
+        """
+        started = time.monotonic()
+        backend = get_storage_backend()
+        courses = set(get_indexed_courses())
+        if isinstance(backend, MemoryBackend):
+            courses.update(backend.keys("slides"))
+
+        state = {
+            "format": SNAPSHOT_FORMAT,
+            "created_at": datetime.now().isoformat(),
+            "storage_kind": type(backend).__name__,
+            "storage": backend.export_state(),
+            "courses": sorted(courses),
+            "response_cache": get_response_cache().export_state(),
+            "grade_cache": get_grade_cache().export_state(),
+            "question_pool": get_question_pool().export_state()
+        }
+
+        with self._write_lock:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = unique_tmp_path(self.path)
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    size = f.tell()
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Error writing state snapshot: {str(e)}")
+                return {"error": str(e)}
+
+            self._stats["snapshots"] += 1
+            self._stats["last_snapshot_at"] = state["created_at"]
+            self._stats["last_snapshot_seconds"] = time.monotonic() - started
+            self._stats["last_snapshot_bytes"] = size
+
+        return {"bytes": size, "seconds": self._stats["last_snapshot_seconds"]}
+
+    def restore(self) -> Dict[str, Any]:
+        """
+        Load the latest snapshot and warm the retrieval indexes
+
+        Returns:
+            Entries restored per component and the time each phase took
+        """
+        started = time.monotonic()
+        state = self._read()
+        restored = {}
+        courses = list(DEFAULT_COURSES)
+
+        if state is not None:
+            backend = get_storage_backend()
+            if state.get("storage_kind") == type(backend).__name__:
+                restored["storage"] = backend.load_state(state["storage"])
+            restored["response_cache"] = get_response_cache().load_state(state.get("response_cache", []))
+            restored["grade_cache"] = get_grade_cache().load_state(state.get("grade_cache", []))
+            restored["question_pool"] = get_question_pool().load_state(state.get("question_pool", {}))
+            courses += [course for course in state.get("courses", []) if course not in courses]
+
+        restored_at = time.monotonic()
+
+        # Building a course's index also loads its slides into the storage cache
+        restored["indexes"] = 0
+        for course in courses:
+            try:
+                if get_slides(course):
+                    get_course_index(course)
+                    restored["indexes"] += 1
+            except Exception as e:
+                print(f"Error warming course {course}: {str(e)}")
+
+        self._stats["restored"] = state is not None
+        self._stats["restore_seconds"] = restored_at - started
+        self._stats["warm_seconds"] = time.monotonic() - restored_at
+        self._stats["restored_entries"] = restored
+        return dict(restored, restore_seconds=self._stats["restore_seconds"], warm_seconds=self._stats["warm_seconds"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get snapshot and warm-start timings"""
+        return dict(self._stats)
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, "rb") as f:
+                state = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Error reading state snapshot: {str(e)}")
+            return None
+
+        if state.get("format") != SNAPSHOT_FORMAT:
+            return None
+        return state
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.snapshot()
+            except Exception as e:
+                # e.g. a cached value that cannot be pickled; try again next interval
+                print(f"Error taking state snapshot: {str(e)}")
+
+
+_snapshotter = StateSnapshotter(SNAPSHOT_DIR, interval=SNAPSHOT_INTERVAL_SECONDS)
+
+
+def get_snapshotter() -> StateSnapshotter:
+    """Get the process-wide state snapshotter"""
+    return _snapshotter
+
+
+def warm_start():
+    """Restore the latest snapshot and start periodic snapshots, once per process"""
+    if SNAPSHOT_ENABLED:
+        _snapshotter.start()
@@ -1,80 +1,746 @@
-import streamlit as st
+import copy
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
 from datetime import datetime
-import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from utils.retrieval import BM25Index
+from utils.file_lock import FileLock, unique_tmp_path
+from utils.compression import PayloadCodec, Packed, MAGIC
+from config import (
+    RETRIEVAL_CHUNK_TOKENS,
+    STORAGE_BACKEND,
+    STORAGE_DIR,
+    STORAGE_CACHE_ENTRIES,
+    STORAGE_COMPRESSION,
+    STORAGE_COMPRESSION_LEVEL,
+    STORAGE_COMPRESSED_COLLECTIONS,
+    STORAGE_COMPRESSION_MIN_BYTES,
+    STORAGE_BLOB_MIN_BYTES,
+    STORAGE_DICTIONARY_BYTES
+)
+
+_MISSING = object()
+_DICTIONARIES = "_dictionaries"  # Compression dictionaries in MemoryBackend.export_state()
+
+
+class MemoryBackend:
+    """
+    Process-wide in-memory storage. Values are returned by reference, so
+    every session and worker thread in the process sees the same objects,
+    except in the collections the codec compresses: those are held packed
+    and decompressed into a fresh copy on each read, so changes to them must
+    be written back with set() or update().
+    """
+
+    def __init__(self, codec: Optional[PayloadCodec] = None):
+        """
+        Args:
+            codec: Compression for text and JSON payloads (none when None)
+        """
+        self.codec = codec or PayloadCodec(method="none")
+        self._collections = {}
+        self._versions = {}
+        self._lock = threading.RLock()
+
+    def get(self, collection: str, key: str, default: Any = None) -> Any:
+        with self._lock:
+            stored = self._collections.get(collection, {}).get(key, _MISSING)
+        return default if stored is _MISSING else self._decode(stored)
+
+    def set(self, collection: str, key: str, value: Any):
+        stored = self._encode(collection, value)
+        with self._lock:
+            self._collections.setdefault(collection, {})[key] = stored
+            self._bump(collection, key)
+
+    def update(self, collection: str, key: str, apply: Callable[[Any], Any], default: Any = None) -> Any:
+        """
+        Atomically read, change and write back one value
+
+        Args:
+            apply: Receives the current value (a copy of default when missing)
+                and returns the new value
+
+        Returns:
+            The new value
+        """
+        return self.versioned_update(collection, key, apply, default)[0]
+
+    def versioned_update(self, collection: str, key: str, apply: Callable[[Any], Any], default: Any = None):
+        """
+        Same as update(), also returning the versions before and after the write
+
+        Returns:
+            (new value, version before, version after)
+        """
+        with self._lock:
+            items = self._collections.setdefault(collection, {})
+            before = self._versions.get((collection, key))
+            value = apply(self._decode(items[key]) if key in items else copy.deepcopy(default))
+            items[key] = self._encode(collection, value)
+            self._bump(collection, key)
+            return value, before, self._versions[(collection, key)]
+
+    def delete(self, collection: str, key: str):
+        with self._lock:
+            self._collections.get(collection, {}).pop(key, None)
+            self._bump(collection, key)
+
+    def version(self, collection: str, key: str) -> Any:
+        """Token that changes whenever the value is written"""
+        with self._lock:
+            return self._versions.get((collection, key))
+
+    def keys(self, collection: str) -> List[str]:
+        """Keys stored in a collection"""
+        with self._lock:
+            return list(self._collections.get(collection, {}))
+
+    def export_state(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Copy of all collections for snapshots. Compressed values are exported
+        packed, as stored, with the dictionaries they need under
+        "_dictionaries"; only the dicts are copied under the lock, so writers
+        are not held up while the snapshot is serialized.
+        """
+        with self._lock:
+            state = {
+                collection: {
+                    key: stored if isinstance(stored, Packed) else copy.deepcopy(stored)
+                    for key, stored in items.items()
+                }
+                for collection, items in self._collections.items()
+            }
+        state[_DICTIONARIES] = self.codec.export_dictionaries()
+        return state
+
+    def load_state(self, state: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Restore collections from export_state(), keeping values already present.
+        Packed values are kept packed where this codec compresses the
+        collection and unpacked elsewhere; plain values are packed as needed.
+
+        Returns:
+            Number of values restored
+        """
+        state = dict(state)
+        self.codec.load_dictionaries(state.pop(_DICTIONARIES, {}))
+        restored = 0
+        with self._lock:
+            for collection, items in state.items():
+                existing = self._collections.setdefault(collection, {})
+                for key, value in items.items():
+                    if key not in existing:
+                        existing[key] = self._restore(collection, value)
+                        self._bump(collection, key)
+                        restored += 1
+        return restored
+
+    def train_dictionaries(self, max_samples: int = 200) -> Dict[str, int]:
+        """
+        Train a compression dictionary per compressed collection on its
+        stored values; values written afterwards are packed with it
+
+        Returns:
+            Dictionary size per collection
+        """
+        sizes = {}
+        for collection in sorted(self.codec.collections):
+            with self._lock:
+                stored = list(self._collections.get(collection, {}).values())[-max_samples:]
+            sizes[collection] = len(self.codec.train(collection, [self._decode(value) for value in stored])[1])
+        return sizes
+
+    def _encode(self, collection: str, value: Any) -> Any:
+        return self.codec.pack(collection, value) if self.codec.handles(collection) else value
+
+    def _decode(self, stored: Any) -> Any:
+        return self.codec.unpack(stored) if isinstance(stored, Packed) else stored
+
+    def _restore(self, collection: str, value: Any) -> Any:
+        if not isinstance(value, Packed):
+            return self._encode(collection, value)
+        return value if self.codec.handles(collection) else self.codec.unpack(value)
+
+    def _bump(self, collection: str, key: str):
+        self._versions[(collection, key)] = self._versions.get((collection, key), 0) + 1
+
+
+class DirectoryBackend:
+    """
+    Storage in a local directory, one pickle file per key (slides carry page
+    image bytes, which JSON cannot hold). Values are returned as fresh
+    copies; changes must be written back with set() or update().
+
+    Several processes can share the directory: update() holds a lock file
+    across processes, writes are atomic replaces, and decoded values are
+    cached per process but revalidated against the file on every read, so a
+    change made by another process is seen on the next access.
+
+    Values of the collections the codec compresses are written packed and
+    cached packed, and only decompressed when read. Compression dictionaries
+    are kept under _dictionaries/, where every process finds them.
+    """
+
+    def __init__(self, directory: str, cache_entries: int = 256, codec: Optional[PayloadCodec] = None):
+        """
+        Args:
+            directory: Root directory, shared by all processes using the store
+            cache_entries: Values kept in memory (packed, for compressed collections)
+            codec: Compression for text and JSON payloads (none when None)
+        """
+        self.directory = directory
+        self.cache_entries = cache_entries
+        self.codec = codec or PayloadCodec(method="none")
+        self.codec.dictionary_loader = self._load_dictionary
+        self._cache = OrderedDict()  # path -> (file signature, stored value, (collection, key))
+        self._cache_lock = threading.Lock()
+
+        for collection in self.codec.collections:
+            dictionary_id = self._read_dictionary_file(f"{collection}.current")
+            dictionary = self._load_dictionary(dictionary_id.decode("ascii")) if dictionary_id else None
+            if dictionary:
+                self.codec.set_dictionary(collection, dictionary)
+
+    def get(self, collection: str, key: str, default: Any = None) -> Any:
+        path = self._path(collection, key)
+        signature = self._signature(path)
+        if signature is None:
+            return default
+
+        with self._cache_lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached[0] == signature:
+                self._cache.move_to_end(path)
+                stored = cached[1]
+            else:
+                stored = _MISSING
+
+        try:
+            if stored is _MISSING:
+                signature, stored = self._read(path)
+                self._remember(path, signature, stored, (collection, key))
+            return self._decode(stored)
+        except FileNotFoundError:
+            return default
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+            print(f"Error reading {collection}/{key}: {str(e)}")
+            return default
+
+    def set(self, collection: str, key: str, value: Any):
+        self._write(self._path(collection, key), value, (collection, key))
+
+    def update(self, collection: str, key: str, apply: Callable[[Any], Any], default: Any = None) -> Any:
+        """Atomically (across processes) read, change and write back one value"""
+        return self.versioned_update(collection, key, apply, default)[0]
+
+    def versioned_update(self, collection: str, key: str, apply: Callable[[Any], Any], default: Any = None):
+        """
+        Same as update(), also returning the versions before and after the
+        write (taken under the lock, so no other process's write falls between)
+
+        Returns:
+            (new value, version before, version after)
+        """
+        path = self._path(collection, key)
+        with FileLock(f"{path}.lock"):
+            before = self._signature(path)
+            value = apply(self.get(collection, key, copy.deepcopy(default)))
+            return value, before, self._write(path, value, (collection, key))
+
+    def delete(self, collection: str, key: str):
+        path = self._path(collection, key)
+        with FileLock(f"{path}.lock"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._cache_lock:
+            self._cache.pop(path, None)
+
+    def version(self, collection: str, key: str) -> Any:
+        """Token that changes whenever the value is written, by any process"""
+        return self._signature(self._path(collection, key))
+
+    def export_state(self) -> List[Tuple[str, str]]:
+        """
+        The (collection, key) pairs in the read cache, least recently used
+        first; the data itself is already on disk (for snapshots)
+        """
+        with self._cache_lock:
+            return [name for _, _, name in self._cache.values()]
+
+    def load_state(self, state: List[Tuple[str, str]]) -> int:
+        """
+        Warm the read cache with the values named by export_state()
+
+        Returns:
+            Number of values loaded
+        """
+        loaded = 0
+        for collection, key in state[-self.cache_entries:]:
+            if self.get(collection, key) is not None:
+                loaded += 1
+        return loaded
+
+    def train_dictionaries(self, max_samples: int = 200) -> Dict[str, int]:
+        """
+        Train a compression dictionary per compressed collection on its most
+        recently written values and store it for all processes. Values
+        written afterwards are packed with it (by processes started later);
+        recompress() repacks the existing ones.
+
+        Returns:
+            Dictionary size per collection
+        """
+        sizes = {}
+        for collection in sorted(self.codec.collections):
+            values = []
+            for path in self._files(collection)[-max_samples:]:
+                try:
+                    values.append(self._decode(self._read(path)[1]))
+                except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+                    print(f"Error reading {path}: {str(e)}")
+
+            dictionary_id, dictionary = self.codec.train(collection, values)
+            if dictionary:
+                self._write_dictionary_file(f"{dictionary_id}.zdict", dictionary)
+            self._write_dictionary_file(f"{collection}.current", dictionary_id.encode("ascii"))
+            sizes[collection] = len(dictionary)
+        return sizes
+
+    def recompress(self, collection: str) -> Dict[str, int]:
+        """
+        Rewrite every value of a collection with the current compression
+        settings and dictionary (e.g. values stored before compression was
+        enabled, or before a dictionary was trained)
+
+        Returns:
+            {"values": int, "bytes_before": int, "bytes_after": int}
+        """
+        stats = {"values": 0, "bytes_before": 0, "bytes_after": 0}
+        for path in self._files(collection):
+            with FileLock(f"{path}.lock"):
+                try:
+                    signature, stored = self._read(path)
+                    value = self._decode(stored)
+                except FileNotFoundError:
+                    continue
+                except (OSError, ValueError, pickle.UnpicklingError, EOFError) as e:
+                    print(f"Error reading {path}: {str(e)}")
+                    continue
+
+                repacked = self.codec.pack(collection, value) if self.codec.handles(collection) else value
+                stats["bytes_before"] += signature[2]
+                stats["bytes_after"] += self._write_file(path, repacked)[2]
+                stats["values"] += 1
+
+            with self._cache_lock:
+                self._cache.pop(path, None)
+        return stats
+
+    def _write(self, path: str, value: Any, name: Tuple[str, str]):
+        """Atomically replace a value's file, returning its new signature"""
+        stored = self.codec.pack(name[0], value) if self.codec.handles(name[0]) else copy.deepcopy(value)
+        signature = self._write_file(path, stored)
+        self._remember(path, signature, stored, name)
+        return signature
+
+    def _write_file(self, path: str, stored: Any):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = unique_tmp_path(path)
+        with open(tmp_path, "wb") as f:
+            if isinstance(stored, Packed):
+                f.writelines(stored.chunks())
+            else:
+                pickle.dump(stored, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            signature = self._signature(tmp_path, f.fileno())
+        os.replace(tmp_path, path)  # Renaming keeps the inode and mtime, so the signature holds
+        return signature
+
+    def _read(self, path: str):
+        """Read a value's file as stored: packed, or a plain pickle (uncompressed collections and older files)"""
+        with open(path, "rb") as f:
+            signature = self._signature(path, f.fileno())
+            raw = f.read()
+        return signature, Packed.from_bytes(raw) if raw.startswith(MAGIC) else pickle.loads(raw)
+
+    def _decode(self, stored: Any) -> Any:
+        """A fresh copy of a stored value"""
+        return self.codec.unpack(stored) if isinstance(stored, Packed) else copy.deepcopy(stored)
+
+    def _files(self, collection: str) -> List[str]:
+        """Paths of a collection's value files, least recently written first"""
+        folder = os.path.join(self.directory, collection)
+        if not os.path.isdir(folder):
+            return []
+        paths = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(".pkl")]
+        return sorted(paths, key=lambda path: self._signature(path) or (0, 0, 0))
+
+    def _load_dictionary(self, dictionary_id: str) -> Optional[bytes]:
+        return self._read_dictionary_file(f"{dictionary_id}.zdict")
+
+    def _read_dictionary_file(self, name: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.directory, "_dictionaries", name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_dictionary_file(self, name: str, data: bytes):
+        path = os.path.join(self.directory, "_dictionaries", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = unique_tmp_path(path)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _path(self, collection: str, key: str) -> str:
+        name = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, collection, f"{name}.pkl")
+
+    @staticmethod
+    def _signature(path: str, fileno: Optional[int] = None):
+        """Identity of the file's current contents (every write replaces the file)"""
+        try:
+            st = os.fstat(fileno) if fileno is not None else os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _remember(self, path: str, signature, value: Any, name: Tuple[str, str]):
+        if signature is None:
+            return
+        with self._cache_lock:
+            self._cache[path] = (signature, value, name)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+
+def create_backend(kind: str = "memory", directory: Optional[str] = None):
+    """
+    Create a storage backend
+
+    Args:
+        kind: "memory" or "directory"
+        directory: Root directory for the "directory" backend
+    """
+    codec = PayloadCodec(
+        method=STORAGE_COMPRESSION,
+        level=STORAGE_COMPRESSION_LEVEL,
+        collections=STORAGE_COMPRESSED_COLLECTIONS,
+        min_bytes=STORAGE_COMPRESSION_MIN_BYTES,
+        blob_min_bytes=STORAGE_BLOB_MIN_BYTES,
+        dictionary_bytes=STORAGE_DICTIONARY_BYTES
+    )
+    if kind == "directory":
+        return DirectoryBackend(directory, cache_entries=STORAGE_CACHE_ENTRIES, codec=codec)
+    return MemoryBackend(codec=codec)
+
+
+_backend = create_backend(STORAGE_BACKEND, STORAGE_DIR)
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_storage_backend():
+    """Get the process-wide storage backend"""
+    return _backend
+
+
+def set_storage_backend(backend):
+    """Replace the process-wide storage backend (e.g. in a CLI or worker process)"""
+    global _backend
+    _backend = backend
+    with _indexes_lock:
+        _indexes.clear()
+
 
 def initialize_storage():
-    """Initialize session state storage"""
-    if 'courses' not in st.session_state:
-        st.session_state.courses = {}
-    
-    if 'current_course' not in st.session_state:
-        st.session_state.current_course = None
-    
-    if 'slides' not in st.session_state:
-        st.session_state.slides = {}
-    
-    if 'quizzes' not in st.session_state:
-        st.session_state.quizzes = {}
-    
-    if 'quiz_attempts' not in st.session_state:
-        st.session_state.quiz_attempts = {}
-    
-    if 'student_progress' not in st.session_state:
-        st.session_state.student_progress = {}
+    """Make sure the storage backend is ready (kept for app start-up; storage is process-wide)"""
+    return get_storage_backend()
 
 def save_slides(course_name: str, slides: List[Dict[str, Any]]):
     """Save slides for a course"""
-    if course_name not in st.session_state.slides:
-        st.session_state.slides[course_name] = []
-    
-    st.session_state.slides[course_name].extend(slides)
+    backend = get_storage_backend()
+
+    def append(existing: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Another process may have added slides since the IDs were picked, and
+        # numbers of removed slides must not come back: conversations and the
+        # retrieval index are keyed by slide ID
+        def allocate(counter: int) -> int:
+            next_number = max(counter, _next_order(existing))
+            taken = {slide['id'] for slide in existing}
+            for slide in slides:
+                if slide['id'] in taken or slide.get('order', 0) < next_number:
+                    slide['id'] = f"slide_{next_number}"
+                    slide['order'] = next_number
+                taken.add(slide['id'])
+                next_number = max(next_number, slide.get('order', 0) + 1)
+            return next_number
+
+        # The counter is only changed under the slides' lock, so allocations never interleave
+        backend.update("slide_counters", course_name, allocate, default=0)
+        return existing + slides
+
+    _, before, after = backend.versioned_update("slides", course_name, append, default=[])
+
+    # Keep the course's retrieval index in step with its slides
+    def add(index: BM25Index):
+        for slide in slides:
+            index.add_slide(slide['id'], _slide_page_texts(slide))
+
+    _update_course_index(course_name, before, after, add)
 
 def get_slides(course_name: str) -> List[Dict[str, Any]]:
     """Get slides for a course"""
-    return st.session_state.slides.get(course_name, [])
+    return get_storage_backend().get("slides", course_name, [])
+
+def get_slide_text(slide: Dict[str, Any]) -> str:
+    """Get the text of a slide as sent to the agents"""
+    return f"{slide['title']}\n{slide.get('content', '')}"
+
+def remove_slide(course_name: str, slide_id: str):
+    """Remove a slide from a course"""
+    _, before, after = get_storage_backend().versioned_update(
+        "slides",
+        course_name,
+        lambda existing: [slide for slide in existing if slide['id'] != slide_id],
+        default=[]
+    )
+    _update_course_index(course_name, before, after, lambda index: index.remove_slide(slide_id))
+
+def get_next_slide_number(course_name: str) -> int:
+    """
+    Get the next unused slide number for a course. Numbers only ever
+    increase, so a removed slide's ID is never given to a new one;
+    save_slides renumbers slides whose number was taken in the meantime.
+    """
+    counter = get_storage_backend().get("slide_counters", course_name, 0)
+    return max(counter, _next_order(get_slides(course_name)))
+
+def _next_order(slides: List[Dict[str, Any]]) -> int:
+    """Number after the highest slide order (for courses saved before the counter existed)"""
+    return max((slide.get('order', 0) for slide in slides), default=-1) + 1
+
+def get_course_index(course_name: str) -> BM25Index:
+    """
+    Get the retrieval index over a course's slide text, building it on first
+    use and rebuilding it when the slides were changed by another process
+    """
+    version = get_storage_backend().version("slides", course_name)
+
+    with _indexes_lock:
+        entry = _indexes.get(course_name)
+        if entry is None or entry[0] != version:
+            index = BM25Index(chunk_tokens=RETRIEVAL_CHUNK_TOKENS)
+            for slide in get_slides(course_name):
+                index.add_slide(slide['id'], _slide_page_texts(slide))
+            entry = _indexes[course_name] = (version, index)
+
+        return entry[1]
+
+def _update_course_index(course_name: str, version_before: Any, version_after: Any, change: Callable[[BM25Index], None]):
+    """
+    Apply this process's own slide change to a built index in place, or drop
+    the index when the slides also changed elsewhere (it is rebuilt on next use)
+    """
+    with _indexes_lock:
+        entry = _indexes.get(course_name)
+        if entry is None:
+            return
+        if entry[0] != version_before:
+            del _indexes[course_name]
+            return
+
+        change(entry[1])
+        _indexes[course_name] = (version_after, entry[1])
+
+def get_indexed_courses() -> List[str]:
+    """Courses whose retrieval index has been built in this process (i.e. recently used)"""
+    with _indexes_lock:
+        return list(_indexes)
+
+def _slide_page_texts(slide: Dict[str, Any]) -> List[str]:
+    """Get per-page text for a slide, falling back to its full content"""
+    return slide.get('page_texts') or [slide.get('content', '')]
 
 def save_quiz(course_name: str, quiz: Dict[str, Any]):
     """Save a quiz for a course"""
-    if course_name not in st.session_state.quizzes:
-        st.session_state.quizzes[course_name] = []
-    
-    quiz['id'] = f"quiz_{len(st.session_state.quizzes[course_name])}"
-    quiz['created_at'] = datetime.now().isoformat()
-    st.session_state.quizzes[course_name].append(quiz)
+    def append(quizzes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        quiz['id'] = f"quiz_{len(quizzes)}"
+        quiz['created_at'] = datetime.now().isoformat()
+        return quizzes + [quiz]
+
+    get_storage_backend().update("quizzes", course_name, append, default=[])
     return quiz['id']
 
 def get_quizzes(course_name: str) -> List[Dict[str, Any]]:
     """Get all quizzes for a course"""
-    return st.session_state.quizzes.get(course_name, [])
-
-def save_quiz_attempt(course_name: str, quiz_id: str, student_name: str, attempt: Dict[str, Any]):
-    """Save a student's quiz attempt"""
-    key = f"{course_name}_{quiz_id}"
-    if key not in st.session_state.quiz_attempts:
-        st.session_state.quiz_attempts[key] = {}
-    
-    if student_name not in st.session_state.quiz_attempts[key]:
-        st.session_state.quiz_attempts[key][student_name] = []
-    
+    return get_storage_backend().get("quizzes", course_name, [])
+
+def update_quiz(course_name: str, quiz: Dict[str, Any]):
+    """Store changes to a published quiz (e.g. an edited answer key)"""
+    get_storage_backend().update(
+        "quizzes",
+        course_name,
+        lambda quizzes: [quiz if q['id'] == quiz['id'] else q for q in quizzes],
+        default=[]
+    )
+
+def save_quiz_draft(course_name: str, draft: Dict[str, Any]) -> str:
+    """Save a generated quiz for instructor review (not yet visible to students)"""
+    def append(drafts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        draft['draft_id'] = f"draft_{max((int(d['draft_id'].split('_')[1]) for d in drafts), default=-1) + 1}"
+        draft['created_at'] = datetime.now().isoformat()
+        return drafts + [draft]
+
+    get_storage_backend().update("quiz_drafts", course_name, append, default=[])
+    return draft['draft_id']
+
+def get_quiz_drafts(course_name: str) -> List[Dict[str, Any]]:
+    """Get the quiz drafts awaiting review for a course"""
+    return get_storage_backend().get("quiz_drafts", course_name, [])
+
+def remove_quiz_draft(course_name: str, draft_id: str):
+    """Remove a quiz draft (after publishing or discarding it)"""
+    get_storage_backend().update(
+        "quiz_drafts",
+        course_name,
+        lambda drafts: [d for d in drafts if d['draft_id'] != draft_id],
+        default=[]
+    )
+
+def save_quiz_attempt(course_name: str, quiz_id: str, student_name: str, attempt: Dict[str, Any]) -> int:
+    """
+    Save a student's quiz attempt
+
+    Attempts are stored per student, so a submission or regrade rewrites
+    only that student's attempts rather than everyone's who took the quiz.
+
+    Returns:
+        Index of the attempt among the student's attempts, for update_quiz_attempt
+    """
     attempt['timestamp'] = datetime.now().isoformat()
-    st.session_state.quiz_attempts[key][student_name].append(attempt)
+    position = {}
+
+    def append(student_attempts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        position['index'] = len(student_attempts)
+        return student_attempts + [attempt]
+
+    _change_student_attempts(course_name, quiz_id, student_name, append)
+    return position['index']
+
+def update_quiz_attempt(course_name: str,
+                        quiz_id: str,
+                        student_name: str,
+                        index: int,
+                        apply: Callable[[Dict[str, Any]], None]):
+    """
+    Change a stored attempt in place (e.g. to record its grade)
+
+    Args:
+        index: Attempt index returned by save_quiz_attempt
+        apply: Receives the attempt dict and modifies it
+    """
+    def change(student_attempts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if 0 <= index < len(student_attempts):
+            apply(student_attempts[index])
+        return student_attempts
+
+    _change_student_attempts(course_name, quiz_id, student_name, change)
+
+def get_student_attempts(course_name: str, quiz_id: str, student_name: str) -> List[Dict[str, Any]]:
+    """Get one student's attempts at a quiz, oldest first"""
+    backend = get_storage_backend()
+    student_attempts = backend.get("student_attempts", f"{course_name}_{quiz_id}_{student_name}")
+    if student_attempts is None:
+        student_attempts = _legacy_quiz_attempts(course_name, quiz_id).get(student_name, [])
+    return student_attempts
 
 def get_quiz_attempts(course_name: str, quiz_id: str) -> Dict[str, List[Dict[str, Any]]]:
-    """Get all attempts for a quiz"""
-    key = f"{course_name}_{quiz_id}"
-    return st.session_state.quiz_attempts.get(key, {})
+    """Get all attempts for a quiz, by student"""
+    backend = get_storage_backend()
+    attempts = _legacy_quiz_attempts(course_name, quiz_id)
+    for student_name in backend.get("quiz_attempt_students", f"{course_name}_{quiz_id}", []):
+        student_attempts = backend.get("student_attempts", f"{course_name}_{quiz_id}_{student_name}")
+        if student_attempts is not None:
+            attempts[student_name] = student_attempts
+    return attempts
+
+def _change_student_attempts(course_name: str,
+                             quiz_id: str,
+                             student_name: str,
+                             apply: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]]):
+    """Atomically change one student's attempts, registering the student with the quiz on first use"""
+    backend = get_storage_backend()
+    roster_key = f"{course_name}_{quiz_id}"
+    if student_name not in backend.get("quiz_attempt_students", roster_key, []):
+        backend.update(
+            "quiz_attempt_students",
+            roster_key,
+            lambda students: students if student_name in students else students + [student_name],
+            default=[]
+        )
+
+    def change(student_attempts: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        if student_attempts is None:
+            # Attempts saved before they were stored per student
+            student_attempts = _legacy_quiz_attempts(course_name, quiz_id).get(student_name, [])
+        return apply(student_attempts)
+
+    backend.update("student_attempts", f"{roster_key}_{student_name}", change)
+
+def _legacy_quiz_attempts(course_name: str, quiz_id: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Attempts stored in the old layout, one value for everyone who took the quiz (read-only)"""
+    return get_storage_backend().get("quiz_attempts", f"{course_name}_{quiz_id}", {})
+
+def save_practice_session(course_name: str, student_name: str, session: Dict[str, Any]):
+    """Store a student's in-progress practice quiz (questions, answers, analysis)"""
+    get_storage_backend().set("practice_sessions", f"{course_name}_{student_name}", session)
+
+def get_practice_session(course_name: str, student_name: str) -> Optional[Dict[str, Any]]:
+    """Get a student's in-progress practice quiz, if any"""
+    return get_storage_backend().get("practice_sessions", f"{course_name}_{student_name}")
+
+def clear_practice_session(course_name: str, student_name: str):
+    """Drop a student's practice quiz once they start a new one"""
+    get_storage_backend().delete("practice_sessions", f"{course_name}_{student_name}")
 
 def update_student_progress(course_name: str, student_name: str, progress: Dict[str, Any]):
     """Update student's learning progress"""
     key = f"{course_name}_{student_name}"
-    st.session_state.student_progress[key] = progress
+    get_storage_backend().set("student_progress", key, progress)
+
+def change_student_progress(course_name: str,
+                            student_name: str,
+                            apply: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Atomically read, change and store a student's progress (safe when
+    several processes update it at once)
+
+    Args:
+        apply: Receives the current progress and returns the new progress
+
+    Returns:
+        The new progress
+    """
+    key = f"{course_name}_{student_name}"
+    return get_storage_backend().update("student_progress", key, apply, default=_new_progress())
 
 def get_student_progress(course_name: str, student_name: str) -> Dict[str, Any]:
     """Get student's learning progress"""
     key = f"{course_name}_{student_name}"
-    return st.session_state.student_progress.get(key, {
+    return get_storage_backend().get("student_progress", key, _new_progress())
+
+def _new_progress() -> Dict[str, Any]:
+    return {
         'weak_areas': [],
         'quiz_history': [],
         'learning_context': ''
-    })
+    }
@@ -0,0 +1,127 @@
+from typing import List
+
+try:
+    import tiktoken  # Optional: exact counts when installed
+except ImportError:
+    tiktoken = None
+
+_encoding = None
+
+def _get_encoding():
+    """Get the tiktoken encoding used for GPT-4o class models"""
+    global _encoding
+
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens in text
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Exact token count when tiktoken is installed, otherwise an
+        estimate of roughly four characters per token
+    """
+    if not text:
+        return 0
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+
+    return (len(text) + 3) // 4
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens, preferring paragraph boundaries
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List of chunks in original order
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for paragraph in _split_oversized(text.split("\n\n"), max_tokens):
+        paragraph_tokens = count_tokens(paragraph)
+
+        if current and current_tokens + paragraph_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            current_tokens = 0
+
+        current.append(paragraph)
+        current_tokens += paragraph_tokens
+
+    if current:
+        chunks.append("\n\n".join(current))
+
+    return [chunk for chunk in chunks if chunk.strip()]
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """
+    Truncate text to at most max_tokens
+
+    Args:
+        text: Text to truncate
+        max_tokens: Token budget
+        keep_end: Keep the end of the text instead of the start
+
+    Returns:
+        The first chunk of text that fits the budget, or with keep_end the
+        last chunks that fit together
+    """
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    chunks = chunk_text(text, max_tokens)
+    if not keep_end:
+        return chunks[0] if chunks else ""
+
+    kept = []
+    for chunk in reversed(chunks):
+        if kept and count_tokens("\n\n".join([chunk] + kept)) > max_tokens:
+            break
+        kept.insert(0, chunk)
+    return "\n\n".join(kept)
+
+def _split_oversized(paragraphs: List[str], max_tokens: int) -> List[str]:
+    """Break paragraphs that exceed the budget on lines, then on words"""
+    pieces = []
+
+    for paragraph in paragraphs:
+        if count_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+
+        for unit_sep, units in (("\n", paragraph.split("\n")), (" ", paragraph.split())):
+            if all(count_tokens(unit) <= max_tokens for unit in units):
+                break
+
+        current = []
+        current_tokens = 0
+        for unit in units:
+            unit_tokens = count_tokens(unit) + 1  # Allow for the separator
+            if current and current_tokens + unit_tokens > max_tokens:
+                pieces.append(unit_sep.join(current))
+                current = []
+                current_tokens = 0
+            current.append(unit)
+            current_tokens += unit_tokens
+
+        if current:
+            pieces.append(unit_sep.join(current))
+
+    return pieces
@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+from typing import Dict, Any
+from agents.learner_agent import LearnerAgent
+from agents.single_flight import get_single_flight
+from config import WARMUP_MIN_INTERVAL_SECONDS, WARMUP_CACHE_TTL
+
+class TutorWarmup:
+    """
+    Low-priority background queue that pre-generates the baseline tutor
+    explanation (no weak areas, no question) for uploaded slides.
+
+    Explanations land in the shared response cache under the same key the
+    first "Explain This Topic" of a student with no weak areas uses, so they
+    are served instantly (weak areas go in the student's turn, never in the
+    system prompt, so they do not change the rest of the request).
+    Calls are spaced at least min_interval apart and wait while any other
+    agent request is in flight, so warm-up never competes with students.
+    """
+
+    def __init__(self, min_interval: float = 5.0, cache_ttl: float = 7 * 24 * 60 * 60):
+        self.min_interval = min_interval
+        self.cache_ttl = cache_ttl
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._last_call = 0.0
+        self._stats = {"queued": 0, "warmed": 0, "errors": 0}
+
+    def schedule(self, slide_content: str):
+        """
+        Queue a slide for warm-up
+
+        Args:
+            slide_content: Slide text exactly as the student page sends it
+        """
+        with self._lock:
+            if slide_content in self._queued:
+                return
+
+            self._queued.add(slide_content)
+            self._queue.put(slide_content)
+            self._stats["queued"] += 1
+
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="tutor-warmup", daemon=True)
+                self._worker.start()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counts of queued, warmed and failed slides"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._queued)
+        return stats
+
+    def _run(self):
+        while True:
+            slide_content = self._queue.get()
+            response = None
+            try:
+                self._wait_for_idle()
+                agent = LearnerAgent(user_id="warmup", priority="background")
+                agent.cache_ttls["LearnerAgent.teach_concept"] = self.cache_ttl
+                response = agent.teach_concept(slide_content=slide_content)
+            except Exception as e:
+                print(f"Error warming up tutor explanation: {str(e)}")
+            finally:
+                self._last_call = time.monotonic()
+
+            # The model can return no content; one bad slide must not stop the worker
+            with self._lock:
+                self._queued.discard(slide_content)
+                if not isinstance(response, str) or response.startswith("Error in teaching"):
+                    self._stats["errors"] += 1
+                else:
+                    self._stats["warmed"] += 1
+
+    def _wait_for_idle(self):
+        """Block until the rate limit allows a call and no interactive request is in flight"""
+        single_flight = get_single_flight()
+
+        while True:
+            wait = self._last_call + self.min_interval - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+                continue
+
+            if single_flight.in_flight() == 0:
+                return
+
+            time.sleep(0.5)
+
+
+_tutor_warmup = TutorWarmup(min_interval=WARMUP_MIN_INTERVAL_SECONDS, cache_ttl=WARMUP_CACHE_TTL)
+
+
+def get_tutor_warmup() -> TutorWarmup:
+    """Get the process-wide tutor warm-up queue"""
+    return _tutor_warmup
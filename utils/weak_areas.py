@@ -0,0 +1,260 @@
+import re
+import time
+import unicodedata
+from difflib import SequenceMatcher
+from typing import List, Dict, Any, Optional
+from config import (
+    WEAK_AREA_TOP_K,
+    WEAK_AREA_HALF_LIFE_DAYS,
+    WEAK_AREA_SIMILARITY,
+    WEAK_AREA_MAX_TRACKED,
+    WEAK_AREA_MIN_WEIGHT
+)
+from utils.storage import change_student_progress
+
+# Filler words that make phrasings of the same concept look different
+_FILLER_WORDS = {
+    "a", "an", "the", "of", "and", "or", "to", "in", "on", "for", "with", "how", "why", "what",
+    "understanding", "understand", "concept", "concepts", "basics", "basic", "applying",
+    "application", "knowledge", "about", "between", "their", "its"
+}
+
+
+def normalize_label(label: str) -> str:
+    """
+    Canonical form of a concept label: Unicode-normalized, case-folded,
+    without punctuation, filler words or plural endings
+
+    Args:
+        label: Weak or strong area as phrased by the reviewer
+
+    Returns:
+        Space-separated canonical tokens (empty when nothing meaningful is left)
+    """
+    text = unicodedata.normalize("NFKC", str(label or "")).casefold()
+    tokens = []
+    for token in re.findall(r"\w+", text):
+        if token in _FILLER_WORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def label_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two canonical labels: the share of tokens they have in
+    common, where tokens spelled almost the same (typos, other inflections)
+    count as shared
+    """
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b:
+        return 0.0
+    if a.replace(" ", "") == b.replace(" ", ""):
+        return 1.0  # "back-propagation" and "backpropagation"
+
+    shared = sum(
+        1 for token in tokens_a
+        if token in tokens_b or any(SequenceMatcher(None, token, other).ratio() >= 0.85 for other in tokens_b)
+    )
+    return shared / (len(tokens_a) + len(tokens_b) - shared)
+
+
+class WeakAreaModel:
+    """
+    Per-student, per-course model of weak areas. Near-duplicate phrasings are
+    clustered under one canonical concept; each concept carries a weight that
+    grows when it is reported weak and decays with a half-life, and a mastery
+    level raised by strong results. Only the top-k concepts reach prompts and
+    at most WEAK_AREA_MAX_TRACKED are kept, so its size stays bounded however
+    many quizzes the student takes.
+
+    The state is a plain dict, stored alongside the student's progress.
+    """
+
+    def __init__(self,
+                 state: Optional[Dict[str, Any]] = None,
+                 half_life_days: float = 14,
+                 similarity: float = 0.6,
+                 max_tracked: int = 50,
+                 min_weight: float = 0.25,
+                 max_weight: float = 5.0):
+        """
+        Args:
+            state: Previously saved state from to_dict(), if any
+            half_life_days: Days after which an unrepeated weakness counts half
+            similarity: Minimum label similarity to merge into an existing concept
+            max_tracked: Maximum number of concepts kept
+            min_weight: Concepts whose effective weight falls below this are dropped
+            max_weight: Cap on a concept's weight, so a long history of
+                misses can still be outweighed by recent mastery
+        """
+        self.half_life_seconds = half_life_days * 86400
+        self.similarity = similarity
+        self.max_tracked = max_tracked
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+        self.areas = {key: dict(area) for key, area in (state or {}).get("areas", {}).items()}
+
+    @classmethod
+    def from_progress(cls, progress: Dict[str, Any]) -> "WeakAreaModel":
+        """Load the model stored in a student's progress, seeding it from a legacy weak_areas list"""
+        model = cls(
+            progress.get("weak_area_model"),
+            half_life_days=WEAK_AREA_HALF_LIFE_DAYS,
+            similarity=WEAK_AREA_SIMILARITY,
+            max_tracked=WEAK_AREA_MAX_TRACKED,
+            min_weight=WEAK_AREA_MIN_WEIGHT
+        )
+        if "weak_area_model" not in progress and progress.get("weak_areas"):
+            model.record(progress["weak_areas"])
+        return model
+
+    def record(self, weak_areas: List[str], strong_areas: List[str] = None, now: float = None):
+        """
+        Record the weak and strong areas from one graded quiz
+
+        Args:
+            weak_areas: Concepts the student struggled with
+            strong_areas: Concepts the student showed good understanding of
+            now: Timestamp of the result (defaults to the current time)
+        """
+        now = time.time() if now is None else now
+
+        for label in weak_areas or []:
+            area = self._find_or_add(label, now)
+            if area is None:
+                continue
+            area["weight"] = min(self._decayed(area, now) + 1.0, self.max_weight)
+            area["count"] += 1
+            area["mastery"] *= 0.5
+            area["updated"] = now
+
+        for label in strong_areas or []:
+            key = self._match(normalize_label(label))
+            if key is None:
+                continue
+            area = self.areas[key]
+            area["weight"] = self._decayed(area, now)
+            area["mastery"] += (1.0 - area["mastery"]) * 0.5
+            area["updated"] = now
+
+        self._prune(now)
+
+    def top(self, k: int = 5, now: float = None) -> List[str]:
+        """
+        Get the concepts to focus on, most pressing first
+
+        Args:
+            k: Maximum number of concepts
+            now: Timestamp to decay weights to (defaults to the current time)
+
+        Returns:
+            Concept labels as first phrased by the reviewer
+        """
+        now = time.time() if now is None else now
+        scored = [(self._score(area, now), area["label"]) for area in self.areas.values()]
+        scored = [item for item in scored if item[0] >= self.min_weight]
+        scored.sort(key=lambda item: -item[0])
+        return [label for _, label in scored[:k]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable state for storage"""
+        return {"areas": {key: dict(area) for key, area in self.areas.items()}}
+
+    def _find_or_add(self, label: str, now: float) -> Optional[Dict[str, Any]]:
+        canonical = normalize_label(label)
+        if not canonical:
+            return None
+
+        key = self._match(canonical)
+        if key is None:
+            key = canonical
+            self.areas[key] = {
+                "label": str(label).strip(),
+                "weight": 0.0,
+                "count": 0,
+                "mastery": 0.0,
+                "updated": now
+            }
+        return self.areas[key]
+
+    def _match(self, canonical: str) -> Optional[str]:
+        """Key of the most similar tracked concept, if similar enough"""
+        if not canonical:
+            return None
+        if canonical in self.areas:
+            return canonical
+
+        best, best_similarity = None, self.similarity
+        for key in self.areas:
+            similarity = label_similarity(canonical, key)
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        return best
+
+    def _decayed(self, area: Dict[str, Any], now: float) -> float:
+        elapsed = max(0.0, now - area["updated"])
+        return area["weight"] * 0.5 ** (elapsed / self.half_life_seconds)
+
+    def _score(self, area: Dict[str, Any], now: float) -> float:
+        return self._decayed(area, now) * (1.0 - area["mastery"])
+
+    def _prune(self, now: float):
+        """Drop faded or mastered concepts and keep at most max_tracked"""
+        ranked = sorted(self.areas, key=lambda key: -self._score(self.areas[key], now))
+        self.areas = {
+            key: self.areas[key]
+            for key in ranked[:self.max_tracked]
+            if self._score(self.areas[key], now) >= self.min_weight / 4
+        }
+
+
+def record_quiz_result(progress: Dict[str, Any], analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold a graded quiz into a student's progress
+
+    Updates the stored weak-area model and refreshes progress['weak_areas']
+    with its top concepts as of now. Readers should use current_weak_areas,
+    which applies the decay since the last quiz.
+
+    Args:
+        progress: Student progress from get_student_progress
+        analysis: Reviewer analysis with weak_areas and strong_areas
+
+    Returns:
+        The updated progress
+    """
+    model = WeakAreaModel.from_progress(progress)
+    model.record(analysis.get("weak_areas", []), analysis.get("strong_areas", []))
+    progress["weak_area_model"] = model.to_dict()
+    progress["weak_areas"] = model.top(WEAK_AREA_TOP_K)
+    return progress
+
+
+def current_weak_areas(progress: Dict[str, Any]) -> List[str]:
+    """
+    Get a student's weak areas as of now, most pressing first
+
+    The stored progress['weak_areas'] list is only refreshed when a quiz is
+    graded, so it keeps concepts that have since faded; this decays the
+    stored model to the current time instead.
+
+    Args:
+        progress: Student progress from get_student_progress
+
+    Returns:
+        At most WEAK_AREA_TOP_K concept labels
+    """
+    return WeakAreaModel.from_progress(progress).top(WEAK_AREA_TOP_K)
+
+
+def apply_quiz_result(course_name: str, student_name: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold a graded quiz into the stored progress of a student
+
+    Returns:
+        The updated progress
+    """
+    return change_student_progress(course_name, student_name, lambda progress: record_quiz_result(progress, analysis))